@@ -0,0 +1,109 @@
+"""row versions
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 17:46:21.922578
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+VERSIONED_TABLES = ("season", "match", "team")
+ROW_VERSION_LOCK = 0x726F7776
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence("row_version_seq")))
+    op.create_table(
+        "tombstone",
+        sa.Column(
+            "version",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('row_version_seq')"),
+            nullable=False,
+        ),
+        sa.Column("table_name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("row_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "deleted",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("version"),
+    )
+    for table in VERSIONED_TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                "row_version",
+                sa.BigInteger(),
+                server_default=sa.text("nextval('row_version_seq')"),
+                nullable=False,
+            ),
+        )
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock_shared({ROW_VERSION_LOCK});
+            NEW.row_version := nextval('row_version_seq');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION record_tombstone() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock_shared({ROW_VERSION_LOCK});
+            INSERT INTO tombstone (table_name, row_id) VALUES (TG_TABLE_NAME, OLD.id);
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_row_version BEFORE INSERT OR UPDATE ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION bump_row_version()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_tombstone AFTER DELETE ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION record_tombstone()"
+        )
+    with op.get_context().autocommit_block():
+        for table in VERSIONED_TABLES:
+            op.create_index(
+                f"ix_{table}_row_version",
+                table,
+                ["row_version"],
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in VERSIONED_TABLES:
+        op.drop_index(f"ix_{table}_row_version", table_name=table)
+        op.execute(f"DROP TRIGGER {table}_tombstone ON {table}")
+        op.execute(f"DROP TRIGGER {table}_row_version ON {table}")
+        op.drop_column(table, "row_version")
+    op.execute("DROP FUNCTION record_tombstone()")
+    op.execute("DROP FUNCTION bump_row_version()")
+    op.drop_table("tombstone")
+    op.execute(sa.schema.DropSequence(sa.Sequence("row_version_seq")))
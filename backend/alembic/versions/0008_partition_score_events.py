@@ -0,0 +1,151 @@
+"""partition score events
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:02:41.517306
+
+Rebuilds scoreevent as a table partitioned by season, with one partition
+per existing season and a default partition. The whole score history is
+copied, holding an exclusive lock on it until the migration commits.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, match_id, team_id, kind, cube, round, gong, points, timestamp, "
+    "controller_id, seq"
+)
+
+
+def score_columns() -> list:
+    return [
+        sa.Column("match_id", sa.Integer(), nullable=False),
+        sa.Column("team_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "kind",
+            postgresql.ENUM(
+                "CAPTURE", "GONG", name="scoreeventkind", create_type=False
+            ),
+            nullable=False,
+        ),
+        sa.Column("cube", sa.Integer(), nullable=False),
+        sa.Column("round", sa.Integer(), nullable=False),
+        sa.Column("gong", sa.Integer(), nullable=False),
+        sa.Column("points", sa.Integer(), nullable=False),
+        sa.Column("controller_id", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("seq", sa.Integer(), nullable=True),
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('scoreevent_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column(
+            "timestamp",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["match_id"], ["match.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["team_id"], ["team.id"], ondelete="CASCADE"),
+    ]
+
+
+def create_indexes(*partition_key: str) -> None:
+    op.create_index(
+        "ix_scoreevent_match_id_timestamp", "scoreevent", ["match_id", "timestamp"]
+    )
+    op.create_index("ix_scoreevent_team_id", "scoreevent", ["team_id"])
+    op.create_index(
+        "ux_scoreevent_controller_seq",
+        "scoreevent",
+        ["controller_id", "seq", *partition_key],
+        unique=True,
+    )
+    op.create_index(
+        "ux_scoreevent_gong",
+        "scoreevent",
+        ["match_id", "gong", "cube", *partition_key],
+        unique=True,
+        postgresql_where=sa.text("kind = 'GONG'"),
+    )
+
+
+def retire_table() -> None:
+    """
+    Renames the current scoreevent out of the way, freeing the names of its
+    indexes and its sequence.
+    """
+    op.execute("LOCK TABLE scoreevent IN EXCLUSIVE MODE")
+    op.execute("ALTER SEQUENCE scoreevent_id_seq OWNED BY NONE")
+    op.rename_table("scoreevent", "scoreevent_old")
+    for index in (
+        "ix_scoreevent_match_id_timestamp",
+        "ix_scoreevent_team_id",
+        "ux_scoreevent_controller_seq",
+        "ux_scoreevent_gong",
+    ):
+        op.drop_index(index, table_name="scoreevent_old")
+    op.execute("ALTER TABLE scoreevent_old DROP CONSTRAINT scoreevent_pkey")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    retire_table()
+    op.create_table(
+        "scoreevent",
+        *score_columns(),
+        sa.Column("season_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id", "season_id"),
+        postgresql_partition_by="LIST (season_id)",
+    )
+    op.execute("CREATE TABLE scoreevent_default PARTITION OF scoreevent DEFAULT")
+    for (season_id,) in op.get_bind().execute(sa.text("SELECT id FROM season")):
+        op.execute(
+            f"CREATE TABLE scoreevent_s{season_id} PARTITION OF scoreevent "
+            f"FOR VALUES IN ({season_id})"
+        )
+    op.execute(
+        f"INSERT INTO scoreevent ({COLUMNS}, season_id) "
+        f"SELECT {', '.join(f'e.{c}' for c in COLUMNS.split(', '))}, "
+        "coalesce(m.season_id, 0) "
+        "FROM scoreevent_old e JOIN match m ON m.id = e.match_id"
+    )
+    create_indexes("season_id")
+    op.drop_table("scoreevent_old")
+    op.execute("ALTER SEQUENCE scoreevent_id_seq OWNED BY scoreevent.id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER SEQUENCE scoreevent_id_seq OWNED BY NONE")
+    op.rename_table("scoreevent", "scoreevent_old")
+    for index in (
+        "ix_scoreevent_match_id_timestamp",
+        "ix_scoreevent_team_id",
+        "ux_scoreevent_controller_seq",
+        "ux_scoreevent_gong",
+    ):
+        op.drop_index(index, table_name="scoreevent_old")
+    op.execute("ALTER TABLE scoreevent_old DROP CONSTRAINT scoreevent_pkey")
+    op.create_table("scoreevent", *score_columns(), sa.PrimaryKeyConstraint("id"))
+    op.execute(
+        f"INSERT INTO scoreevent ({COLUMNS}) SELECT {COLUMNS} FROM scoreevent_old"
+    )
+    create_indexes()
+    # Drops the partitions along with their parent, detached ones are kept.
+    op.drop_table("scoreevent_old")
+    op.execute("ALTER SEQUENCE scoreevent_id_seq OWNED BY scoreevent.id")
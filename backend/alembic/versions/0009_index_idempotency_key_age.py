@@ -0,0 +1,34 @@
+"""index idempotency key age
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 09:12:05.204417
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_idempotencykey_created",
+            "idempotencykey",
+            ["created"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_idempotencykey_created", table_name="idempotencykey")
@@ -0,0 +1,105 @@
+"""transaction row versions
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 10:04:51.730129
+
+Row versions now hold the ID of the writing transaction in their high bits,
+so that readers of changes find the versions that are final from their
+snapshot instead of locking out writers. Versions already recorded are far
+below the new ones and keep their order.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ("season", "match", "team")
+VERSION_XID_SHIFT = 22
+ROW_VERSION_LOCK = 0x726F7776
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION next_row_version() RETURNS bigint AS $$
+        BEGIN
+            RETURN (pg_current_xact_id()::text::bigint << {VERSION_XID_SHIFT})
+                | (nextval('row_version_seq') & {(1 << VERSION_XID_SHIFT) - 1});
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.row_version := next_row_version();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION record_tombstone() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO tombstone (table_name, row_id) VALUES (TG_TABLE_NAME, OLD.id);
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN row_version "
+            "SET DEFAULT next_row_version()"
+        )
+    op.execute(
+        "ALTER TABLE tombstone ALTER COLUMN version SET DEFAULT next_row_version()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "ALTER TABLE tombstone ALTER COLUMN version "
+        "SET DEFAULT nextval('row_version_seq')"
+    )
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN row_version "
+            "SET DEFAULT nextval('row_version_seq')"
+        )
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock_shared({ROW_VERSION_LOCK});
+            NEW.row_version := nextval('row_version_seq');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION record_tombstone() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock_shared({ROW_VERSION_LOCK});
+            INSERT INTO tombstone (table_name, row_id) VALUES (TG_TABLE_NAME, OLD.id);
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute("DROP FUNCTION next_row_version()")
@@ -0,0 +1,46 @@
+"""standing row versions
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 15:12:40.518204
+
+Standings get row versions too, so that the version of a season covers the
+points its teams score after it was archived.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "teamstanding",
+        sa.Column(
+            "row_version",
+            sa.BigInteger(),
+            server_default=sa.text("next_row_version()"),
+            nullable=False,
+        ),
+    )
+    op.execute(
+        "CREATE TRIGGER teamstanding_row_version "
+        "BEFORE INSERT OR UPDATE ON teamstanding "
+        "FOR EACH ROW EXECUTE FUNCTION bump_row_version()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER teamstanding_row_version ON teamstanding")
+    op.drop_column("teamstanding", "row_version")
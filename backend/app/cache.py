@@ -0,0 +1,250 @@
+import hashlib
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Dict, Optional, Protocol, Set, Tuple
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import Headers
+from db.confdb import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_URL
+from db.events import event_bus
+from log_utils import API_LOGGER
+
+
+def encode_model(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dump_json(value: Any) -> bytes:
+    """
+    Serializes a handler result with orjson.
+
+    Models are dumped as they are, without being validated again against the
+    response model of the route.
+    """
+    return orjson.dumps(value, default=encode_model, option=orjson.OPT_NON_STR_KEYS)
+
+
+def make_etag(body: bytes) -> str:
+    # Weak, as the same entity is served gzip or brotli encoded.
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, tag: str) -> None: ...
+
+    async def invalidate(self, tag: str) -> None: ...
+
+
+class LRUCache:
+    """
+    In-process LRU cache with a time to live and a bounded number of entries.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: OrderedDict[str, Tuple[float, bytes, str]] = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value, tag = entry
+        if expires < time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, tag: str) -> None:
+        self._discard(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, tag)
+        self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def invalidate(self, tag: str) -> None:
+        for key in self._tags.pop(tag, ()):
+            self._entries.pop(key, None)
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._tags.get(entry[2])
+            keys.discard(key)
+            if not keys:
+                del self._tags[entry[2]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """
+    Cache shared by every worker, stored in Redis. Requires the optional
+    `redis` package.
+    """
+
+    def __init__(self, url: str, ttl: float):
+        try:
+            from redis.asyncio import Redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_URL requires the 'redis' package") from e
+        self.ttl = ttl
+        self._redis = Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(f"cache:{key}")
+
+    async def set(self, key: str, value: bytes, tag: str) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(f"cache:{key}", value, px=int(self.ttl * 1000))
+            pipe.sadd(f"tag:{tag}", key)
+            pipe.pexpire(f"tag:{tag}", int(self.ttl * 1000))
+            await pipe.execute()
+
+    async def invalidate(self, tag: str) -> None:
+        keys = await self._redis.smembers(f"tag:{tag}")
+        await self._redis.delete(f"tag:{tag}", *(f"cache:{k.decode()}" for k in keys))
+
+
+class ResponseCache:
+    """
+    Read-through cache of JSON responses.
+
+    Handlers are cached under a tag built from their path parameters, e.g.
+    `season:{id}`, and every combination of their other parameters is stored
+    as a separate key of that tag. Mutations invalidate whole tags.
+
+    Responses carry an ETag of their body, so that clients can revalidate
+    them with `If-None-Match` (see ConditionalGetMiddleware).
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, tag_template: str):
+        def decorator(handler):
+            @wraps(handler)
+            async def wrapper(**kwargs) -> Response:
+                tag = tag_template.format(**kwargs)
+                params = "&".join(
+                    f"{name}={value}"
+                    for name, value in sorted(kwargs.items())
+                    if not isinstance(value, (AsyncSession, Request, Response))
+                )
+                key = f"{tag}?{params}"
+                body = await self.backend.get(key)
+                if body is None:
+                    self.misses += 1
+                    result = await handler(**kwargs)
+                    body = dump_json(result)
+                    await self.backend.set(key, body, tag)
+                else:
+                    self.hits += 1
+                return Response(
+                    body,
+                    media_type="application/json",
+                    headers={"ETag": make_etag(body), "Cache-Control": "no-cache"},
+                )
+
+            return wrapper
+
+        return decorator
+
+    async def invalidate(self, *tags: str) -> None:
+        await self.drop(*tags)
+        if isinstance(self.backend, LRUCache):
+            # Every other worker holds its own copy of the entries.
+            event_bus.publish("cache", tags)
+
+    async def drop(self, *tags: str) -> None:
+        for tag in tags:
+            await self.backend.invalidate(tag)
+
+    def stats(self) -> Dict[str, int]:
+        stats = {"hits": self.hits, "misses": self.misses}
+        if isinstance(self.backend, LRUCache):
+            stats["entries"] = len(self.backend)
+            stats["evictions"] = self.backend.evictions
+        return stats
+
+
+class ConditionalGetMiddleware:
+    """
+    ASGI middleware answering GET requests with an empty 304 Not Modified
+    when their `If-None-Match` header matches the ETag of the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if_none_match = None
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            if_none_match = Headers(scope=scope).get("if-none-match")
+        if not if_none_match:
+            await self.app(scope, receive, send)
+            return
+
+        not_modified = False
+
+        async def send_wrapper(message):
+            nonlocal not_modified
+            if message["type"] == "http.response.start":
+                etag = Headers(raw=message["headers"]).get("etag")
+                if (
+                    message["status"] == 200
+                    and etag is not None
+                    and etag_matches(etag, if_none_match)
+                ):
+                    not_modified = True
+                    message = {
+                        "type": "http.response.start",
+                        "status": 304,
+                        "headers": [
+                            (name, value)
+                            for name, value in message["headers"]
+                            if name not in (b"content-length", b"content-type")
+                        ],
+                    }
+            elif not_modified:
+                if message.get("more_body", False):
+                    return
+                message = {"type": "http.response.body", "body": b""}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def create_backend() -> CacheBackend:
+    if CACHE_URL:
+        API_LOGGER.info("Using external response cache")
+        return RedisCache(CACHE_URL, CACHE_TTL_SECONDS)
+    return LRUCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+response_cache = ResponseCache(create_backend())
+event_bus.subscribe("cache", lambda tags: response_cache.drop(*tags))
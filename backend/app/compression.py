@@ -0,0 +1,51 @@
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, IdentityResponder
+from log_utils import API_LOGGER
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if more_body:
+            return self.compressor.process(body) + self.compressor.flush()
+        return self.compressor.process(body) + self.compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compresses responses larger than `minimum_size` with brotli when the
+    client accepts it and the optional `brotli` package is installed, and
+    with gzip otherwise.
+
+    Event streams are never compressed, so that live updates are not held
+    back in a compressor buffer.
+    """
+
+    def __init__(self, app, minimum_size: int, compresslevel: int, brotli_quality: int):
+        super().__init__(app, minimum_size, compresslevel)
+        self.brotli_quality = brotli_quality
+        if brotli is None:
+            API_LOGGER.info("brotli is not installed, compressing with gzip only")
+
+    async def __call__(self, scope, receive, send):
+        if (
+            brotli is not None
+            and scope["type"] == "http"
+            and "br" in Headers(scope=scope).get("accept-encoding", "")
+        ):
+            responder = BrotliResponder(
+                self.app, self.minimum_size, self.brotli_quality
+            )
+            await responder(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
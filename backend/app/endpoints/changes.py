@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Tuple
+from fastapi import APIRouter, Depends, Query, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.cache import dump_json
+from app.query import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from db.interface import get_session
+from db.models import Match, Season, Team, Tombstone
+from db.models.versions import VERSION_WATERMARK_QUERY
+
+router = APIRouter()
+
+CHANGE_MODELS = {"seasons": Season, "matches": Match, "teams": Team}
+
+
+def changes_queries(since: int, until: int, limit: int) -> Dict[str, Any]:
+    queries = {
+        name: select(model)
+        .where(model.row_version > since, model.row_version < until)
+        .order_by(model.row_version)
+        .limit(limit)
+        for name, model in CHANGE_MODELS.items()
+    }
+    queries["deleted"] = (
+        select(Tombstone)
+        .where(Tombstone.version > since, Tombstone.version < until)
+        .order_by(Tombstone.version)
+        .limit(limit)
+    )
+    return queries
+
+
+@router.get("/changes", tags=["changes"])
+async def list_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+) -> Response:
+    """
+    Lists the seasons, matches and teams written since a version, and those
+    deleted, oldest change first.
+
+    Clients keep a mirror in sync by passing the `version` of the previous
+    response as `since`, and calling again right away while `more` is true.
+
+    Args:
+        since (int): The version of the last change already received, 0 for
+            everything.
+        limit (int): The maximum number of changes to return.
+        db (AsyncSession): The database session.
+
+    Returns:
+        Response: The changed rows by table, the deletions, the version to
+            resume from and whether more changes are pending.
+    """
+    # Writes still in flight can only commit versions above the watermark,
+    # which are left for the next calls.
+    until = await db.scalar(VERSION_WATERMARK_QUERY)
+    changes: List[Tuple[int, str, Any]] = []
+    for name, query in changes_queries(since, until, limit + 1).items():
+        for row in await db.scalars(query):
+            version = row.version if name == "deleted" else row.row_version
+            changes.append((version, name, row.model_dump()))
+    await db.rollback()
+
+    changes.sort(key=lambda change: change[0])
+    body: Dict[str, Any] = {name: [] for name in CHANGE_MODELS}
+    body["deleted"] = []
+    for _, name, row in changes[:limit]:
+        body[name].append(row)
+    body["version"] = changes[:limit][-1][0] if changes else since
+    body["more"] = len(changes) > limit
+    return Response(dump_json(body), media_type="application/json")
@@ -0,0 +1,108 @@
+from app.cache import response_cache
+from app.gong import gong_scheduler
+from app.metrics import registry
+from app.snapshots import snapshot_archiver, snapshot_store
+from db.events import event_bus
+from db.interface import engine, replica_monitor
+from db.partitions import list_partitions, retention_job
+from db.pool import pool_status
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict
+
+router = APIRouter()
+
+
+@router.get("/diagnostics/cache", tags=["diagnostics"])
+async def cache_stats() -> Dict[str, int]:
+    """
+    Reports the hit and miss counters of the response cache.
+
+    Returns:
+        Dict[str, int]: The cache counters of this worker.
+    """
+    return response_cache.stats()
+
+
+@router.get("/diagnostics/pool", tags=["diagnostics"])
+async def pool_diagnostics() -> Dict[str, Any]:
+    """
+    Reports the saturation of the database connection pool.
+
+    Returns:
+        Dict[str, Any]: Pool occupancy, overflow, checkout wait times and timeouts.
+    """
+    return pool_status(engine)
+
+
+@router.get("/diagnostics/replica", tags=["diagnostics"])
+async def replica_diagnostics() -> Dict[str, Any]:
+    """
+    Reports the replication lag of the read replica and where reads were
+    served from.
+
+    Returns:
+        Dict[str, Any]: The replica state of this worker, empty without a replica.
+    """
+    return replica_monitor.status() if replica_monitor is not None else {}
+
+
+@router.get("/diagnostics/gongs", tags=["diagnostics"])
+async def gong_diagnostics() -> Dict[int, Dict[str, Any]]:
+    """
+    Reports the next gong of every match tracked by the gong scheduler.
+
+    Returns:
+        Dict[int, Dict[str, Any]]: The next gong number and due time by match ID.
+    """
+    return gong_scheduler.status()
+
+
+@router.get("/diagnostics/events", tags=["diagnostics"])
+async def event_diagnostics() -> Dict[str, Any]:
+    """
+    Reports the state of the event bus connecting the workers.
+
+    Returns:
+        Dict[str, Any]: The connection state and notification counters of this worker.
+    """
+    return event_bus.stats()
+
+
+@router.get("/diagnostics/partitions", tags=["diagnostics"])
+async def partition_diagnostics() -> Dict[str, Any]:
+    """
+    Reports the partitions of the score history and the retention steps
+    applied to them.
+
+    Returns:
+        Dict[str, Any]: The partitions with their estimated rows and size,
+            and the retention counters of this worker.
+    """
+    async with engine.connect() as conn:
+        partitions = await list_partitions(conn)
+    return {"partitions": partitions, "retention": retention_job.status()}
+
+
+@router.get("/diagnostics/snapshots", tags=["diagnostics"])
+async def snapshot_diagnostics() -> Dict[str, Any]:
+    """
+    Reports the season snapshots mapped by this worker and the seasons
+    archived by it.
+
+    Returns:
+        Dict[str, Any]: The mapped snapshots with their size and reads, and
+            the archiver counters of this worker.
+    """
+    return {**snapshot_store.status(), "archiver": snapshot_archiver.status()}
+
+
+@router.get("/metrics", response_class=PlainTextResponse, tags=["diagnostics"])
+async def metrics() -> PlainTextResponse:
+    """
+    Exposes request and database metrics in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The metrics of this worker.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+from enum import Enum
+from db.models import Match, ScoreEvent, Season, Team
+from db.interface import read_engine
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel import SQLModel, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import AsyncIterator, Optional, Type
+
+router = APIRouter()
+
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportTable(str, Enum):
+    SEASONS = "seasons"
+    MATCHES = "matches"
+    TEAMS = "teams"
+    SCORES = "scores"
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+EXPORT_MODELS = {
+    ExportTable.SEASONS: Season,
+    ExportTable.MATCHES: Match,
+    ExportTable.TEAMS: Team,
+    ExportTable.SCORES: ScoreEvent,
+}
+
+
+def export_query(model: Type[SQLModel], season_id: Optional[int]):
+    # Plain rows, which the session does not track: a long export holds no
+    # more than one batch in memory.
+    query = select(*model.__table__.c).order_by(model.id)
+    if season_id is None:
+        return query
+    if model is Season:
+        return query.where(Season.id == season_id)
+    return query.where(model.season_id == season_id)
+
+
+async def export_rows(
+    bind: AsyncEngine,
+    table: ExportTable,
+    format: ExportFormat,
+    season_id: Optional[int],
+) -> AsyncIterator[str]:
+    model = EXPORT_MODELS[table]
+    columns = list(model.__table__.c.keys())
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    if format == ExportFormat.CSV:
+        writer.writeheader()
+
+    # The request session is closed once the handler returns, so the stream
+    # owns its session for as long as the client keeps reading.
+    async with AsyncSession(bind) as session:
+        query = export_query(model, season_id).execution_options(
+            yield_per=EXPORT_BATCH_SIZE
+        )
+        result = await session.stream(query)
+        async for batch in result.mappings().partitions():
+            for row in batch:
+                data = model.model_validate(row).model_dump(mode="json")
+                if format == ExportFormat.CSV:
+                    writer.writerow(data)
+                else:
+                    buffer.write(json.dumps(data))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("/export/{table}", tags=["export"])
+async def export_table(
+    table: ExportTable,
+    request: Request,
+    format: ExportFormat = ExportFormat.NDJSON,
+    season_id: Optional[int] = None,
+) -> StreamingResponse:
+    """
+    Streams a full dump of a table as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and written out one batch at
+    a time, so memory use does not depend on the size of the export.
+
+    Args:
+        table (ExportTable): The table to export.
+        request (Request): The incoming request, used to route the reads.
+        format (ExportFormat): The output format.
+        season_id (Optional[int]): The ID of the season to restrict the export to.
+
+    Returns:
+        StreamingResponse: The exported rows.
+    """
+    media_type = "text/csv" if format == ExportFormat.CSV else "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(read_engine(request), table, format, season_id),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{table.value}.{format.value}"'
+        },
+    )
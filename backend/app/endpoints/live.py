@@ -0,0 +1,60 @@
+import asyncio
+import json
+from app.live import hub
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+
+
+async def event_stream(request: Request, topic: str) -> AsyncIterator[str]:
+    with hub.subscribe(topic) as queue:
+        yield ": connected\n\n"
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def sse_response(request: Request, topic: str) -> StreamingResponse:
+    return StreamingResponse(
+        event_stream(request, topic),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/seasons/{id}/live", tags=["live"])
+async def stream_season(id: int, request: Request) -> StreamingResponse:
+    """
+    Streams live updates of a season and its matches as Server-Sent Events.
+
+    Args:
+        id (int): The ID of the season to follow.
+        request (Request): The incoming request, used to detect disconnects.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` of `season` and `match` events.
+    """
+    return sse_response(request, f"season:{id}")
+
+
+@router.get("/matches/{id}/live", tags=["live"])
+async def stream_match(id: int, request: Request) -> StreamingResponse:
+    """
+    Streams live updates of a match as Server-Sent Events.
+
+    Args:
+        id (int): The ID of the match to follow.
+        request (Request): The incoming request, used to detect disconnects.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` of `match` events.
+    """
+    return sse_response(request, f"match:{id}")
@@ -1,43 +1,93 @@
-from db.models import Season, EventStatus
+from db.models import Season, EventStatus, MatchTimeline
 from db.models.matches import Match
-from db.interface import get_session
-from fastapi import Depends, HTTPException
+from db.interface import get_read_session, get_session
+from db.partitions import is_detached, move_match_scores
+from db.standings import record_match_end
+from db.timelines import build_timelines, owners_at, replay, scores_at
+from rules import GONG_SECONDS
+from app.live import hub
+from app.gong import gong_scheduler
+from app.cache import dump_json, response_cache
+from app.snapshots import snapshot_response, snapshot_store
+from app.query import (
+    MAX_PAGE_SIZE,
+    list_events,
+    patch_values,
+    raise_not_updated,
+    update_by_id,
+)
+from fastapi import Depends, Header, HTTPException, Query, Response
+from app.idempotency import claim_key, recent_transitions, transition_key
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter
-from datetime import datetime
+from log_utils import bind_match_id
+from datetime import datetime, timezone
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(bind_match_id)])
+
+
+async def invalidate_match_lists(*season_ids: Optional[int]) -> None:
+    tags = {"matches:None"}
+    for season_id in season_ids:
+        if season_id is not None:
+            tags.update((f"matches:{season_id}", f"season:{season_id}:matches"))
+    await response_cache.invalidate(*tags)
 
 
 @router.get("/matches", response_model=List[Match], tags=["matches"])
+@response_cache.cached("matches:{season_id}")
 async def list_matches(
-    season_id: Optional[int] = None, db: AsyncSession = Depends(get_session)
+    season_id: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[EventStatus] = None,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
 ) -> List[Match]:
     """
-    Lists all matches, optionally filtered by season_id.
+    Lists a page of matches ordered by ID, optionally filtered by season_id.
 
     Args:
         season_id (Optional[int]): The ID of the season to filter matches by.
+        after (Optional[int]): The ID of the last match of the previous page.
+        limit (Optional[int]): The maximum number of matches to return, all
+            by default.
+        status (Optional[EventStatus]): The status to filter matches by.
+        start_from (Optional[datetime]): Only matches starting at or after this date.
+        start_to (Optional[datetime]): Only matches starting before this date.
+        fields (Optional[str]): Comma-separated columns to return, all by default.
         db (AsyncSession): The database session.
 
     Returns:
-        List[Match]: A list of all existing matches, filtered by season_id if provided.
+        List[Match]: A page of matches matching the filters.
     """
+    filters = []
     if season_id is not None:
-        query = select(Match).where(Match.season_id == season_id)
-    else:
-        query = select(Match)
-
-    result = await db.scalars(query)
-    return result.all()
+        filters.append(Match.season_id == season_id)
+    return await list_events(
+        db,
+        Match,
+        *filters,
+        after=after,
+        limit=limit,
+        status=status,
+        start_from=start_from,
+        start_to=start_to,
+        fields=fields,
+    )
 
 
 @router.get("/matches/{id}", response_model=Match, tags=["matches"])
-async def get_match(id: int, db: AsyncSession = Depends(get_session)) -> Match:
+async def get_match(id: int, db: AsyncSession = Depends(get_read_session)) -> Match:
     """
-    Retrieves a match by its ID.
+    Retrieves a match by its ID, from the snapshot of its season once
+    archived.
 
     Args:
         id (int): The ID of the match to retrieve.
@@ -46,10 +96,68 @@ async def get_match(id: int, db: AsyncSession = Depends(get_session)) -> Match:
     Returns:
         Match: The match object with the specified ID.
     """
+    snapshot = snapshot_store.get_match(id)
+    if snapshot is not None:
+        body, etag, _, _ = snapshot.matches[id]
+        return snapshot_response(body, etag)
     match = await db.get(Match, id)
     if match is None:
         raise HTTPException(status_code=404, detail="Match not found")
-    return match
+    # Dumped as its snapshot is, so that archiving changes no byte of it.
+    return Response(dump_json(match), media_type="application/json")
+
+
+@router.get("/matches/{id}/timeline", tags=["matches"])
+async def get_match_timeline(
+    id: int,
+    at: Optional[datetime] = None,
+    gong: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_session),
+) -> Dict[str, Any]:
+    """
+    Replays a match gong by gong, or gives its state at a point in time.
+
+    Without `at` or `gong`, returns the owner of every cube and the
+    cumulative scores at every gong. Otherwise only the state after the
+    requested gong, or after the last gong sounded at `at`, is returned.
+
+    Args:
+        id (int): The ID of the match.
+        at (Optional[datetime]): The time to get the state of the match at.
+        gong (Optional[int]): The gong to get the state of the match at.
+        db (AsyncSession): The database session.
+
+    Returns:
+        Dict[str, Any]: The replay or the state of the match.
+    """
+    result = await db.execute(
+        select(Match.start, Match.season_id, MatchTimeline)
+        .outerjoin(MatchTimeline, MatchTimeline.match_id == Match.id)
+        .where(Match.id == id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Match not found")
+    start, season_id, timeline = row
+    if timeline is None:
+        # Matches without gongs recorded since timelines exist.
+        packed = await build_timelines(db, {id: season_id})
+        timeline = MatchTimeline(**packed[id])
+
+    if at is not None:
+        if start is None:
+            raise HTTPException(status_code=400, detail="Match has not started")
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        gong = int((at - start).total_seconds() // GONG_SECONDS) - 1
+    if gong is None:
+        return {"match_id": id, "start": start, **replay(timeline)}
+    return {
+        "match_id": id,
+        "gong": gong,
+        "owners": owners_at(timeline, gong),
+        "scores": scores_at(timeline, gong),
+    }
 
 
 @router.post("/matches", response_model=Match, tags=["matches"])
@@ -76,9 +184,12 @@ async def create_match(match: Match, db: AsyncSession = Depends(get_session)) ->
         if season is None:
             raise HTTPException(status_code=404, detail="Season not found")
 
-    season.matches.append(match)
+    db.add(match)
+    archived = await snapshot_store.lock(db, match.season_id)
     await db.commit()
     await db.refresh(match)
+    snapshot_store.discard(archived)
+    await invalidate_match_lists(match.season_id)
     return match
 
 
@@ -97,25 +208,27 @@ async def update_match(
     Returns:
         Match: The updated match object.
     """
-    match_data = match.model_dump(exclude_unset=True)
-    existing_match = await db.get(Match, id)
-
-    if existing_match is None:
+    values = patch_values(Match, match)
+    if not values:
+        return await get_match(id, db)
+    if "season_id" in values and await is_detached(db, values["season_id"]):
+        raise HTTPException(
+            status_code=409, detail="Score history of the season is detached"
+        )
+    try:
+        result = await update_by_id(db, Match, id, values, previous="season_id")
+    except IntegrityError:
+        raise HTTPException(status_code=404, detail="Season not found")
+    if result is None:
         raise HTTPException(status_code=404, detail="Match not found")
-
-    # Validate season_id if it's being updated
-    if "season_id" in match_data and match_data["season_id"] is not None:
-        season = await db.get(Season, match_data["season_id"])
-        if season is None:
-            raise HTTPException(status_code=404, detail="Season not found")
-
-    # Update the match with the new data
-    for key, value in match_data.items():
-        setattr(existing_match, key, value)
-
+    match, previous_season_id = result
+    await move_match_scores(db, id, previous_season_id, match.season_id)
+    archived = await snapshot_store.lock(db, previous_season_id, match.season_id)
     await db.commit()
-    await db.refresh(existing_match)
-    return existing_match
+    snapshot_store.discard(archived)
+    await invalidate_match_lists(previous_season_id, match.season_id)
+    hub.publish_match(match)
+    return match
 
 
 @router.delete("/matches/{id}", tags=["matches"])
@@ -131,57 +244,97 @@ async def delete_match(id: int, db: AsyncSession = Depends(get_session)):
     if match is None:
         raise HTTPException(status_code=404, detail="Match not found")
 
+    season_id = match.season_id
+    archived = await snapshot_store.lock(db, season_id)
     await db.delete(match)
     await db.commit()
+    snapshot_store.discard(archived)
+    await invalidate_match_lists(season_id)
 
 
 @router.post("/matches/{id}/start", tags=["matches"])
-async def start_match(id: int, db: AsyncSession = Depends(get_session)):
+async def start_match(
+    id: int,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_session),
+):
     """
     Starts a match by its ID.
 
     Args:
         id (int): The ID of the match to start.
+        idempotency_key (Optional[str]): Makes retries of the request return
+            the state of the first one instead of a conflict.
         db (AsyncSession): The database session.
 
     Returns:
         Match: The updated match object.
     """
-    match = await db.get(Match, id)
+    key = transition_key("match", id, "start", idempotency_key)
+    if key in recent_transitions:
+        return recent_transitions.get(key)
+    if not await claim_key(db, key):
+        return await get_match(id, db)
+    match = await update_by_id(
+        db,
+        Match,
+        id,
+        {"status": EventStatus.ONGOING, "start": func.now()},
+        Match.status == EventStatus.PENDING,
+    )
     if match is None:
-        raise HTTPException(status_code=404, detail="Match not found")
-
-    if match.status != EventStatus.PENDING:
-        raise HTTPException(status_code=400, detail="Match is not pending")
-
-    match.status = EventStatus.ONGOING
-    match.start = datetime.now()
+        await raise_not_updated(db, Match, id, "Match is not pending")
+    archived = await snapshot_store.lock(db, match.season_id)
     await db.commit()
-    await db.refresh(match)
+    snapshot_store.discard(archived)
+    gong_scheduler.track(match.id, match.season_id, match.start)
+    await invalidate_match_lists(match.season_id)
+    hub.publish_match(match)
+    if key is not None:
+        recent_transitions.add(key, match)
     return match
 
 
 @router.post("/matches/{id}/end", tags=["matches"])
-async def end_match(id: int, db: AsyncSession = Depends(get_session)):
+async def end_match(
+    id: int,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_session),
+):
     """
     Ends a match by its ID.
 
     Args:
         id (int): The ID of the match to end.
+        idempotency_key (Optional[str]): Makes retries of the request return
+            the state of the first one instead of a conflict.
         db (AsyncSession): The database session.
 
     Returns:
         Match: The updated match object.
     """
-    match = await db.get(Match, id)
+    key = transition_key("match", id, "end", idempotency_key)
+    if key in recent_transitions:
+        return recent_transitions.get(key)
+    if not await claim_key(db, key):
+        return await get_match(id, db)
+    match = await update_by_id(
+        db,
+        Match,
+        id,
+        {"status": EventStatus.COMPLETED, "end": func.now()},
+        Match.status == EventStatus.ONGOING,
+    )
     if match is None:
-        raise HTTPException(status_code=404, detail="Match not found")
-
-    if match.status != EventStatus.ONGOING:
-        raise HTTPException(status_code=400, detail="Match is not active")
-
-    match.status = EventStatus.COMPLETED
-    match.end = datetime.now()
+        await raise_not_updated(db, Match, id, "Match is not active")
+    if match.season_id is not None:
+        await record_match_end(db, match.season_id)
+    archived = await snapshot_store.lock(db, match.season_id)
     await db.commit()
-    await db.refresh(match)
+    snapshot_store.discard(archived)
+    gong_scheduler.untrack(match.id)
+    await invalidate_match_lists(match.season_id)
+    hub.publish_match(match)
+    if key is not None:
+        recent_transitions.add(key, match)
     return match
@@ -0,0 +1,102 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.respawn import replay, respawn_engine
+from db.events import event_bus
+from db.interface import get_read_session, get_session
+from db.models import Elimination, EventStatus, Match, RespawnEvent, Team
+from log_utils import bind_match_id
+
+router = APIRouter(dependencies=[Depends(bind_match_id)])
+
+
+async def ongoing_match(db: AsyncSession, match_id: int) -> Match:
+    match = await db.get(Match, match_id)
+    if match is None:
+        raise HTTPException(status_code=404, detail="Match not found")
+    if match.status != EventStatus.ONGOING:
+        raise HTTPException(status_code=400, detail="Match is not active")
+    return match
+
+
+@router.post("/matches/{id}/respawns", tags=["respawns"])
+async def eliminate_player(
+    id: int,
+    elimination: Elimination,
+    response: Response,
+    db: AsyncSession = Depends(get_session),
+) -> Dict[str, Any]:
+    """
+    Sends a player eliminated in a match to a respawn ring, as reported by
+    the tablet of a referee.
+
+    The player enters the first ring of the zone if nobody did since the
+    last gong, and the second ring otherwise. The move is applied in memory
+    and written to the database with the next batch. Eliminations received
+    by a worker not running the respawn engine are forwarded to it and
+    accepted without their ring.
+
+    Args:
+        id (int): The ID of the match.
+        elimination (Elimination): The eliminated player and their zone.
+        response (Response): The response, whose status is set to 202 when
+            the elimination is forwarded.
+        db (AsyncSession): The database session.
+
+    Returns:
+        Dict[str, Any]: The elimination and the ring the player entered.
+    """
+    body = {"match_id": id, **elimination.model_dump()}
+    if respawn_engine.task is None:
+        match = await ongoing_match(db, id)
+        team = await db.get(Team, elimination.team_id)
+        if team is None or team.season_id != match.season_id:
+            raise HTTPException(status_code=404, detail="Team not found")
+        event_bus.publish("respawn", body)
+        response.status_code = 202
+        return {**body, "ring": None}
+
+    if id not in respawn_engine.matches:
+        await ongoing_match(db, id)
+        raise HTTPException(status_code=400, detail="Match is not active")
+    if elimination.team_id not in await respawn_engine.season_teams(db, id):
+        raise HTTPException(status_code=404, detail="Team not found")
+    try:
+        ring = respawn_engine.report(id, **elimination.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {**body, "ring": ring}
+
+
+@router.get("/matches/{id}/respawns", tags=["respawns"])
+async def get_respawns(
+    id: int, db: AsyncSession = Depends(get_read_session)
+) -> Dict[str, Any]:
+    """
+    Shows the players waiting in the respawn rings of a match.
+
+    The rings of matches not in the respawn engine of this worker, either
+    over or run by another worker, are rebuilt from the moves written so
+    far, which lag by up to one batch.
+
+    Args:
+        id (int): The ID of the match.
+        db (AsyncSession): The database session.
+
+    Returns:
+        Dict[str, Any]: The last gong and the players in each ring of each
+            zone, in the order they entered it.
+    """
+    respawns = respawn_engine.matches.get(id)
+    if respawns is None or respawn_engine.task is None:
+        match = await db.get(Match, id)
+        if match is None:
+            raise HTTPException(status_code=404, detail="Match not found")
+        result = await db.scalars(
+            select(RespawnEvent)
+            .where(RespawnEvent.match_id == id)
+            .order_by(RespawnEvent.id)
+        )
+        respawns = replay(match.season_id, result.all())
+    return {"match_id": id, **respawns.state()}
@@ -0,0 +1,187 @@
+from db.models import (
+    EventStatus,
+    Match,
+    ScoreEvent,
+    ScoreEventBase,
+    ScoreEventKind,
+    Team,
+)
+from db.models.scores import NO_SEASON
+from db.interface import get_read_session, get_session
+from db.standings import add_points
+from db.timelines import append_timelines
+from app.cache import dump_json
+from app.idempotency import recent_events
+from app.snapshots import snapshot_store
+from app.query import FOREIGN_KEY_VIOLATION, UNIQUE_VIOLATION, violation
+from log_utils import INGEST_LOGGER, match_id
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from collections import defaultdict
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+
+router = APIRouter()
+
+
+def scores_query(match_id: Optional[int], season_id: Optional[int] = None):
+    query = select(ScoreEvent).order_by(ScoreEvent.timestamp, ScoreEvent.id)
+    if match_id is not None:
+        query = query.where(
+            ScoreEvent.season_id == (NO_SEASON if season_id is None else season_id),
+            ScoreEvent.match_id == match_id,
+        )
+    return query
+
+
+@router.get("/scores", response_model=List[ScoreEvent], tags=["scores"])
+async def list_scores(
+    match_id: Optional[int] = None, db: AsyncSession = Depends(get_read_session)
+) -> List[ScoreEvent]:
+    """
+    Lists score events, optionally filtered by match_id. The events of a
+    match of an archived season are decoded from the season snapshot.
+
+    Args:
+        match_id (Optional[int]): The ID of the match to filter events by.
+        db (AsyncSession): The database session.
+
+    Returns:
+        List[ScoreEvent]: A list of score events in the order they happened.
+    """
+    season_id = None
+    if match_id is not None:
+        snapshot = snapshot_store.get_match(match_id)
+        if snapshot is not None:
+            return Response(
+                dump_json(snapshot.scores(match_id)), media_type="application/json"
+            )
+        # Known up front, the season lets the planner read only its partition.
+        season_id = await db.scalar(select(Match.season_id).where(Match.id == match_id))
+    result = await db.scalars(scores_query(match_id, season_id))
+    # Dumped as snapshots are, so that archiving changes no byte of them.
+    return Response(dump_json(result.all()), media_type="application/json")
+
+
+@router.post("/scores", tags=["scores"])
+async def ingest_scores(
+    events: List[ScoreEventBase], db: AsyncSession = Depends(get_session)
+) -> Dict[str, int]:
+    """
+    Ingests a batch of score events sent by the arena controllers.
+
+    The whole batch is validated with one query for its matches and one for
+    its teams, which must belong to the season of their match if it has
+    one, and written with batched multi-row inserts, kept under the bind
+    parameter limit of the driver however many events the batch holds. The season
+    standings are updated in the same transaction.
+
+    Events carrying a `controller_id` and `seq` are idempotent: retries are
+    dropped by the window of recently seen keys, or by the unique constraint
+    on the pair, and never award points twice.
+
+    Args:
+        events (List[ScoreEventBase]): The panel-press and gong events to record.
+        db (AsyncSession): The database session.
+
+    Returns:
+        Dict[str, int]: The number of inserted and duplicate events.
+    """
+    now = datetime.now(timezone.utc)
+    rows = []
+    keys = set()
+    duplicates = 0
+    for event in events:
+        if event.kind == ScoreEventKind.CAPTURE and event.points:
+            raise HTTPException(status_code=400, detail="Captures award no points")
+        if (event.controller_id is None) != (event.seq is None):
+            raise HTTPException(
+                status_code=400, detail="controller_id and seq must be sent together"
+            )
+        if event.controller_id is not None:
+            key = (event.controller_id, event.seq)
+            if key in keys or key in recent_events:
+                duplicates += 1
+                continue
+            keys.add(key)
+        row = event.model_dump()
+        row["timestamp"] = event.timestamp or now
+        rows.append(row)
+    if not rows:
+        return {"inserted": 0, "duplicates": duplicates}
+
+    match_ids = {row["match_id"] for row in rows}
+    result = await db.execute(
+        select(Match.id, Match.status, Match.season_id).where(Match.id.in_(match_ids))
+    )
+    matches = {id: (status, season_id) for id, status, season_id in result.all()}
+    if len(match_ids) == 1:
+        match_id.set(next(iter(match_ids)))
+    if len(matches) != len(match_ids):
+        raise HTTPException(status_code=404, detail="Match not found")
+    if any(status != EventStatus.ONGOING for status, _ in matches.values()):
+        raise HTTPException(status_code=400, detail="Match is not active")
+    team_ids = {row["team_id"] for row in rows if row["team_id"] is not None}
+    teams = {}
+    if team_ids:
+        result = await db.execute(
+            select(Team.id, Team.season_id).where(Team.id.in_(team_ids))
+        )
+        teams = dict(result.all())
+        if len(teams) != len(team_ids):
+            raise HTTPException(status_code=404, detail="Team not found")
+    for row in rows:
+        season_id = matches[row["match_id"]][1]
+        team_id = row["team_id"]
+        if team_id is not None and season_id not in (None, teams[team_id]):
+            raise HTTPException(
+                status_code=400, detail="Team is not in the season of the match"
+            )
+        row["season_id"] = NO_SEASON if season_id is None else season_id
+
+    stmt = (
+        insert(ScoreEvent)
+        .on_conflict_do_nothing(index_elements=["controller_id", "seq", "season_id"])
+        .returning(
+            ScoreEvent.match_id,
+            ScoreEvent.team_id,
+            ScoreEvent.kind,
+            ScoreEvent.points,
+            ScoreEvent.gong,
+            ScoreEvent.cube,
+        )
+    )
+    try:
+        result = await db.execute(stmt, rows)
+        inserted = result.all()
+        points = defaultdict(int)
+        for event_match_id, team_id, _, value, _, _ in inserted:
+            season_id = matches[event_match_id][1]
+            if value and team_id is not None and season_id is not None:
+                points[season_id, team_id] += value
+        await add_points(db, points)
+        gongs = [e for e in inserted if e.kind == ScoreEventKind.GONG]
+        await append_timelines(
+            db, {e.match_id: matches[e.match_id][1] for e in gongs}, gongs
+        )
+        await db.commit()
+    except IntegrityError as e:
+        sqlstate, constraint = violation(e)
+        if sqlstate == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=409, detail="Gong already recorded")
+        # The team or the match was deleted since the batch was checked.
+        if sqlstate == FOREIGN_KEY_VIOLATION and "team_id" in (constraint or ""):
+            raise HTTPException(status_code=404, detail="Team not found")
+        if sqlstate == FOREIGN_KEY_VIOLATION and "match_id" in (constraint or ""):
+            raise HTTPException(status_code=404, detail="Match not found")
+        raise
+    for key in keys:
+        recent_events.add(key)
+    duplicates += len(rows) - len(inserted)
+    INGEST_LOGGER.info(
+        "Ingested %d score events, %d duplicates", len(inserted), duplicates
+    )
+    return {"inserted": len(inserted), "duplicates": duplicates}
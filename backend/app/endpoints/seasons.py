@@ -1,35 +1,137 @@
-from db.models import Season, EventStatus, Match
-from db.interface import get_session
-from fastapi import Depends, HTTPException
+from db.models import (
+    Season,
+    EventStatus,
+    Match,
+    SeasonDashboard,
+    SeasonWithRelations,
+    Team,
+    TeamStanding,
+)
+from db.interface import get_read_session, get_session
+from db.partitions import is_detached
+from db.standings import move_standings, rebuild_standings
+from app.live import hub
+from app.cache import dump_json, response_cache
+from app.snapshots import snapshot_archiver, snapshot_store
+from app.query import (
+    MAX_PAGE_SIZE,
+    list_events,
+    list_query,
+    patch_values,
+    raise_not_updated,
+    update_by_id,
+)
+from fastapi import Depends, Header, HTTPException, Query, Response
+from app.idempotency import claim_key, recent_transitions, transition_key
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter
 from datetime import datetime
 
 router = APIRouter()
 
-
-@router.get("/seasons", response_model=List[Season], tags=["seasons"])
-async def list_seasons(db: AsyncSession = Depends(get_session)) -> List[Season]:
+SEASON_RELATIONS = {
+    "matches": Season.matches,
+    "teams": Season.teams,
+    "standings": Season.standings,
+}
+
+
+def parse_include(include: str) -> List[str]:
+    names = [n for n in include.split(",") if n]
+    unknown = [n for n in names if n not in SEASON_RELATIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown relations: {', '.join(unknown)}"
+        )
+    return names
+
+
+@response_cache.cached("seasons")
+async def list_season_page(db: AsyncSession, **options) -> List[Season]:
+    return await list_events(db, Season, **options)
+
+
+@router.get(
+    "/seasons",
+    response_model=List[SeasonWithRelations],
+    tags=["seasons"],
+)
+async def list_seasons(
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[EventStatus] = None,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+) -> List[SeasonWithRelations]:
     """
-    Lists all seasons.
+    Lists a page of seasons ordered by ID, with the relations requested by
+    `include` embedded.
 
     Args:
+        after (Optional[int]): The ID of the last season of the previous page.
+        limit (Optional[int]): The maximum number of seasons to return, all
+            by default.
+        status (Optional[EventStatus]): The status to filter seasons by.
+        start_from (Optional[datetime]): Only seasons starting at or after this date.
+        start_to (Optional[datetime]): Only seasons starting before this date.
+        fields (Optional[str]): Comma-separated columns to return, all by default.
+        include (Optional[str]): Comma-separated relations to embed in every
+            season, among matches, teams and standings. Each one costs a
+            single query for the whole page.
         db (AsyncSession): The database session.
 
     Returns:
-        List[Season]: A list of all existing seasons.
+        List[SeasonWithRelations]: A page of seasons matching the filters.
     """
-    result = await db.scalars(select(Season))
-    return result.all()
+    options = {
+        "after": after,
+        "limit": limit,
+        "status": status,
+        "start_from": start_from,
+        "start_to": start_to,
+    }
+    if not include:
+        return await list_season_page(db=db, fields=fields, **options)
+    if fields:
+        raise HTTPException(
+            status_code=400, detail="include cannot be combined with fields"
+        )
+    # Embedded relations change without invalidating the season list, so
+    # these pages are not cached.
+    names = parse_include(include)
+    query = list_query(Season, **options).options(
+        *(selectinload(SEASON_RELATIONS[name]) for name in names)
+    )
+    seasons = (await db.scalars(query)).all()
+    return Response(
+        dump_json(
+            [
+                {
+                    **season.model_dump(),
+                    **{name: getattr(season, name) for name in names},
+                }
+                for season in seasons
+            ]
+        ),
+        media_type="application/json",
+    )
 
 
 @router.get("/seasons/{id}", response_model=Season, tags=["seasons"])
+@snapshot_store.serves("season")
+@response_cache.cached("season:{id}")
 async def get_season(id: int, db: AsyncSession = Depends(get_session)) -> Season:
     """
-    Retrieves a season by its ID.
+    Retrieves a season by its ID, from its snapshot once archived.
 
     Args:
         id (int): The ID of the season to retrieve.
@@ -39,9 +141,44 @@ async def get_season(id: int, db: AsyncSession = Depends(get_session)) -> Season
         Season: The season object with the specified ID.
     """
     season = await db.get(Season, id)
+    if season is None:
+        raise HTTPException(status_code=404, detail="Season not found")
     return season
 
 
+@router.get("/seasons/{id}/dashboard", response_model=SeasonDashboard, tags=["seasons"])
+@snapshot_store.serves("dashboard")
+async def get_season_dashboard(
+    id: int, db: AsyncSession = Depends(get_read_session)
+) -> SeasonDashboard:
+    """
+    Retrieves a season with its matches, teams and standings, in four
+    queries whatever the size of the season, or none once it is archived.
+
+    Args:
+        id (int): The ID of the season.
+        db (AsyncSession): The database session.
+
+    Returns:
+        SeasonDashboard: The season and everything its page shows.
+    """
+    season = await db.get(
+        Season,
+        id,
+        options=[selectinload(relation) for relation in SEASON_RELATIONS.values()],
+    )
+    if season is None:
+        raise HTTPException(status_code=404, detail="Season not found")
+    # Dumped as its snapshot is, so that archiving changes no byte of it.
+    dashboard = SeasonDashboard(
+        season=season,
+        matches=season.matches,
+        teams=season.teams,
+        standings=season.standings,
+    )
+    return Response(dump_json(dashboard), media_type="application/json")
+
+
 @router.post("/seasons", response_model=Season, tags=["seasons"])
 async def create_season(
     season: Season, db: AsyncSession = Depends(get_session)
@@ -64,6 +201,7 @@ async def create_season(
     db.add(season)
     await db.commit()
     await db.refresh(season)
+    await response_cache.invalidate("seasons")
     return season
 
 
@@ -82,14 +220,19 @@ async def update_season(
     Returns:
         Season: The updated season object.
     """
-    season = Season.model_validate(season.model_dump())
-    existing_season = await db.get(Season, id)
-    if existing_season is None:
+    values = patch_values(Season, season)
+    if not values:
+        return await get_season(id=id, db=db)
+    # Locked before the update, which may take the season out of completed.
+    archived = await snapshot_store.lock(db, id)
+    season = await update_by_id(db, Season, id, values)
+    if season is None:
         raise HTTPException(status_code=404, detail="Season not found")
-    existing_season.update_from_dict(season.model_dump(exclude_unset=True))
     await db.commit()
-    await db.refresh(existing_season)
-    return existing_season
+    snapshot_store.discard(archived)
+    await response_cache.invalidate("seasons", f"season:{id}")
+    hub.publish_season(season)
+    return season
 
 
 @router.delete("/seasons/{id}", tags=["seasons"])
@@ -104,60 +247,105 @@ async def delete_season(id: int, db: AsyncSession = Depends(get_session)):
     season = await db.get(Season, id)
     if season is None:
         raise HTTPException(status_code=404, detail="Season not found")
+    archived = await snapshot_store.lock(db, id)
     await db.delete(season)
     await db.commit()
+    snapshot_store.discard(archived)
+    await response_cache.invalidate(
+        "seasons",
+        f"season:{id}",
+        f"season:{id}:matches",
+        f"season:{id}:teams",
+        f"matches:{id}",
+        "matches:None",
+    )
 
 
 @router.post("/seasons/{id}/start", tags=["seasons"])
-async def start_season(id: int, db: AsyncSession = Depends(get_session)):
+async def start_season(
+    id: int,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_session),
+):
     """
     Starts a season by its ID.
 
     Args:
         id (int): The ID of the season to start.
+        idempotency_key (Optional[str]): Makes retries of the request return
+            the state of the first one instead of a conflict.
         db (AsyncSession): The database session.
 
     Returns:
         Season: The updated season object.
     """
-    season = await db.get(Season, id)
+    key = transition_key("season", id, "start", idempotency_key)
+    if key in recent_transitions:
+        return recent_transitions.get(key)
+    if not await claim_key(db, key):
+        return await get_season(id=id, db=db)
+    season = await update_by_id(
+        db,
+        Season,
+        id,
+        {"status": EventStatus.ONGOING, "start": func.now()},
+        Season.status == EventStatus.PENDING,
+    )
     if season is None:
-        raise HTTPException(status_code=404, detail="Season not found")
-    if season.status != EventStatus.PENDING:
-        raise HTTPException(status_code=400, detail="Season is not pending")
-    season.status = EventStatus.ONGOING
-    season.start = datetime.now()
+        await raise_not_updated(db, Season, id, "Season is not pending")
     await db.commit()
-    await db.refresh(season)
+    await response_cache.invalidate("seasons", f"season:{id}")
+    hub.publish_season(season)
+    if key is not None:
+        recent_transitions.add(key, season)
     return season
 
 
 @router.post("/seasons/{id}/end", tags=["seasons"])
-async def end_season(id: int, db: AsyncSession = Depends(get_session)):
+async def end_season(
+    id: int,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_session),
+):
     """
-    Ends a season by its ID.
+    Ends a season by its ID, and wakes the archiver to freeze it into a
+    snapshot.
 
     Args:
         id (int): The ID of the season to end.
+        idempotency_key (Optional[str]): Makes retries of the request return
+            the state of the first one instead of a conflict.
         db (AsyncSession): The database session.
 
     Returns:
         Season: The updated season object.
     """
-
-    season = await db.get(Season, id)
+    key = transition_key("season", id, "end", idempotency_key)
+    if key in recent_transitions:
+        return recent_transitions.get(key)
+    if not await claim_key(db, key):
+        return await get_season(id=id, db=db)
+    season = await update_by_id(
+        db,
+        Season,
+        id,
+        {"status": EventStatus.COMPLETED, "end": func.now()},
+        Season.status == EventStatus.ONGOING,
+    )
     if season is None:
-        raise HTTPException(status_code=404, detail="Season not found")
-    if season.status != EventStatus.ONGOING:
-        raise HTTPException(status_code=400, detail="Season is not active")
-    season.status = EventStatus.COMPLETED
-    season.end = datetime.now()
+        await raise_not_updated(db, Season, id, "Season is not active")
     await db.commit()
-    await db.refresh(season)
+    await response_cache.invalidate("seasons", f"season:{id}")
+    hub.publish_season(season)
+    snapshot_archiver.request()
+    if key is not None:
+        recent_transitions.add(key, season)
     return season
 
 
 @router.get("/seasons/{id}/matches", tags=["seasons"])
+@snapshot_store.serves("matches")
+@response_cache.cached("season:{id}:matches")
 async def list_matches_for_season(id: int, db: AsyncSession = Depends(get_session)):
     """
     Lists all matches for a season by its ID.
@@ -176,6 +364,8 @@ async def list_matches_for_season(id: int, db: AsyncSession = Depends(get_sessio
 
 
 @router.get("/seasons/{id}/teams", tags=["seasons"])
+@snapshot_store.serves("teams")
+@response_cache.cached("season:{id}:teams")
 async def list_teams_for_season(id: int, db: AsyncSession = Depends(get_session)):
     """
     Lists all teams for a season by its ID.
@@ -191,3 +381,175 @@ async def list_teams_for_season(id: int, db: AsyncSession = Depends(get_session)
     if season is None:
         raise HTTPException(status_code=404, detail="Season not found")
     return season.teams
+
+
+@router.post("/seasons/{id}/teams:bulk", response_model=List[Team], tags=["seasons"])
+async def bulk_create_teams(
+    id: int,
+    teams: List[Team],
+    upsert: bool = False,
+    db: AsyncSession = Depends(get_session),
+) -> List[Team]:
+    """
+    Creates all the teams of a season at once.
+
+    The season is validated once and the teams are written with a single
+    multi-row insert. With `upsert`, teams whose name already exists are
+    updated and moved to this season instead of failing the request, and
+    leave the standings of their previous season.
+
+    Args:
+        id (int): The ID of the season.
+        teams (List[Team]): The teams to create.
+        upsert (bool): Whether to update existing teams with the same name.
+        db (AsyncSession): The database session.
+
+    Returns:
+        List[Team]: The created or updated teams.
+    """
+    if not teams:
+        return []
+    rows = {}
+    for team in teams:
+        if team.id is not None:
+            raise HTTPException(status_code=400, detail="ID must be None")
+        if team.name is None:
+            raise HTTPException(status_code=400, detail="Name must be provided")
+        rows[team.name] = {"name": team.name, "color": team.color, "season_id": id}
+    if not upsert and len(rows) != len(teams):
+        raise HTTPException(status_code=409, detail="Team names must be unique")
+
+    season = await db.get(Season, id)
+    if season is None:
+        raise HTTPException(status_code=404, detail="Season not found")
+
+    moved_from = set()
+    stmt = insert(Team).values(list(rows.values()))
+    if upsert:
+        result = await db.scalars(
+            select(Team.season_id).where(Team.name.in_(rows), Team.season_id != id)
+        )
+        moved_from.update(result.all())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Team.name],
+            set_={"color": stmt.excluded.color, "season_id": stmt.excluded.season_id},
+        )
+    try:
+        result = await db.scalars(
+            stmt.returning(Team), execution_options={"populate_existing": True}
+        )
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Team name already exists")
+    created = [team.model_dump() for team in result.all()]
+    await move_standings(db, [team["id"] for team in created], id)
+    archived = await snapshot_store.lock(db, id, *moved_from)
+    await db.commit()
+    snapshot_store.discard(archived)
+    await response_cache.invalidate(
+        f"season:{id}:teams", *(f"season:{s}:teams" for s in moved_from)
+    )
+    return created
+
+
+@router.post("/seasons/{id}/matches:bulk", response_model=List[Match], tags=["seasons"])
+async def bulk_create_matches(
+    id: int, matches: List[Match], db: AsyncSession = Depends(get_session)
+) -> List[Match]:
+    """
+    Creates all the matches of a season at once.
+
+    The season is validated once and the matches are written with a single
+    multi-row insert.
+
+    Args:
+        id (int): The ID of the season.
+        matches (List[Match]): The matches to create.
+        db (AsyncSession): The database session.
+
+    Returns:
+        List[Match]: The created matches.
+    """
+    if not matches:
+        return []
+    rows = []
+    for match in matches:
+        match = Match.model_validate(match.model_dump())
+        if match.id is not None:
+            raise HTTPException(status_code=400, detail="ID must be None")
+        if match.name is None:
+            raise HTTPException(status_code=400, detail="Name must be provided")
+        rows.append(match.model_dump(exclude={"id"}) | {"season_id": id})
+
+    season = await db.get(Season, id)
+    if season is None:
+        raise HTTPException(status_code=404, detail="Season not found")
+
+    result = await db.scalars(insert(Match).values(rows).returning(Match))
+    created = [match.model_dump() for match in result.all()]
+    archived = await snapshot_store.lock(db, id)
+    await db.commit()
+    snapshot_store.discard(archived)
+    await response_cache.invalidate(
+        "matches:None", f"matches:{id}", f"season:{id}:matches"
+    )
+    return created
+
+
+@router.get(
+    "/seasons/{id}/standings", response_model=List[TeamStanding], tags=["seasons"]
+)
+@snapshot_store.serves("standings")
+async def list_standings_for_season(
+    id: int, db: AsyncSession = Depends(get_read_session)
+) -> List[TeamStanding]:
+    """
+    Lists the standings of a season, best team first.
+
+    Args:
+        id (int): The ID of the season.
+        db (AsyncSession): The database session.
+
+    Returns:
+        List[TeamStanding]: The standings of every team of the season.
+    """
+    season = await db.get(Season, id)
+    if season is None:
+        raise HTTPException(status_code=404, detail="Season not found")
+    result = await db.scalars(
+        select(TeamStanding)
+        .where(TeamStanding.season_id == id)
+        .order_by(TeamStanding.points.desc(), TeamStanding.team_id)
+    )
+    return result.all()
+
+
+@router.post(
+    "/seasons/{id}/standings/rebuild",
+    response_model=List[TeamStanding],
+    tags=["seasons"],
+)
+async def rebuild_standings_for_season(
+    id: int, db: AsyncSession = Depends(get_session)
+) -> List[TeamStanding]:
+    """
+    Rebuilds the standings of a season from its score history.
+
+    Args:
+        id (int): The ID of the season.
+        db (AsyncSession): The database session.
+
+    Returns:
+        List[TeamStanding]: The rebuilt standings of the season.
+    """
+    season = await db.get(Season, id)
+    if season is None:
+        raise HTTPException(status_code=404, detail="Season not found")
+    if await is_detached(db, id):
+        raise HTTPException(
+            status_code=409, detail="Score history of the season is detached"
+        )
+    await rebuild_standings(db, id)
+    archived = await snapshot_store.lock(db, id)
+    await db.commit()
+    snapshot_store.discard(archived)
+    return await list_standings_for_season(id=id, db=db)
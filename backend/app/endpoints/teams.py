@@ -1,6 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
-from db.models import Team, Season
-from db.interface import get_session
+from db.models import Team, Season, TeamStanding
+from db.interface import get_read_session, get_session
+from app.cache import response_cache
+from db.standings import move_standings
+from app.snapshots import snapshot_store
+from app.query import UNIQUE_VIOLATION, patch_values, update_by_id
+from sqlalchemy.exc import IntegrityError
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
 
@@ -29,13 +34,18 @@ async def create_team(team: Team, db: AsyncSession = Depends(get_session)) -> Te
     if season is None:
         raise HTTPException(status_code=404, detail="Season not found")
     db.add(team)
+    await db.flush()
+    db.add(TeamStanding(season_id=team.season_id, team_id=team.id))
+    archived = await snapshot_store.lock(db, team.season_id)
     await db.commit()
     await db.refresh(team)
+    snapshot_store.discard(archived)
+    await response_cache.invalidate(f"season:{team.season_id}:teams")
     return team
 
 
 @router.get("/teams/{id}", response_model=Team, tags=["teams"])
-async def get_team(id: int, db: AsyncSession = Depends(get_session)) -> Team:
+async def get_team(id: int, db: AsyncSession = Depends(get_read_session)) -> Team:
     """
     Retrieves a team by its ID.
 
@@ -57,7 +67,8 @@ async def update_team(
     id: int, team: Team, db: AsyncSession = Depends(get_session)
 ) -> Team:
     """
-    Updates a team by its ID.
+    Updates a team by its ID. A team moved to another season starts over
+    in its standings.
 
     Args:
         id (int): The ID of the team to update.
@@ -67,13 +78,27 @@ async def update_team(
     Returns:
         Team: The updated team object.
     """
-    existing_team = await db.get(Team, id)
-    if existing_team is None:
+    values = patch_values(Team, team)
+    if not values:
+        return await get_team(id, db)
+    try:
+        result = await update_by_id(db, Team, id, values, previous="season_id")
+    except IntegrityError as e:
+        if getattr(e.orig, "sqlstate", None) == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=409, detail="Team name already exists")
+        raise HTTPException(status_code=404, detail="Season not found")
+    if result is None:
         raise HTTPException(status_code=404, detail="Team not found")
-    existing_team.update_from_dict(team.model_dump(exclude_unset=True))
+    team, previous_season_id = result
+    if team.season_id != previous_season_id:
+        await move_standings(db, [team.id], team.season_id)
+    archived = await snapshot_store.lock(db, previous_season_id, team.season_id)
     await db.commit()
-    await db.refresh(existing_team)
-    return existing_team
+    snapshot_store.discard(archived)
+    await response_cache.invalidate(
+        f"season:{previous_season_id}:teams", f"season:{team.season_id}:teams"
+    )
+    return team
 
 
 @router.delete("/teams/{id}", tags=["teams"])
@@ -88,5 +113,9 @@ async def delete_team(id: int, db: AsyncSession = Depends(get_session)):
     team = await db.get(Team, id)
     if team is None:
         raise HTTPException(status_code=404, detail="Team not found")
+    season_id = team.season_id
+    archived = await snapshot_store.lock(db, season_id)
     await db.delete(team)
     await db.commit()
+    snapshot_store.discard(archived)
+    await response_cache.invalidate(f"season:{season_id}:teams")
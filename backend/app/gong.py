@@ -0,0 +1,499 @@
+import asyncio
+import heapq
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    case,
+    cast,
+    column,
+    func,
+    literal,
+    select,
+    tuple_,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.live import hub
+from app.metrics import GONG_LAG, GONGS
+from app.respawn import respawn_engine
+from db.confdb import RESPAWN_ENGINE
+from db.events import event_bus
+from db.interface import connect_dedicated, engine
+from db.models import EventStatus, Match, ScoreEvent, ScoreEventKind
+from db.models.scores import NO_SEASON
+from db.standings import add_points
+from db.timelines import append_timelines
+from log_utils import API_LOGGER
+from rules import (
+    CUBE_POINTS,
+    GONG_SECONDS,
+    GONGS_PER_ROUND,
+    ROUNDS,
+    THRONE_CUBE,
+    THRONE_CUBE_POINTS,
+)
+
+MATCH_GONGS = ROUNDS * GONGS_PER_ROUND
+RETRY_SECONDS = 1.0
+# Arbitrary key of the Postgres advisory lock held by the running scheduler.
+SCHEDULER_LOCK_ID = 0x60496E67
+# Interval at which standby schedulers try to take over, and the running one
+# checks that it still holds the lock.
+ELECTION_SECONDS = 5.0
+
+
+class Tick(NamedTuple):
+    match_id: int
+    gong: int
+    round: int
+    due: datetime
+
+
+class MatchClock(NamedTuple):
+    season_id: Optional[int]
+    start: datetime
+
+
+def gong_due(start: datetime, gong: int) -> datetime:
+    return start + timedelta(seconds=(gong + 1) * GONG_SECONDS)
+
+
+def gong_query(ticks: List[Tick], seasons: Dict[int, Optional[int]]):
+    """
+    Builds the insert awarding the given gongs, of matches by ID with their
+    season ID.
+
+    Every gong goes to the team of the latest capture of each cube up to its
+    due time, for the points of rules.gong_points. Gongs already recorded are
+    skipped by the unique index on (match_id, gong, cube), which makes
+    awarding idempotent across restarts and workers.
+    """
+    tick = values(
+        column("match_id", Integer),
+        column("season_id", Integer),
+        column("gong", Integer),
+        column("round", Integer),
+        column("due", DateTime(timezone=True)),
+        name="tick",
+    ).data(
+        [
+            (
+                t.match_id,
+                NO_SEASON if seasons[t.match_id] is None else seasons[t.match_id],
+                t.gong,
+                t.round,
+                t.due,
+            )
+            for t in ticks
+        ]
+    )
+    # Typed explicitly so the statement also works with literal values.
+    due = cast(tick.c.due, DateTime(timezone=True))
+    owners = (
+        select(
+            tick.c.match_id,
+            tick.c.season_id,
+            ScoreEvent.team_id,
+            ScoreEvent.cube,
+            tick.c.round,
+            tick.c.gong,
+            due.label("due"),
+        )
+        .join(
+            tick,
+            (tick.c.season_id == ScoreEvent.season_id)
+            & (tick.c.match_id == ScoreEvent.match_id),
+        )
+        .where(
+            ScoreEvent.kind == ScoreEventKind.CAPTURE,
+            ScoreEvent.timestamp <= due,
+        )
+        .distinct(tick.c.match_id, tick.c.gong, ScoreEvent.cube)
+        .order_by(
+            tick.c.match_id,
+            tick.c.gong,
+            ScoreEvent.cube,
+            ScoreEvent.timestamp.desc(),
+            ScoreEvent.id.desc(),
+        )
+        .subquery()
+    )
+    kind = literal(ScoreEventKind.GONG, ScoreEvent.__table__.c.kind.type)
+    # The throne scores only at the first gong of each round, but its gongs
+    # are all recorded, as its holder is delayed in the respawn rings.
+    throne_points = case(
+        (
+            owners.c.gong % GONGS_PER_ROUND == 0,
+            case(dict(enumerate(THRONE_CUBE_POINTS)), value=owners.c.round),
+        ),
+        else_=0,
+    )
+    points = case(
+        dict(enumerate(CUBE_POINTS[:THRONE_CUBE])),
+        value=owners.c.cube,
+        else_=throne_points,
+    )
+    return (
+        insert(ScoreEvent)
+        .from_select(
+            [
+                "match_id",
+                "season_id",
+                "team_id",
+                "kind",
+                "cube",
+                "round",
+                "gong",
+                "points",
+                "timestamp",
+            ],
+            select(
+                owners.c.match_id,
+                owners.c.season_id,
+                owners.c.team_id,
+                kind,
+                owners.c.cube,
+                owners.c.round,
+                owners.c.gong,
+                points,
+                owners.c.due,
+            ).where(owners.c.team_id.is_not(None)),
+        )
+        .on_conflict_do_nothing()
+        .returning(
+            ScoreEvent.match_id,
+            ScoreEvent.gong,
+            ScoreEvent.team_id,
+            ScoreEvent.points,
+            ScoreEvent.cube,
+        )
+    )
+
+
+def throne_query(ticks: List[Tick], seasons: Dict[int, Optional[int]]):
+    """
+    Builds the query of the team holding the throne at each of the given
+    gongs, including the gongs awarded by other workers.
+    """
+    season_ids = {NO_SEASON if s is None else s for s in seasons.values()}
+    return select(ScoreEvent.match_id, ScoreEvent.gong, ScoreEvent.team_id).where(
+        ScoreEvent.season_id.in_(season_ids),
+        ScoreEvent.kind == ScoreEventKind.GONG,
+        ScoreEvent.cube == THRONE_CUBE,
+        tuple_(ScoreEvent.match_id, ScoreEvent.gong).in_(
+            [(tick.match_id, tick.gong) for tick in ticks]
+        ),
+    )
+
+
+def recorded_query(ticks: List[Tick], seasons: Dict[int, Optional[int]]):
+    """
+    Builds the query of the given gongs that already have events recorded.
+    """
+    season_ids = {NO_SEASON if s is None else s for s in seasons.values()}
+    return (
+        select(ScoreEvent.match_id, ScoreEvent.gong)
+        .distinct()
+        .where(
+            ScoreEvent.season_id.in_(season_ids),
+            ScoreEvent.kind == ScoreEventKind.GONG,
+            tuple_(ScoreEvent.match_id, ScoreEvent.gong).in_(
+                [(tick.match_id, tick.gong) for tick in ticks]
+            ),
+        )
+    )
+
+
+class GongScheduler:
+    """
+    Sounds the gong of every ongoing match and awards the points of the cubes
+    each team controls.
+
+    Gongs are due every GONG_SECONDS from the match start, computed from the
+    start rather than from the previous tick so that they never drift. All
+    the gongs due at a wake-up, across matches, are written in one statement.
+
+    Only one process runs the scheduler: the one holding an advisory lock on
+    a dedicated connection. The others stand by and take over when the lock
+    is released, e.g. when the running process dies. Should two of them run
+    anyway, the unique index on gong events lets only one award each gong.
+    With `respawns`, the running scheduler also runs the respawn engine.
+    """
+
+    def __init__(
+        self, election_seconds: float = ELECTION_SECONDS, respawns: bool = False
+    ):
+        self.election_seconds = election_seconds
+        self.respawns = respawns
+        self.clocks: Dict[int, MatchClock] = {}
+        self.heap: List[Tuple[datetime, int, int]] = []
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.leading = False
+
+    async def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def recover(self) -> None:
+        """
+        Schedules the ongoing matches from the database, resuming after the
+        last gong recorded for each of them. Gongs missed while the server
+        was down are awarded on the first tick.
+        """
+        last_gong = func.max(ScoreEvent.gong).filter(
+            ScoreEvent.kind == ScoreEventKind.GONG
+        )
+        async with AsyncSession(engine) as db:
+            result = await db.execute(
+                select(Match.id, Match.season_id, Match.start, last_gong)
+                .outerjoin(ScoreEvent, ScoreEvent.match_id == Match.id)
+                .where(Match.status == EventStatus.ONGOING)
+                .group_by(Match.id)
+            )
+            rows = result.all()
+        for match_id, season_id, start, gong in rows:
+            self.register(match_id, season_id, start, -1 if gong is None else gong)
+        API_LOGGER.info("Gong scheduler tracking %d matches", len(self.clocks))
+
+    def register(
+        self,
+        match_id: int,
+        season_id: Optional[int],
+        start: Optional[datetime],
+        last_gong: int = -1,
+    ) -> None:
+        if start is None or last_gong + 1 >= MATCH_GONGS:
+            return
+        self.clocks[match_id] = MatchClock(season_id, start)
+        respawn_engine.track(match_id, season_id, last_gong)
+        heapq.heappush(
+            self.heap, (gong_due(start, last_gong + 1), match_id, last_gong + 1)
+        )
+        self.wakeup.set()
+
+    def unregister(self, match_id: int) -> None:
+        self.clocks.pop(match_id, None)
+        respawn_engine.untrack(match_id)
+
+    def track(
+        self, match_id: int, season_id: Optional[int], start: Optional[datetime]
+    ) -> None:
+        """
+        Registers a match that just started, in the running scheduler.
+        """
+        if self.leading:
+            self.register(match_id, season_id, start)
+        event_bus.publish(
+            "gong", {"match_id": match_id, "season_id": season_id, "start": start}
+        )
+
+    def untrack(self, match_id: int) -> None:
+        """
+        Unregisters a match that just ended, in the running scheduler.
+        """
+        self.unregister(match_id)
+        event_bus.publish("gong", {"match_id": match_id})
+
+    def on_notification(self, data: Dict[str, object]) -> None:
+        if not self.leading:
+            return
+        if "start" in data:
+            start = data["start"] and datetime.fromisoformat(data["start"])
+            self.register(data["match_id"], data["season_id"], start)
+        else:
+            self.unregister(data["match_id"])
+
+    def is_current(self, due: datetime, match_id: int, gong: int) -> bool:
+        # Heap entries of unregistered or re-registered matches are left in
+        # place and dropped when they come due.
+        clock = self.clocks.get(match_id)
+        return clock is not None and gong_due(clock.start, gong) == due
+
+    def status(self) -> Dict[int, Dict[str, object]]:
+        return {
+            match_id: {"gong": gong, "due": due}
+            for due, match_id, gong in self.heap
+            if self.is_current(due, match_id, gong)
+        }
+
+    def due_ticks(self, now: datetime) -> List[Tick]:
+        ticks = []
+        while self.heap and self.heap[0][0] <= now:
+            due, match_id, gong = heapq.heappop(self.heap)
+            if not self.is_current(due, match_id, gong):
+                continue
+            clock = self.clocks[match_id]
+            # Catches up on every gong already due, e.g. after a restart.
+            while gong < MATCH_GONGS and gong_due(clock.start, gong) <= now:
+                ticks.append(
+                    Tick(
+                        match_id,
+                        gong,
+                        gong // GONGS_PER_ROUND,
+                        gong_due(clock.start, gong),
+                    )
+                )
+                gong += 1
+        return ticks
+
+    def schedule_next(self, ticks: List[Tick]) -> None:
+        last = {}
+        for tick in ticks:
+            last[tick.match_id] = max(tick.gong, last.get(tick.match_id, -1))
+        for match_id, gong in last.items():
+            clock = self.clocks.get(match_id)
+            if clock is None:
+                continue
+            if gong + 1 < MATCH_GONGS:
+                heapq.heappush(
+                    self.heap, (gong_due(clock.start, gong + 1), match_id, gong + 1)
+                )
+            else:
+                del self.clocks[match_id]
+
+    async def run(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = await connect_dedicated()
+                while not await conn.fetchval(
+                    "SELECT pg_try_advisory_lock($1)", SCHEDULER_LOCK_ID
+                ):
+                    await asyncio.sleep(self.election_seconds)
+                self.clocks.clear()
+                self.heap.clear()
+                await self.recover()
+                if self.respawns:
+                    await respawn_engine.start()
+                self.leading = True
+                await self.tick(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                API_LOGGER.exception("Gong scheduler stopped, standing by")
+            finally:
+                self.leading = False
+                if self.respawns:
+                    await respawn_engine.stop()
+                    respawn_engine.matches.clear()
+                if conn is not None:
+                    # Closing the connection releases the lock.
+                    conn.terminate()
+            await asyncio.sleep(RETRY_SECONDS)
+
+    async def tick(self, conn) -> None:
+        """
+        Awards the gongs as they come due, for as long as the connection
+        holding the scheduler lock is alive.
+        """
+        while True:
+            delay = self.election_seconds
+            if self.heap:
+                delay = (self.heap[0][0] - datetime.now(timezone.utc)).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(
+                        self.wakeup.wait(), min(delay, self.election_seconds)
+                    )
+                except TimeoutError:
+                    await conn.fetchval("SELECT 1")
+                self.wakeup.clear()
+                continue
+
+            ticks = self.due_ticks(datetime.now(timezone.utc))
+            if not ticks:
+                continue
+            try:
+                await self.award(ticks)
+            except Exception:
+                API_LOGGER.exception("Failed to award %d gongs, retrying", len(ticks))
+                first = {}
+                for tick in reversed(ticks):
+                    first[tick.match_id] = tick
+                for tick in first.values():
+                    heapq.heappush(self.heap, (tick.due, tick.match_id, tick.gong))
+                await asyncio.sleep(RETRY_SECONDS)
+                continue
+            self.schedule_next(ticks)
+
+    async def award(self, ticks: List[Tick]) -> None:
+        """
+        Awards the given gongs and announces them, except those that already
+        had events recorded, by another process, which announced them.
+        """
+        start = time.perf_counter()
+        seasons = {t.match_id: self.clocks[t.match_id].season_id for t in ticks}
+        async with AsyncSession(engine) as db:
+            result = await db.execute(gong_query(ticks, seasons))
+            awarded = result.all()
+            points = defaultdict(int)
+            for match_id, _, team_id, value, _ in awarded:
+                season_id = seasons[match_id]
+                if season_id is not None:
+                    points[season_id, team_id] += value
+            await add_points(db, points)
+            await append_timelines(db, seasons, awarded)
+            # Gongs without events inserted were either already awarded, or
+            # sounded while nobody held a cube.
+            inserted = {(match_id, gong) for match_id, gong, *_ in awarded}
+            missed = [t for t in ticks if (t.match_id, t.gong) not in inserted]
+            if missed:
+                result = await db.execute(recorded_query(missed, seasons))
+                recorded = set(result.all())
+                ticks = [t for t in ticks if (t.match_id, t.gong) not in recorded]
+            throne = {}
+            if respawn_engine.task is not None and ticks:
+                result = await db.execute(throne_query(ticks, seasons))
+                throne = {(m, g): team_id for m, g, team_id in result.all()}
+            await db.commit()
+
+        written = datetime.now(timezone.utc)
+        for tick in ticks:
+            GONG_LAG.observe((written - tick.due).total_seconds())
+        GONGS.inc(len(ticks))
+        by_gong = defaultdict(lambda: defaultdict(int))
+        for match_id, gong, team_id, value, _ in awarded:
+            by_gong[match_id, gong][team_id] += value
+        for tick in ticks:
+            released = respawn_engine.on_gong(
+                tick.match_id, tick.gong, throne.get((tick.match_id, tick.gong))
+            )
+            hub.publish(
+                f"match:{tick.match_id}",
+                {
+                    "type": "gong",
+                    "data": {
+                        "match_id": tick.match_id,
+                        "gong": tick.gong,
+                        "round": tick.round,
+                        "points": by_gong[tick.match_id, tick.gong],
+                        "released": [
+                            {"team_id": team_id, "player": player}
+                            for team_id, player in released
+                        ],
+                    },
+                },
+            )
+        API_LOGGER.debug(
+            "Awarded %d gongs in %.1f ms",
+            len(ticks),
+            (time.perf_counter() - start) * 1000,
+        )
+
+
+gong_scheduler = GongScheduler(respawns=RESPAWN_ENGINE)
+event_bus.subscribe("gong", gong_scheduler.on_notification)
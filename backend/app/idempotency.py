@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db.confdb import IDEMPOTENCY_WINDOW
+from db.models import IdempotencyKey
+
+
+class RecentKeys:
+    """
+    Bounded window of the most recently seen idempotency keys of this worker,
+    with an optional value (such as the response) per key.
+
+    The window only saves round trips: keys that fell out of it, or were
+    seen by another worker, are still caught by a unique constraint.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+        return False
+
+    def get(self, key: Hashable) -> Any:
+        return self._entries.get(key)
+
+    def add(self, key: Hashable, value: Any = None) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+recent_events = RecentKeys(IDEMPOTENCY_WINDOW)
+recent_transitions = RecentKeys(IDEMPOTENCY_WINDOW)
+
+
+def transition_key(
+    resource: str, id: int, action: str, key: Optional[str]
+) -> Optional[str]:
+    return None if key is None else f"{resource}:{id}:{action}:{key}"
+
+
+async def claim_key(db: AsyncSession, key: Optional[str]) -> bool:
+    """
+    Records a transition's idempotency key in the caller's transaction.
+
+    Returns False when the key was already recorded, i.e. the request is a
+    retry of a transition that was applied. Requests without a key are always
+    new.
+    """
+    if key is None:
+        return True
+    result = await db.execute(
+        insert(IdempotencyKey)
+        .values(key=key)
+        .on_conflict_do_nothing()
+        .returning(IdempotencyKey.key)
+    )
+    return result.first() is not None
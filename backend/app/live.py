@@ -0,0 +1,61 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Set
+from fastapi.encoders import jsonable_encoder
+from db.events import event_bus
+from db.models import Match, Season
+from log_utils import API_LOGGER
+
+
+class LiveHub:
+    """
+    Fan-out of live updates to streaming subscribers.
+
+    Updates are delivered to the subscribers of this worker and broadcast to
+    those of the other workers through the event bus.
+
+    Every subscriber owns a bounded queue. A slow client never blocks the
+    publisher: when its queue is full, the oldest pending update is dropped.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    @contextmanager
+    def subscribe(self, topic: str) -> Iterator[asyncio.Queue]:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(topic, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def publish(self, topic: str, event: Dict[str, Any]) -> None:
+        self.deliver(topic, event)
+        event_bus.publish("live", {"topic": topic, "event": event})
+
+    def deliver(self, topic: str, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(topic, ()):
+            if queue.full():
+                queue.get_nowait()
+                API_LOGGER.warning("Live subscriber of %s is lagging", topic)
+            queue.put_nowait(event)
+
+    def publish_season(self, season: Season) -> None:
+        event = {"type": "season", "data": jsonable_encoder(season)}
+        self.publish(f"season:{season.id}", event)
+
+    def publish_match(self, match: Match) -> None:
+        event = {"type": "match", "data": jsonable_encoder(match)}
+        self.publish(f"match:{match.id}", event)
+        if match.season_id is not None:
+            self.publish(f"season:{match.season_id}", event)
+
+
+hub = LiveHub()
+event_bus.subscribe("live", lambda data: hub.deliver(data["topic"], data["event"]))
@@ -2,13 +2,62 @@ from fastapi import FastAPI
 from app.endpoints.seasons import router as seasons_router
 from app.endpoints.matches import router as matches_router
 from app.endpoints.teams import router as teams_router
-from db.interface import create_database
+from app.endpoints.scores import router as scores_router
+from app.endpoints.live import router as live_router
+from app.endpoints.diagnostics import router as diagnostics_router
+from app.endpoints.exports import router as exports_router
+from app.endpoints.changes import router as changes_router
+from app.endpoints.respawns import router as respawns_router
+from db.interface import create_database, engine, replica_engine, replica_monitor
+from db.replica import READ_AFTER_HEADER, ReadYourWritesMiddleware
+from db.events import event_bus
+from db.migrations import migrate_database, warm_pool
+from db.partitions import retention_job
+from db.confdb import (
+    ARCHIVE_JOB,
+    BROTLI_QUALITY,
+    COMPRESSION_MIN_SIZE,
+    GONG_SCHEDULER,
+    GZIP_LEVEL,
+    RETENTION_JOB,
+    SNAPSHOT_DIR,
+    STARTUP_MODE,
+)
+from app.gong import gong_scheduler
+from app.snapshots import snapshot_archiver, snapshot_store
+from log_utils import API_LOGGER, RequestContextMiddleware
+from app.metrics import MetricsMiddleware, instrument_engine
+from app.cache import ConditionalGetMiddleware
+from app.compression import CompressionMiddleware
 from fastapi.middleware.cors import CORSMiddleware
+import time
 
 
 async def lifespan(app: FastAPI) -> None:
-    await create_database(hard=True)
+    start = time.perf_counter()
+    if STARTUP_MODE == "reset":
+        await create_database(hard=True)
+    else:
+        await migrate_database()
+    await warm_pool()
+    await event_bus.start()
+    if replica_monitor is not None:
+        await replica_monitor.start()
+    if GONG_SCHEDULER:
+        await gong_scheduler.start()
+    if RETENTION_JOB:
+        await retention_job.start()
+    await snapshot_store.verify()
+    if SNAPSHOT_DIR and ARCHIVE_JOB:
+        await snapshot_archiver.start()
+    API_LOGGER.info("Started in %.0f ms", (time.perf_counter() - start) * 1000)
     yield
+    await gong_scheduler.stop()
+    await retention_job.stop()
+    await snapshot_archiver.stop()
+    await event_bus.stop()
+    if replica_monitor is not None:
+        await replica_monitor.stop()
 
 
 origins = [
@@ -22,6 +71,12 @@ tags_metadata = [
     {"name": "seasons", "description": "Seasons management"},
     {"name": "matches", "description": "Matches management"},
     {"name": "teams", "description": "Teams management"},
+    {"name": "scores", "description": "Score events ingestion"},
+    {"name": "respawns", "description": "Respawn rings of ongoing matches"},
+    {"name": "live", "description": "Live updates streaming"},
+    {"name": "export", "description": "Bulk data export"},
+    {"name": "changes", "description": "Delta synchronization"},
+    {"name": "diagnostics", "description": "Runtime diagnostics"},
 ]
 
 app = FastAPI(
@@ -38,7 +93,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all HTTP methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=[READ_AFTER_HEADER],
+)
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    compresslevel=GZIP_LEVEL,
+    brotli_quality=BROTLI_QUALITY,
 )
+if replica_engine is not None:
+    app.add_middleware(ReadYourWritesMiddleware, engine=engine)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+instrument_engine(engine)
+if replica_engine is not None:
+    instrument_engine(replica_engine)
 app.include_router(seasons_router)
 app.include_router(matches_router)
 app.include_router(teams_router)
+app.include_router(scores_router)
+app.include_router(respawns_router)
+app.include_router(live_router)
+app.include_router(exports_router)
+app.include_router(changes_router)
+app.include_router(diagnostics_router)
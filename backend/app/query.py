@@ -0,0 +1,148 @@
+from datetime import datetime
+from typing import Any, Dict, List, NoReturn, Optional, Tuple, Type
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy import Select, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db.models import EventStatus
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+UNIQUE_VIOLATION = "23505"
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def violation(e: IntegrityError) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Returns the SQLSTATE of an integrity error and the name of the
+    constraint it violated, as reported by the driver.
+    """
+    cause = getattr(e.orig, "__cause__", None)
+    return getattr(e.orig, "sqlstate", None), getattr(cause, "constraint_name", None)
+
+
+def list_query(
+    model: Type[SQLModel],
+    *filters: Any,
+    after: Optional[int] = None,
+    limit: Optional[int] = None,
+    status: Optional[EventStatus] = None,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    fields: Optional[str] = None,
+) -> Select:
+    """
+    Builds the query of a page of seasons or matches ordered by ID, of all
+    of them without `limit`.
+    """
+    table = model.__table__
+    if fields:
+        requested = (n.strip() for n in fields.split(","))
+        names = ["id"] + [n for n in requested if n and n != "id"]
+        unknown = [n for n in names if n not in table.c]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+        query = select(*(table.c[n] for n in names))
+    else:
+        query = select(model)
+
+    query = query.where(*filters)
+    if after is not None:
+        query = query.where(table.c.id > after)
+    if status is not None:
+        query = query.where(table.c.status == status)
+    if start_from is not None:
+        query = query.where(table.c.start >= start_from)
+    if start_to is not None:
+        query = query.where(table.c.start < start_to)
+    return query.order_by(table.c.id).limit(limit)
+
+
+async def list_events(
+    db: AsyncSession,
+    model: Type[SQLModel],
+    *filters: Any,
+    fields: Optional[str] = None,
+    **options: Any,
+) -> List[Any]:
+    """
+    Lists a page of seasons or matches ordered by ID.
+
+    Pages are keyset-paginated: pass the ID of the last row received as
+    `after` to get the next page. When `fields` is given, only the requested
+    columns (and the ID) are selected and plain dicts are returned instead of
+    ORM objects.
+    """
+    query = list_query(model, *filters, fields=fields, **options)
+    if fields:
+        result = await db.execute(query)
+        return [dict(row) for row in result.mappings()]
+    result = await db.scalars(query)
+    return result.all()
+
+
+def patch_values(model: Type[SQLModel], body: SQLModel) -> Dict[str, Any]:
+    """
+    Returns the validated fields set in a PATCH body, without the ID.
+    """
+    data = {name: getattr(body, name) for name in body.model_fields_set - {"id"}}
+    # Table models are not validated when parsed from the request body, and a
+    # PATCH body may leave out fields the model requires.
+    placeholders = dict.fromkeys(model.model_fields, None)
+    try:
+        validated = model.model_validate(placeholders | data)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return validated.model_dump(include=set(data))
+
+
+async def update_by_id(
+    db: AsyncSession,
+    model: Type[SQLModel],
+    id: int,
+    values: Dict[str, Any],
+    *conditions: Any,
+    previous: Optional[str] = None,
+) -> Any:
+    """
+    Updates a row in a single `UPDATE ... RETURNING` statement.
+
+    The update only applies when the row also matches `conditions`, which
+    makes checked state transitions atomic. Returns the updated row, outside
+    of the session so that it stays readable after commit, or None when no
+    row matched. With `previous`, returns a `(row, value)` pair where value is
+    that column before the update, read from a self-join of the statement.
+    """
+    table = model.__table__
+    stmt = update(table).where(table.c.id == id, *conditions).values(values)
+    stmt = stmt.returning(*table.c)
+    if previous is not None:
+        old = table.alias("previous")
+        stmt = stmt.where(old.c.id == table.c.id).returning(
+            old.c[previous].label("previous")
+        )
+    result = await db.execute(stmt)
+    row = result.mappings().one_or_none()
+    if row is None:
+        return None
+    updated = model(**{name: row[name] for name in table.c.keys()})
+    if previous is None:
+        return updated
+    return updated, row["previous"]
+
+
+async def raise_not_updated(
+    db: AsyncSession, model: Type[SQLModel], id: int, detail: str
+) -> NoReturn:
+    """
+    Raises 404 when the row of a failed `update_by_id` does not exist, and 409
+    with `detail` when it exists but did not match the conditions.
+    """
+    if await db.get(model, id) is None:
+        raise HTTPException(status_code=404, detail=f"{model.__name__} not found")
+    raise HTTPException(status_code=409, detail=detail)
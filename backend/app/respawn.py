@@ -0,0 +1,340 @@
+import asyncio
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.live import hub
+from db.confdb import RESPAWN_FLUSH_SECONDS
+from db.events import event_bus
+from db.interface import engine
+from db.models import RespawnEvent, RespawnEventKind, Team
+from log_utils import API_LOGGER
+from rules import PLAYERS_PER_TEAM, RESPAWN_ZONES
+
+FIRST_RING, SECOND_RING = 0, 1
+
+
+def player_key(team_id: int, player: int) -> int:
+    return team_id * PLAYERS_PER_TEAM + player
+
+
+def player_of(key: int) -> Tuple[int, int]:
+    return divmod(key, PLAYERS_PER_TEAM)
+
+
+class Zone:
+    __slots__ = ("rings", "first_taken")
+
+    def __init__(self):
+        self.rings: Tuple[Deque[int], Deque[int]] = (deque(), deque())
+        # Whether the first ring was given to a player since the last gong.
+        self.first_taken = False
+
+
+class MatchRespawns:
+    """
+    The players of a match waiting in the rings of the respawn zones, as
+    player keys in the order they entered each ring.
+    """
+
+    __slots__ = ("season_id", "gong", "teams", "zones", "waiting", "delayed")
+
+    def __init__(self, season_id: Optional[int], gong: int):
+        self.season_id = season_id
+        self.gong = gong
+        self.teams: Optional[Set[int]] = None
+        self.zones = [Zone() for _ in range(RESPAWN_ZONES)]
+        self.waiting: Dict[int, int] = {}
+        self.delayed: Set[int] = set()
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "gong": self.gong,
+            "zones": [
+                {
+                    "zone": index,
+                    "rings": [
+                        [
+                            {
+                                "team_id": player_of(key)[0],
+                                "player": player_of(key)[1],
+                                "delayed": key in self.delayed,
+                            }
+                            for key in ring
+                        ]
+                        for ring in zone.rings
+                    ],
+                }
+                for index, zone in enumerate(self.zones)
+            ],
+        }
+
+
+class RespawnEngine:
+    """
+    Runs the respawn rings of every ongoing match.
+
+    An eliminated player enters the first ring of their zone if nobody did
+    since the last gong, and the second ring otherwise. Every gong releases
+    the players of the first rings and moves those of the second rings to
+    the first, except that players of the team holding the throne stay one
+    more gong in the first ring.
+
+    Rings live in memory and every move is O(1). Moves are recorded in a
+    buffer written to the database in one statement every
+    RESPAWN_FLUSH_SECONDS, and replayed from there on restart, so the moves
+    of the last interval are lost if the process crashes.
+
+    The rings are owned by the one process running the engine: the elected
+    gong scheduler starts it when it takes over and stops it when it steps
+    down. The other workers forward eliminations to it through the event
+    bus.
+    """
+
+    def __init__(self, flush_seconds: float = RESPAWN_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self.matches: Dict[int, MatchRespawns] = {}
+        self.pending: List[Dict[str, Any]] = []
+        self.task: Optional[asyncio.Task] = None
+
+    def track(self, match_id: int, season_id: Optional[int], gong: int = -1) -> None:
+        if match_id not in self.matches:
+            self.matches[match_id] = MatchRespawns(season_id, gong)
+
+    def untrack(self, match_id: int) -> None:
+        self.matches.pop(match_id, None)
+
+    def record(
+        self,
+        match_id: int,
+        key: int,
+        zone: int,
+        kind: RespawnEventKind,
+        ring: Optional[int],
+        gong: int,
+    ) -> None:
+        team_id, player = player_of(key)
+        self.pending.append(
+            {
+                "match_id": match_id,
+                "team_id": team_id,
+                "player": player,
+                "zone": zone,
+                "kind": kind,
+                "ring": None if ring is None else ring + 1,
+                "gong": gong,
+                "timestamp": datetime.now(timezone.utc),
+            }
+        )
+
+    def eliminate(self, match_id: int, team_id: int, player: int, zone: int) -> int:
+        """
+        Sends an eliminated player to a ring of their zone and returns the
+        ring, 1 or 2.
+
+        Raises:
+            KeyError: The match is not ongoing.
+            ValueError: The player is already waiting in a ring.
+        """
+        respawns = self.matches[match_id]
+        key = player_key(team_id, player)
+        if key in respawns.waiting:
+            raise ValueError("Player is already in a respawn ring")
+        area = respawns.zones[zone]
+        ring = SECOND_RING if area.first_taken else FIRST_RING
+        area.first_taken = True
+        area.rings[ring].append(key)
+        respawns.waiting[key] = zone
+        self.record(
+            match_id, key, zone, RespawnEventKind.ELIMINATED, ring, respawns.gong
+        )
+        return ring + 1
+
+    def report(self, match_id: int, team_id: int, player: int, zone: int) -> int:
+        """
+        Eliminates a player and streams the move to the clients following the
+        match.
+        """
+        ring = self.eliminate(match_id, team_id, player, zone)
+        hub.publish(
+            f"match:{match_id}",
+            {
+                "type": "respawn",
+                "data": {
+                    "match_id": match_id,
+                    "team_id": team_id,
+                    "player": player,
+                    "zone": zone,
+                    "ring": ring,
+                },
+            },
+        )
+        return ring
+
+    def on_notification(self, data: Dict[str, int]) -> None:
+        if self.task is None:
+            return
+        try:
+            self.report(**data)
+        except (KeyError, ValueError) as e:
+            API_LOGGER.warning("Ignored a forwarded elimination %s: %s", data, e)
+
+    def on_gong(
+        self, match_id: int, gong: int, throne_team: Optional[int]
+    ) -> List[Tuple[int, int]]:
+        """
+        Moves the rings of a match on a gong and returns the (team_id, player)
+        released.
+        """
+        respawns = self.matches.get(match_id)
+        if respawns is None:
+            return []
+        respawns.gong = gong
+        released = []
+        for index, area in enumerate(respawns.zones):
+            first, second = area.rings
+            held: Deque[int] = deque()
+            for key in first:
+                if player_of(key)[0] == throne_team and key not in respawns.delayed:
+                    respawns.delayed.add(key)
+                    held.append(key)
+                    kind, ring = RespawnEventKind.DELAYED, FIRST_RING
+                else:
+                    respawns.delayed.discard(key)
+                    del respawns.waiting[key]
+                    released.append(player_of(key))
+                    kind, ring = RespawnEventKind.RELEASED, None
+                self.record(match_id, key, index, kind, ring, gong)
+            for key in second:
+                held.append(key)
+                self.record(
+                    match_id, key, index, RespawnEventKind.ADVANCED, FIRST_RING, gong
+                )
+            area.rings = (held, deque())
+            area.first_taken = False
+        return released
+
+    async def season_teams(self, db: AsyncSession, match_id: int) -> Set[int]:
+        respawns = self.matches[match_id]
+        if respawns.teams is None:
+            result = await db.scalars(
+                select(Team.id).where(Team.season_id == respawns.season_id)
+            )
+            respawns.teams = set(result.all())
+        return respawns.teams
+
+    async def start(self) -> None:
+        await self.recover()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+            await self.flush()
+
+    async def recover(self) -> None:
+        """
+        Rebuilds the rings of the tracked matches from their recorded moves.
+        """
+        if not self.matches:
+            return
+        async with AsyncSession(engine) as db:
+            result = await db.scalars(
+                select(RespawnEvent)
+                .where(RespawnEvent.match_id.in_(self.matches))
+                .order_by(RespawnEvent.match_id, RespawnEvent.id)
+            )
+            events = result.all()
+        by_match = defaultdict(list)
+        for event in events:
+            by_match[event.match_id].append(event)
+        for match_id, moves in by_match.items():
+            tracked = self.matches[match_id]
+            respawns = replay(tracked.season_id, moves)
+            respawns.gong = max(respawns.gong, tracked.gong)
+            self.matches[match_id] = respawns
+        API_LOGGER.info("Recovered %d respawn moves", len(events))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        rows, self.pending = self.pending, []
+        try:
+            async with AsyncSession(engine) as db:
+                await db.execute(insert(RespawnEvent), rows)
+                await db.commit()
+        except IntegrityError:
+            # The match or a team was deleted since, retrying cannot succeed.
+            API_LOGGER.exception("Dropped %d respawn moves", len(rows))
+        except Exception:
+            API_LOGGER.exception("Failed to write %d respawn moves", len(rows))
+            self.pending[:0] = rows
+
+
+def leave_rings(respawns: MatchRespawns, key: int) -> None:
+    for zone in respawns.zones:
+        for ring in zone.rings:
+            if key in ring:
+                ring.remove(key)
+
+
+def replay_event(respawns: MatchRespawns, event: RespawnEvent) -> None:
+    """
+    Applies a recorded move to the rings of a match.
+
+    Moves lost in a crash, dropped or written by two engines at once leave
+    gaps in the log, so every move puts the player where it says whatever
+    the rings held before.
+    """
+    key = player_key(event.team_id, event.player)
+    area = respawns.zones[event.zone]
+    if event.gong > respawns.gong:
+        respawns.gong = event.gong
+        for zone in respawns.zones:
+            zone.first_taken = False
+    if event.kind == RespawnEventKind.ELIMINATED:
+        leave_rings(respawns, key)
+        area.rings[event.ring - 1].append(key)
+        area.first_taken = True
+        respawns.waiting[key] = event.zone
+    elif event.kind == RespawnEventKind.ADVANCED:
+        leave_rings(respawns, key)
+        area.rings[FIRST_RING].append(key)
+        respawns.waiting[key] = event.zone
+    elif event.kind == RespawnEventKind.DELAYED:
+        if key not in area.rings[FIRST_RING]:
+            leave_rings(respawns, key)
+            area.rings[FIRST_RING].append(key)
+        respawns.delayed.add(key)
+        respawns.waiting[key] = event.zone
+    else:
+        leave_rings(respawns, key)
+        respawns.delayed.discard(key)
+        respawns.waiting.pop(key, None)
+
+
+def replay(season_id: Optional[int], events: Iterable[RespawnEvent]) -> MatchRespawns:
+    """
+    Rebuilds the rings of a match from its moves, in the order recorded.
+    """
+    respawns = MatchRespawns(season_id, -1)
+    for event in events:
+        replay_event(respawns, event)
+    return respawns
+
+
+respawn_engine = RespawnEngine()
+event_bus.subscribe("respawn", respawn_engine.on_notification)
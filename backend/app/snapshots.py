@@ -0,0 +1,648 @@
+import argparse
+import asyncio
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from typing import Any, Dict, List, Optional, Tuple
+import orjson
+from fastapi import Response
+from sqlalchemy import func, text
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.cache import dump_json, make_etag
+from db.confdb import ARCHIVE_CHECK_SECONDS, SNAPSHOT_DIR
+from db.events import event_bus
+from db.interface import engine
+from db.models import EventStatus, Match, ScoreEventKind, Season, Team, TeamStanding
+from db.partitions import ARCHIVE_SCHEMA, is_detached, partition_name
+from log_utils import API_LOGGER
+
+MAGIC = b"GOTSNAP1"
+# Magic and length of the JSON header, which the data section follows.
+PREFIX = struct.Struct("<8sI")
+ALIGNMENT = 8
+# Arbitrary key of the Postgres advisory lock held while archiving, and of
+# the advisory locks of every season, held while replacing or deleting its
+# snapshot.
+ARCHIVE_LOCK_ID = 0x736E6170
+# Stands for NULL in the score columns whose values can be any integer.
+NULL = -(2**63)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# Columns of the score timeline with their array type codes, in the native
+# byte order of the host writing the snapshot.
+SCORE_COLUMNS = {
+    "id": "q",
+    "team_id": "q",
+    "kind": "b",
+    "cube": "h",
+    "round": "i",
+    "gong": "i",
+    "points": "i",
+    "timestamp": "q",
+    "controller": "i",
+    "seq": "q",
+}
+KINDS = list(ScoreEventKind)
+# The dashboard body, in which the other season bodies are spans.
+SEASON_BODIES = ("season", "matches", "teams", "standings")
+
+SCORES_QUERY = """
+    SELECT match_id, id, team_id, kind, cube, round, gong, points, timestamp,
+        controller_id, seq
+    FROM {table}
+    WHERE season_id = :id
+    ORDER BY match_id, timestamp, id
+"""
+
+
+def season_rows(model, column):
+    return select(column).where(model.season_id == Season.id).scalar_subquery()
+
+
+def versions_query():
+    """
+    Selects the completed seasons without an ongoing match, with the
+    version of their rows: the last row version written to the season, its
+    matches, teams and standings, and how many of those there are, as a
+    deletion does not bump any row version.
+    """
+    ongoing = (
+        select(Match.id)
+        .where(Match.season_id == Season.id, Match.status == EventStatus.ONGOING)
+        .exists()
+    )
+    return select(
+        Season.id,
+        func.greatest(
+            Season.row_version,
+            season_rows(Match, func.max(Match.row_version)),
+            season_rows(Team, func.max(Team.row_version)),
+            season_rows(TeamStanding, func.max(TeamStanding.row_version)),
+        ),
+        season_rows(Match, func.count(Match.id)),
+        season_rows(Team, func.count(Team.id)),
+        season_rows(TeamStanding, func.count(TeamStanding.team_id)),
+    ).where(Season.status == EventStatus.COMPLETED, ~ongoing)
+
+
+def aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def join_json(bodies: List[bytes]) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Joins JSON bodies into a JSON array, and returns it with the span of
+    every body in it.
+    """
+    spans = []
+    offset = 1
+    for body in bodies:
+        spans.append((offset, len(body)))
+        offset += len(body) + 1
+    return b"[" + b",".join(bodies) + b"]", spans
+
+
+async def build_snapshot(
+    db: AsyncSession, season_id: int
+) -> Optional[Tuple[Tuple[int, ...], bytes]]:
+    """
+    Reads a season with its matches, teams, standings and score timeline
+    and encodes them as a snapshot, returned with the version of the
+    season, or returns None if the season cannot be archived. The session
+    must read from a single database snapshot.
+    """
+    result = await db.execute(versions_query().where(Season.id == season_id))
+    version = result.one_or_none()
+    if version is None:
+        return None
+    version = tuple(version[1:])
+    season = await db.get(
+        Season,
+        season_id,
+        options=[
+            selectinload(Season.matches),
+            selectinload(Season.teams),
+            selectinload(Season.standings),
+        ],
+    )
+    matches, teams = season.matches, season.teams
+    table = "scoreevent"
+    if await is_detached(db, season_id):
+        table = f"{ARCHIVE_SCHEMA}.{partition_name(season_id)}"
+    result = await db.execute(text(SCORES_QUERY.format(table=table)), {"id": season_id})
+
+    columns = {name: array(code) for name, code in SCORE_COLUMNS.items()}
+    controllers: Dict[str, int] = {}
+    ranges: Dict[int, List[int]] = {}
+    for count, row in enumerate(result):
+        ranges.setdefault(row.match_id, [count, count])[1] = count + 1
+        columns["id"].append(row.id)
+        columns["team_id"].append(NULL if row.team_id is None else row.team_id)
+        columns["kind"].append(KINDS.index(ScoreEventKind[row.kind]))
+        columns["cube"].append(row.cube)
+        columns["round"].append(row.round)
+        columns["gong"].append(row.gong)
+        columns["points"].append(row.points)
+        columns["timestamp"].append((row.timestamp - EPOCH) // MICROSECOND)
+        columns["controller"].append(
+            -1
+            if row.controller_id is None
+            else controllers.setdefault(row.controller_id, len(controllers))
+        )
+        columns["seq"].append(NULL if row.seq is None else row.seq)
+
+    data = bytearray()
+    header_columns = {}
+    for name, column in columns.items():
+        header_columns[name] = [len(data), column.typecode]
+        data += column.tobytes()
+        data += bytes(aligned(len(data)) - len(data))
+
+    # The dashboard is written once, the other bodies being spans of it.
+    match_list, match_spans = join_json([dump_json(match) for match in matches])
+    parts = {
+        "season": dump_json(season),
+        "matches": match_list,
+        "teams": dump_json(teams),
+        "standings": dump_json(season.standings),
+    }
+    bodies = {}
+    dashboard = bytearray(b"{")
+    for name in SEASON_BODIES:
+        dashboard += b'"%s":' % name.encode()
+        bodies[name] = len(data) + len(dashboard), len(parts[name])
+        dashboard += parts[name] + b","
+    dashboard[-1:] = b"}"
+    bodies["dashboard"] = len(data), len(dashboard)
+    data += dashboard
+
+    match_offset = bodies["matches"][0]
+    header = {
+        "byteorder": sys.byteorder,
+        "season_id": season_id,
+        "version": list(version),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "events": len(columns["id"]),
+        "columns": header_columns,
+        "controllers": list(controllers),
+        "bodies": {
+            name: [offset, length, make_etag(bytes(data[offset : offset + length]))]
+            for name, (offset, length) in bodies.items()
+        },
+        "matches": {
+            match.id: [
+                match_offset + offset,
+                length,
+                make_etag(parts["matches"][offset : offset + length]),
+                *ranges.get(match.id, (0, 0)),
+            ]
+            for match, (offset, length) in zip(matches, match_spans)
+        },
+    }
+    header = orjson.dumps(header, option=orjson.OPT_NON_STR_KEYS)
+    prefix = PREFIX.pack(MAGIC, len(header)) + header
+    return version, prefix + bytes(aligned(len(prefix)) - len(prefix)) + data
+
+
+class Snapshot:
+    """
+    A snapshot file of a season mapped in memory.
+
+    Bodies and score columns are memoryviews of the mapping, and slicing
+    them copies nothing: pages are read from the file on first access and
+    then shared through the page cache by every worker mapping it.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.stat = os.fstat(file.fileno())
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.map)
+        magic, length = PREFIX.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a season snapshot")
+        header = orjson.loads(view[PREFIX.size : PREFIX.size + length])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written with another byte order")
+        data = view[aligned(PREFIX.size + length) :]
+        self.season_id: int = header["season_id"]
+        self.version = tuple(header["version"])
+        self.events: int = header["events"]
+        self.controllers: List[str] = header["controllers"]
+        self.columns = {
+            name: data[offset : offset + self.events * array(code).itemsize].cast(code)
+            for name, (offset, code) in header["columns"].items()
+        }
+        self.bodies = {
+            name: (data[offset : offset + length], etag)
+            for name, (offset, length, etag) in header["bodies"].items()
+        }
+        self.matches = {
+            int(match_id): (data[offset : offset + length], etag, start, stop)
+            for match_id, (offset, length, etag, start, stop) in header[
+                "matches"
+            ].items()
+        }
+
+    def same_file(self, stat: os.stat_result) -> bool:
+        return (self.stat.st_ino, self.stat.st_mtime_ns) == (
+            stat.st_ino,
+            stat.st_mtime_ns,
+        )
+
+    def scores(self, match_id: int) -> List[Dict[str, Any]]:
+        """
+        Decodes the score events of a match in the order they happened.
+        """
+        _, _, start, stop = self.matches[match_id]
+        rows = zip(*(column[start:stop] for column in self.columns.values()))
+        return [
+            {
+                "id": id,
+                "season_id": self.season_id,
+                "match_id": match_id,
+                "team_id": None if team == NULL else team,
+                "kind": KINDS[kind],
+                "cube": cube,
+                "round": round,
+                "gong": gong,
+                "points": points,
+                "timestamp": EPOCH + time * MICROSECOND,
+                "controller_id": None if source < 0 else self.controllers[source],
+                "seq": None if seq == NULL else seq,
+            }
+            for id, team, kind, cube, round, gong, points, time, source, seq in rows
+        ]
+
+
+def snapshot_response(body: memoryview, etag: str) -> Response:
+    return Response(
+        body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+class SnapshotStore:
+    """
+    The season snapshots of a directory, mapped by this worker.
+
+    Snapshot files are never modified: the archiver replaces them and writes
+    to the database delete them. Every read checks the file of its season,
+    so that a snapshot deleted or replaced by another worker is not served.
+
+    Every host has a directory of its own. Deletions are broadcast on the
+    event bus to the workers of every host, and a worker checks the versions
+    of its snapshots whenever it starts listening, as it may have missed
+    some.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.seasons: Dict[int, Snapshot] = {}
+        # Season of every match of the mapped snapshots.
+        self.matches: Dict[int, int] = {}
+        self.hits = 0
+
+    def path(self, season_id: int) -> str:
+        return os.path.join(self.directory, f"season_{int(season_id)}.snap")
+
+    def get(self, season_id: Optional[int]) -> Optional[Snapshot]:
+        if not self.directory or season_id is None:
+            return None
+        try:
+            stat = os.stat(self.path(season_id))
+        except FileNotFoundError:
+            self.drop(season_id)
+            return None
+        snapshot = self.seasons.get(season_id)
+        if snapshot is None or not snapshot.same_file(stat):
+            snapshot = self.load(season_id)
+        if snapshot is not None:
+            self.hits += 1
+        return snapshot
+
+    def get_match(self, match_id: int) -> Optional[Snapshot]:
+        snapshot = self.get(self.matches.get(match_id))
+        if snapshot is None or match_id not in snapshot.matches:
+            return None
+        return snapshot
+
+    def load(self, season_id: int) -> Optional[Snapshot]:
+        self.drop(season_id)
+        try:
+            snapshot = Snapshot(self.path(season_id))
+        except (OSError, ValueError) as e:
+            API_LOGGER.warning("Ignored the snapshot of season %d: %s", season_id, e)
+            return None
+        self.seasons[season_id] = snapshot
+        self.matches.update(dict.fromkeys(snapshot.matches, season_id))
+        return snapshot
+
+    def drop(self, season_id: int) -> None:
+        # The mapping is closed once no response holds a slice of it.
+        snapshot = self.seasons.pop(season_id, None)
+        if snapshot is not None:
+            for match_id in snapshot.matches:
+                if self.matches.get(match_id) == season_id:
+                    del self.matches[match_id]
+
+    def refresh(self, _: Any = None) -> None:
+        """
+        Maps the snapshots written since the last refresh and drops those
+        deleted.
+        """
+        if not self.directory:
+            return
+        try:
+            entries = {
+                int(entry.name[7:-5]): entry.stat()
+                for entry in os.scandir(self.directory)
+                if entry.name.startswith("season_") and entry.name.endswith(".snap")
+            }
+        except FileNotFoundError:
+            entries = {}
+        for season_id in set(self.seasons) - set(entries):
+            self.drop(season_id)
+        for season_id, stat in entries.items():
+            snapshot = self.seasons.get(season_id)
+            if snapshot is None or not snapshot.same_file(stat):
+                self.load(season_id)
+
+    def unlink(self, season_ids: List[int]) -> None:
+        """
+        Deletes the snapshots of seasons on this host.
+        """
+        for season_id in season_ids:
+            self.drop(season_id)
+            try:
+                os.unlink(self.path(season_id))
+            except FileNotFoundError:
+                pass
+
+    async def lock(self, db: AsyncSession, *season_ids: Optional[int]) -> List[int]:
+        """
+        Takes the locks of the completed seasons among `season_ids` in the
+        transaction of a write, and returns them to `discard` once the write
+        committed.
+
+        The archiver checks the version of a season and replaces its snapshot
+        under the same lock, so a snapshot older than the write is either
+        never put in place or discarded after it. Other seasons cannot have
+        a snapshot: one completed while the write is in flight is frozen
+        again by the next pass of the archiver, which finds its version
+        changed.
+        """
+        season_ids = sorted({id for id in season_ids if id is not None})
+        if not self.directory or not season_ids:
+            return []
+        result = await db.execute(
+            select(
+                Season.id,
+                func.pg_advisory_xact_lock_shared(ARCHIVE_LOCK_ID, Season.id),
+            ).where(Season.id.in_(season_ids), Season.status == EventStatus.COMPLETED)
+        )
+        return [row[0] for row in result.all()]
+
+    def discard(self, season_ids: List[int]) -> None:
+        """
+        Deletes the snapshots of seasons on every host, until the archiver
+        freezes them again.
+        """
+        if not season_ids:
+            return
+        self.unlink(season_ids)
+        event_bus.publish("discard", season_ids)
+
+    async def verify(self, _: Any = None) -> None:
+        """
+        Maps the snapshots of the directory and deletes those whose season
+        changed since they were written.
+        """
+        self.refresh()
+        if not self.seasons:
+            return
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                versions_query().where(Season.id.in_(list(self.seasons)))
+            )
+            versions = {row[0]: tuple(row[1:]) for row in result.all()}
+        outdated = [
+            season_id
+            for season_id, snapshot in self.seasons.items()
+            if versions.get(season_id) != snapshot.version
+        ]
+        if outdated:
+            API_LOGGER.info("Deleted the outdated snapshots of seasons %s", outdated)
+            self.unlink(outdated)
+
+    def serves(self, body: str):
+        """
+        Serves a handler of the season `id` from its snapshot, when it has
+        one, with the body named `body`.
+        """
+
+        def decorator(handler):
+            @wraps(handler)
+            async def wrapper(**kwargs) -> Response:
+                snapshot = self.get(kwargs["id"])
+                if snapshot is not None:
+                    return snapshot_response(*snapshot.bodies[body])
+                return await handler(**kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "seasons": sorted(self.seasons),
+            "bytes": sum(s.stat.st_size for s in self.seasons.values()),
+            "hits": self.hits,
+        }
+
+
+class SnapshotArchiver:
+    """
+    Freezes the completed seasons into snapshot files in the background.
+
+    A season is archived once completed without an ongoing match, and again
+    whenever the version of its rows changes. Ending a season wakes the
+    archiver, which otherwise checks every `interval` seconds. Workers take
+    turns through an advisory lock.
+
+    The snapshot keeps the full score timeline of the season, captures
+    included, so archive before the retention job compacts it.
+    """
+
+    def __init__(self, store: SnapshotStore, interval: float):
+        self.store = store
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+        self.wake = asyncio.Event()
+        self.last_run: Optional[datetime] = None
+        self.counts = {"frozen": 0, "outdated": 0, "removed": 0, "failed": 0}
+
+    def request(self) -> None:
+        """
+        Wakes the archiver, in whichever worker runs it.
+        """
+        self.wake.set()
+        event_bus.publish("archive", None)
+
+    async def start(self) -> None:
+        os.makedirs(self.store.directory, exist_ok=True)
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            self.wake.clear()
+            try:
+                await self.apply()
+            except Exception:
+                API_LOGGER.exception("Failed to archive the completed seasons")
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def apply(self) -> None:
+        async with engine.connect() as conn:
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:id)"), {"id": ARCHIVE_LOCK_ID}
+            )
+            await conn.commit()
+            if not locked:
+                return
+            try:
+                result = await conn.execute(versions_query())
+                versions = {row[0]: tuple(row[1:]) for row in result.all()}
+                await conn.commit()
+                self.store.refresh()
+                for season_id in set(self.store.seasons) - set(versions):
+                    self.store.discard([season_id])
+                    self.counts["removed"] += 1
+                for season_id, version in sorted(versions.items()):
+                    snapshot = self.store.seasons.get(season_id)
+                    if snapshot is not None and snapshot.version == version:
+                        continue
+                    try:
+                        frozen = await self.freeze(season_id)
+                    except Exception as e:
+                        self.counts["failed"] += 1
+                        API_LOGGER.warning("Season %d not archived: %s", season_id, e)
+                        continue
+                    if frozen:
+                        self.counts["frozen"] += 1
+            finally:
+                await conn.rollback()
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(:id)"), {"id": ARCHIVE_LOCK_ID}
+                )
+                await conn.commit()
+        self.last_run = datetime.now(timezone.utc)
+
+    async def freeze(self, season_id: int) -> bool:
+        """
+        Writes the snapshot of a season, replacing the previous one, and
+        returns whether the season could be archived.
+
+        The snapshot is put in place under the lock of the season, and only
+        if the version of the season did not change while it was written,
+        as the write that changed it may already have discarded the previous
+        one.
+        """
+        async with AsyncSession(engine) as db:
+            await db.connection(
+                execution_options={
+                    "isolation_level": "REPEATABLE READ",
+                    "postgresql_readonly": True,
+                }
+            )
+            snapshot = await build_snapshot(db, season_id)
+        if snapshot is None:
+            return False
+        version, content = snapshot
+        path = self.store.path(season_id)
+        with open(f"{path}.tmp", "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        async with engine.connect() as conn:
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:lock, :id)"),
+                {"lock": ARCHIVE_LOCK_ID, "id": season_id},
+            )
+            result = await conn.execute(versions_query().where(Season.id == season_id))
+            current = result.one_or_none()
+            if current is None or tuple(current[1:]) != version:
+                os.unlink(f"{path}.tmp")
+                self.counts["outdated"] += 1
+                API_LOGGER.info("Season %d changed while archived", season_id)
+                return False
+            os.replace(f"{path}.tmp", path)
+            await conn.commit()
+        self.store.load(season_id)
+        event_bus.publish("snapshots", None)
+        API_LOGGER.info("Archived season %d in %d bytes", season_id, len(content))
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {"last_run": self.last_run, **self.counts}
+
+
+snapshot_store = SnapshotStore(SNAPSHOT_DIR)
+snapshot_archiver = SnapshotArchiver(snapshot_store, ARCHIVE_CHECK_SECONDS)
+event_bus.subscribe("snapshots", snapshot_store.refresh)
+event_bus.subscribe("discard", snapshot_store.unlink)
+event_bus.subscribe("connected", snapshot_store.verify)
+event_bus.subscribe("archive", lambda _: snapshot_archiver.wake.set())
+
+
+async def run_archiver(season_ids: List[int]) -> None:
+    os.makedirs(snapshot_store.directory, exist_ok=True)
+    if season_ids:
+        for season_id in season_ids:
+            if not await snapshot_archiver.freeze(season_id):
+                print(f"Season {season_id} cannot be archived")
+    else:
+        await snapshot_archiver.apply()
+        print(snapshot_archiver.status())
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Archive completed seasons into snapshot files."
+    )
+    parser.add_argument(
+        "season_ids",
+        nargs="*",
+        type=int,
+        help="Seasons to archive again, all the outdated ones by default",
+    )
+    args = parser.parse_args()
+    if not SNAPSHOT_DIR:
+        sys.exit("SNAPSHOT_DIR is empty, snapshots are disabled")
+    asyncio.run(run_archiver(args.season_ids))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+from app.endpoints.changes import changes_queries
+from app.endpoints.exports import EXPORT_MODELS, export_query
+from app.endpoints.scores import scores_query
+from app.gong import Tick, gong_query
+from app.query import list_query
+from db.timelines import timeline_query
+from db.interface import engine
+from db.models import (
+    EventStatus,
+    Match,
+    ScoreEvent,
+    ScoreEventKind,
+    Season,
+    Team,
+    TeamStanding,
+)
+
+
+def endpoint_queries(season_id: int, match_id: int) -> Dict[str, object]:
+    """
+    The ORM queries issued by the endpoints, with IDs from the seeded data.
+    """
+    since = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    queries = {
+        "list_seasons": list_query(Season),
+        "list_seasons?status": list_query(Season, status=EventStatus.ONGOING),
+        "list_matches?season_id": list_query(Match, Match.season_id == season_id),
+        "list_matches?season_id&status": list_query(
+            Match, Match.season_id == season_id, status=EventStatus.COMPLETED
+        ),
+        "list_matches?season_id&start_from": list_query(
+            Match, Match.season_id == season_id, start_from=since
+        ),
+        "list_matches?status": list_query(Match, status=EventStatus.ONGOING),
+        "season_matches": select(Match).where(Match.season_id.in_([season_id])),
+        "season_teams": select(Team).where(Team.season_id.in_([season_id])),
+        "season_standings": select(TeamStanding)
+        .where(TeamStanding.season_id == season_id)
+        .order_by(TeamStanding.points.desc(), TeamStanding.team_id),
+        "list_scores?match_id": scores_query(match_id, season_id),
+        "ingest_scores": select(Match.id, Match.status, Match.season_id).where(
+            Match.id.in_([match_id])
+        ),
+        "record_match_end": select(Team.season_id, Team.id).where(
+            Team.season_id == season_id
+        ),
+        "rebuild_standings": select(ScoreEvent.team_id, func.sum(ScoreEvent.points))
+        .where(
+            ScoreEvent.season_id == season_id, ScoreEvent.kind == ScoreEventKind.GONG
+        )
+        .group_by(ScoreEvent.team_id),
+        "delete_team": select(ScoreEvent.id).where(ScoreEvent.team_id == 1),
+        "gong": gong_query([Tick(match_id, 0, 0, since)], {match_id: season_id}),
+        "timeline": timeline_query([match_id], [season_id]),
+    }
+    for name, query in changes_queries(since=1, until=2**62, limit=101).items():
+        queries[f"changes_{name}?since"] = query
+    for table, model in EXPORT_MODELS.items():
+        queries[f"export_{table.value}?season_id"] = export_query(model, season_id)
+    return queries
+
+
+def seq_scans(plan: dict) -> Iterator[str]:
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+async def check() -> List[str]:
+    """
+    Explains every endpoint query and returns those planning a sequential
+    scan.
+
+    Sequential scans are disabled for the check, so the planner only falls
+    back to one when no index can serve the query at all, whatever the size
+    of the seeded tables.
+    """
+    failures = []
+    async with engine.connect() as conn:
+        season_id = await conn.scalar(select(func.max(Match.season_id)))
+        match_id = await conn.scalar(select(func.max(ScoreEvent.match_id)))
+        if season_id is None or match_id is None:
+            sys.exit("The database is empty, run benchmarks.seed first")
+        await conn.execute(text("SET enable_seqscan = off"))
+        for name, query in endpoint_queries(season_id, match_id).items():
+            sql = query.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+            plan = await conn.scalar(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            tables = sorted(set(seq_scans(plan[0]["Plan"])))
+            if tables:
+                failures.append(name)
+                print(f"{name:40} seq scan on {', '.join(tables)}")
+            else:
+                print(f"{name:40} ok")
+    await engine.dispose()
+    return failures
+
+
+def main() -> None:
+    argparse.ArgumentParser(
+        description="Fail when an endpoint query plans a sequential scan."
+    ).parse_args()
+    if asyncio.run(check()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import quantiles
+from typing import Callable, Dict, List, NamedTuple, Optional
+import httpx
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+METRIC_LINE = re.compile(
+    r'^(\w+)\{method="(\w+)",route="([^"]*)"(?:,status="\d+")?\} (\S+)$'
+)
+
+
+class Ids(NamedTuple):
+    seasons: List[int]
+    matches: List[int]
+    teams: List[int]
+    ongoing_match: Optional[int]
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    route: str
+    request: Callable[[Ids, random.Random], dict]
+
+
+def scores_batch(ids: Ids, rng: random.Random) -> dict:
+    return {
+        "url": "/scores",
+        "json": [
+            {
+                "match_id": ids.ongoing_match,
+                "team_id": rng.choice(ids.teams),
+                "kind": "capture",
+                "cube": rng.randrange(10),
+            }
+            for _ in range(50)
+        ],
+    }
+
+
+SCENARIOS = [
+    Scenario("list_seasons", "GET", "/seasons", lambda ids, rng: {"url": "/seasons"}),
+    Scenario(
+        "get_season",
+        "GET",
+        "/seasons/{id}",
+        lambda ids, rng: {"url": f"/seasons/{rng.choice(ids.seasons)}"},
+    ),
+    Scenario(
+        "season_matches",
+        "GET",
+        "/seasons/{id}/matches",
+        lambda ids, rng: {"url": f"/seasons/{rng.choice(ids.seasons)}/matches"},
+    ),
+    Scenario(
+        "season_teams",
+        "GET",
+        "/seasons/{id}/teams",
+        lambda ids, rng: {"url": f"/seasons/{rng.choice(ids.seasons)}/teams"},
+    ),
+    Scenario(
+        "season_standings",
+        "GET",
+        "/seasons/{id}/standings",
+        lambda ids, rng: {"url": f"/seasons/{rng.choice(ids.seasons)}/standings"},
+    ),
+    Scenario(
+        "season_dashboard",
+        "GET",
+        "/seasons/{id}/dashboard",
+        lambda ids, rng: {"url": f"/seasons/{rng.choice(ids.seasons)}/dashboard"},
+    ),
+    Scenario(
+        "list_matches",
+        "GET",
+        "/matches",
+        lambda ids, rng: {
+            "url": "/matches",
+            "params": {"season_id": rng.choice(ids.seasons)},
+        },
+    ),
+    Scenario(
+        "get_match",
+        "GET",
+        "/matches/{id}",
+        lambda ids, rng: {"url": f"/matches/{rng.choice(ids.matches)}"},
+    ),
+    Scenario(
+        "get_team",
+        "GET",
+        "/teams/{id}",
+        lambda ids, rng: {"url": f"/teams/{rng.choice(ids.teams)}"},
+    ),
+    Scenario(
+        "list_scores",
+        "GET",
+        "/scores",
+        lambda ids, rng: {
+            "url": "/scores",
+            "params": {"match_id": rng.choice(ids.matches)},
+        },
+    ),
+    Scenario("ingest_scores", "POST", "/scores", scores_batch),
+    Scenario(
+        "export_teams",
+        "GET",
+        "/export/{table}",
+        lambda ids, rng: {
+            "url": "/export/teams",
+            "params": {"season_id": rng.choice(ids.seasons)},
+        },
+    ),
+    Scenario(
+        "diagnostics_pool",
+        "GET",
+        "/diagnostics/pool",
+        lambda ids, rng: {"url": "/diagnostics/pool"},
+    ),
+]
+
+
+async def fetch_ids(client: httpx.AsyncClient) -> Ids:
+    seasons = [s["id"] for s in (await client.get("/seasons?limit=1000")).json()]
+    matches, teams, ongoing = [], [], None
+    for season_id in seasons[-20:]:
+        for match in (await client.get(f"/seasons/{season_id}/matches")).json():
+            matches.append(match["id"])
+            if match["status"] == "ongoing":
+                ongoing = match["id"]
+        teams += [
+            t["id"] for t in (await client.get(f"/seasons/{season_id}/teams")).json()
+        ]
+    return Ids(seasons, matches, teams, ongoing)
+
+
+async def scrape_queries(client: httpx.AsyncClient) -> Dict[tuple, float]:
+    """
+    Reads per-route query and request counters from /metrics.
+    """
+    totals: Dict[tuple, float] = {}
+    for line in (await client.get("/metrics")).text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match and match[1] in ("db_queries_total", "http_requests_total"):
+            key = (match[1], match[2], match[3])
+            totals[key] = totals.get(key, 0) + float(match[4])
+    return totals
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    ids: Ids,
+    concurrency: int,
+    duration: float,
+    seed: int,
+) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(n: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed * 1000 + n)
+        while time.perf_counter() < deadline:
+            request = scenario.request(ids, rng)
+            start = time.perf_counter()
+            response = await client.request(scenario.method, **request)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    before = await scrape_queries(client)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = await scrape_queries(client)
+
+    def delta(metric: str) -> float:
+        key = (metric, scenario.method, scenario.route)
+        return after.get(key, 0) - before.get(key, 0)
+
+    requests = delta("http_requests_total")
+    cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "queries_per_request": delta("db_queries_total") / requests
+        if requests
+        else None,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """
+    Prints the p95 latency change of every scenario against a baseline and
+    returns whether any of them regressed by more than `threshold`.
+    """
+    regressed = False
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{name:20} p95 {previous['p95_ms']:8.2f} -> {current['p95_ms']:8.2f} ms "
+            f"({change:+.0%}){flag}"
+        )
+    return regressed
+
+
+async def run(args: argparse.Namespace) -> dict:
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        ids = await fetch_ids(client)
+        results = {
+            "meta": {
+                "revision": git_revision(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "url": args.url,
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "seed": args.seed,
+            },
+            "scenarios": {},
+        }
+        for scenario in SCENARIOS:
+            if args.only and scenario.name not in args.only:
+                continue
+            stats = await run_scenario(
+                client, scenario, ids, args.concurrency, args.duration, args.seed
+            )
+            results["scenarios"][scenario.name] = stats
+            qpr = stats["queries_per_request"]
+            print(
+                f"{scenario.name:20} {stats['throughput']:8.1f} req/s  "
+                f"p50 {stats['p50_ms']:7.2f}  p95 {stats['p95_ms']:7.2f}  "
+                f"p99 {stats['p99_ms']:7.2f} ms  "
+                f"queries/req {'-' if qpr is None else f'{qpr:.1f}'}  "
+                f"errors {stats['errors']}"
+            )
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the API.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="Scenarios to run")
+    parser.add_argument("--output", type=Path, help="Where to save the results")
+    parser.add_argument("--compare", type=Path, help="Baseline results to compare")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = args.output or RESULTS_DIR / (
+        f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{results['meta']['revision']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
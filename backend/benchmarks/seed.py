@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, text
+from db.interface import engine
+from db.migrations import migrate_database
+from db.partitions import ARCHIVE_SCHEMA, create_partition, list_partitions
+from db.models import (
+    EventStatus,
+    Match,
+    ScoreEvent,
+    ScoreEventKind,
+    Season,
+    Team,
+    TeamStanding,
+)
+from rules import (
+    CUBE_COUNT,
+    GONG_SECONDS,
+    GONGS_PER_ROUND,
+    ROUNDS,
+    TEAMS_PER_MATCH,
+    gong_points,
+)
+
+MATCHES_PER_SEASON = 3
+TEAM_COLORS = ("red", "blue", "green", "yellow", "purple", "orange")
+INSERT_CHUNK = 5000
+
+
+def match_history(
+    rng: random.Random, season_id: int, match_id: int, team_ids, start: datetime
+):
+    """
+    Generates the capture and gong events of a full match.
+    """
+    owners = [None] * CUBE_COUNT
+    for gong in range(ROUNDS * GONGS_PER_ROUND):
+        at = start + timedelta(seconds=(gong + 1) * GONG_SECONDS)
+        for cube in rng.sample(range(CUBE_COUNT), 3):
+            owners[cube] = rng.choice(team_ids)
+            yield {
+                "match_id": match_id,
+                "season_id": season_id,
+                "team_id": owners[cube],
+                "kind": ScoreEventKind.CAPTURE,
+                "cube": cube,
+                "round": gong // GONGS_PER_ROUND,
+                "gong": gong,
+                "points": 0,
+                "timestamp": at - timedelta(seconds=rng.uniform(0, GONG_SECONDS)),
+            }
+        for cube, owner in enumerate(owners):
+            if owner is not None:
+                yield {
+                    "match_id": match_id,
+                    "season_id": season_id,
+                    "team_id": owner,
+                    "kind": ScoreEventKind.GONG,
+                    "cube": cube,
+                    "round": gong // GONGS_PER_ROUND,
+                    "gong": gong,
+                    "points": gong_points(cube, gong),
+                    "timestamp": at,
+                }
+
+
+async def insert_chunked(conn, model, rows) -> None:
+    for i in range(0, len(rows), INSERT_CHUNK):
+        await conn.execute(insert(model), rows[i : i + INSERT_CHUNK])
+
+
+async def seed(seasons: int, random_seed: int) -> None:
+    """
+    Seeds a synthetic league into an empty database: completed seasons of 6
+    teams and 3 matches with their full per-gong score history, and a last
+    season with one ongoing match for the ingestion scenarios.
+    """
+    rng = random.Random(random_seed)
+    await migrate_database()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("TRUNCATE season, match, team RESTART IDENTITY CASCADE")
+        )
+        for partition in await list_partitions(conn):
+            if partition["season_id"] is not None and not partition["detached"]:
+                await conn.execute(text(f"DROP TABLE {partition['name']}"))
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {ARCHIVE_SCHEMA} CASCADE"))
+        epoch = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        for s in range(seasons):
+            ongoing = s == seasons - 1
+            season_start = epoch + timedelta(days=7 * s)
+            season_id = await conn.scalar(
+                insert(Season)
+                .values(
+                    name=f"Season {s + 1}",
+                    start=season_start,
+                    end=None if ongoing else season_start + timedelta(days=3),
+                    status=EventStatus.ONGOING if ongoing else EventStatus.COMPLETED,
+                )
+                .returning(Season.id)
+            )
+            await create_partition(conn, season_id)
+            team_ids = (
+                await conn.scalars(
+                    insert(Team)
+                    .values(
+                        [
+                            {
+                                "name": f"{color} {s + 1}",
+                                "color": color,
+                                "season_id": season_id,
+                            }
+                            for color in TEAM_COLORS[:TEAMS_PER_MATCH]
+                        ]
+                    )
+                    .returning(Team.id)
+                )
+            ).all()
+
+            points = dict.fromkeys(team_ids, 0)
+            played = 0
+            history = []
+            for m in range(MATCHES_PER_SEASON):
+                start = season_start + timedelta(days=m)
+                last = ongoing and m == MATCHES_PER_SEASON - 1
+                match_id = await conn.scalar(
+                    insert(Match)
+                    .values(
+                        name=f"Match {m + 1}",
+                        start=start,
+                        end=None if last else start + timedelta(hours=1),
+                        status=EventStatus.ONGOING if last else EventStatus.COMPLETED,
+                        season_id=season_id,
+                    )
+                    .returning(Match.id)
+                )
+                if last:
+                    continue
+                played += 1
+                for event in match_history(rng, season_id, match_id, team_ids, start):
+                    points[event["team_id"]] += event["points"]
+                    history.append(event)
+            await insert_chunked(conn, ScoreEvent, history)
+            await conn.execute(
+                insert(TeamStanding),
+                [
+                    {
+                        "season_id": season_id,
+                        "team_id": team_id,
+                        "points": value,
+                        "matches_played": played,
+                    }
+                    for team_id, value in points.items()
+                ],
+            )
+        await conn.execute(text("ANALYZE"))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed a synthetic league.")
+    parser.add_argument("--seasons", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(seed(args.seasons, args.seed))
+
+
+if __name__ == "__main__":
+    main()
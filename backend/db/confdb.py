@@ -1,3 +1,75 @@
 import os
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
\ No newline at end of file
+
+def env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+# "migrate" applies pending Alembic migrations, "reset" drops and recreates
+# every table (development only).
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "migrate")
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Optional streaming replica serving the reads of GET endpoints.
+REPLICA_DATABASE_URL = os.environ.get("REPLICA_DATABASE_URL")
+# Reads fall back to the primary while the replica lags more than this.
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = float(os.environ.get("REPLICA_CHECK_SECONDS", "1"))
+
+# Broadcasts cache invalidations and live updates to the other workers.
+EVENT_BUS = env_flag("EVENT_BUS", True)
+
+# Runs the gong scheduler awarding points of ongoing matches in this process.
+GONG_SCHEDULER = env_flag("GONG_SCHEDULER", True)
+
+# Runs the respawn rings of ongoing matches along with the gong scheduler, in
+# the one process elected to run it. The other workers forward eliminations
+# to it.
+RESPAWN_ENGINE = env_flag("RESPAWN_ENGINE", True)
+# Respawn moves are written to the database in batches at this interval.
+RESPAWN_FLUSH_SECONDS = float(os.environ.get("RESPAWN_FLUSH_SECONDS", "1"))
+
+# Score history retention: captures of seasons completed this many days ago
+# are dropped, keeping the gong events, and the partitions of those completed
+# SCORE_DETACH_DAYS ago are detached. 0 disables a step.
+RETENTION_JOB = env_flag("RETENTION_JOB", True)
+SCORE_COMPACT_DAYS = int(os.environ.get("SCORE_COMPACT_DAYS", "30"))
+SCORE_DETACH_DAYS = int(os.environ.get("SCORE_DETACH_DAYS", "0"))
+RETENTION_CHECK_SECONDS = float(os.environ.get("RETENTION_CHECK_SECONDS", "3600"))
+# The retention job also creates the partitions of this many seasons ahead,
+# so that creating a season takes no lock on the score history.
+SCORE_PARTITIONS_AHEAD = int(os.environ.get("SCORE_PARTITIONS_AHEAD", "10"))
+
+# Completed seasons are frozen into snapshot files in this directory, shared
+# by the workers of a host, and their reads served from them. Empty disables
+# snapshots.
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+# Runs the archiver writing the snapshots in this process, which also checks
+# for outdated snapshots at this interval.
+ARCHIVE_JOB = env_flag("ARCHIVE_JOB", True)
+ARCHIVE_CHECK_SECONDS = float(os.environ.get("ARCHIVE_CHECK_SECONDS", "600"))
+
+# Number of recent idempotency keys remembered by each worker.
+IDEMPOTENCY_WINDOW = int(os.environ.get("IDEMPOTENCY_WINDOW", "100000"))
+# Idempotency keys of transitions are deleted by the retention job after this
+# many days, when retries of them are long over. 0 keeps them forever.
+IDEMPOTENCY_KEY_DAYS = int(os.environ.get("IDEMPOTENCY_KEY_DAYS", "7"))
+
+CACHE_URL = os.environ.get("CACHE_URL")
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "30"))
+
+# Responses smaller than this many bytes are sent uncompressed.
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))
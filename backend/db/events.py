@@ -0,0 +1,150 @@
+import asyncio
+import inspect
+import json
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+from db.confdb import EVENT_BUS
+from db.interface import connect_dedicated
+from log_utils import DB_LOGGER
+
+CHANNEL = "got_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_PAYLOAD_BYTES = 7999
+HEARTBEAT_SECONDS = 5.0
+RETRY_SECONDS = 1.0
+
+Handler = Callable[[Any], Any]
+
+
+class EventBus:
+    """
+    Broadcasts change notifications between the workers of the API through
+    Postgres LISTEN/NOTIFY.
+
+    Every worker holds one dedicated connection, outside the pool, listening on
+    CHANNEL and sending the notifications published by the worker. Writes
+    publish after they commit, and each worker dispatches the notifications
+    of the other workers to the handlers subscribed to their kind.
+    Notifications are best effort: those sent while a worker is reconnecting
+    are lost to it, and its caches then only catch up on their TTL. Handlers
+    of `connected` are called whenever the worker starts listening, to catch
+    up otherwise.
+    """
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex
+        self.handlers: Dict[str, List[Handler]] = {}
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.connection = None
+        self.task: Optional[asyncio.Task] = None
+        self.pending: set = set()
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    def subscribe(self, kind: str, handler: Handler) -> None:
+        """
+        Calls `handler` with the data of every notification of `kind` sent by
+        another worker. Coroutine handlers are run as tasks.
+        """
+        self.handlers.setdefault(kind, []).append(handler)
+
+    def publish(self, kind: str, data: Any) -> None:
+        """
+        Queues a notification for the other workers, without waiting for it
+        to be sent.
+        """
+        if self.task is None:
+            return
+        payload = json.dumps(
+            {"worker": self.worker_id, "kind": kind, "data": data}, default=str
+        )
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            self.dropped += 1
+            DB_LOGGER.warning("Dropped a %s notification too large to send", kind)
+            return
+        self.outbox.put_nowait(payload)
+
+    async def start(self) -> None:
+        if EVENT_BUS:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                self.connection = await connect_dedicated()
+                await self.connection.add_listener(self.channel, self.receive)
+                DB_LOGGER.info("Listening to %s", self.channel)
+                self.dispatch("connected", None)
+                await self.send_loop()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                DB_LOGGER.exception("Event bus connection lost, reconnecting")
+            finally:
+                if self.connection is not None:
+                    # Closing the connection also drops its listener.
+                    self.connection.terminate()
+                    self.connection = None
+            await asyncio.sleep(RETRY_SECONDS)
+
+    async def send_loop(self) -> None:
+        while True:
+            try:
+                payloads = [
+                    await asyncio.wait_for(self.outbox.get(), HEARTBEAT_SECONDS)
+                ]
+            except TimeoutError:
+                if self.connection.is_closed():
+                    raise ConnectionError("LISTEN connection closed")
+                continue
+            while not self.outbox.empty():
+                payloads.append(self.outbox.get_nowait())
+            # Everything queued is sent in one round trip.
+            await self.connection.execute(
+                "SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload",
+                self.channel,
+                payloads,
+            )
+            self.sent += len(payloads)
+
+    def receive(self, connection, pid: int, channel: str, payload: str) -> None:
+        message = json.loads(payload)
+        if message["worker"] == self.worker_id:
+            return
+        self.received += 1
+        self.dispatch(message["kind"], message["data"])
+
+    def dispatch(self, kind: str, data: Any) -> None:
+        for handler in self.handlers.get(kind, ()):
+            try:
+                result = handler(data)
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self.pending.add(task)
+                    task.add_done_callback(self.pending.discard)
+            except Exception:
+                DB_LOGGER.exception("Failed to handle a %s notification", kind)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "connected": self.connection is not None,
+            "queued": self.outbox.qsize(),
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+        }
+
+
+event_bus = EventBus()
@@ -1,11 +1,61 @@
+import asyncpg
+from fastapi import Request
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import SQLModel
-from db.confdb import DATABASE_URL
+from db.confdb import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    REPLICA_CHECK_SECONDS,
+    REPLICA_DATABASE_URL,
+    REPLICA_MAX_LAG_SECONDS,
+)
+from db.pool import InstrumentedQueuePool
+from db.replica import READ_AFTER_HEADER, ReplicaMonitor, parse_lsn
 from log_utils import DB_LOGGER
 import db.models
 
-engine = create_async_engine(DATABASE_URL)
+engine = create_async_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args={"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+)
+
+replica_engine = None
+replica_monitor = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_async_engine(
+        REPLICA_DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+    )
+    replica_monitor = ReplicaMonitor(
+        replica_engine, REPLICA_MAX_LAG_SECONDS, REPLICA_CHECK_SECONDS
+    )
+
+
+async def connect_dedicated() -> asyncpg.Connection:
+    """
+    Opens a driver connection outside the pool, for the sessions holding a
+    listener or an advisory lock for as long as the process runs, which must
+    not go back to the pool.
+    """
+    url = engine.url.set(drivername="postgresql")
+    return await asyncpg.connect(url.render_as_string(hide_password=False))
 
 
 async def create_database(hard: bool = False):
@@ -20,3 +70,30 @@ async def create_database(hard: bool = False):
 async def get_session() -> AsyncSession:
     async with AsyncSession(engine) as session:
         yield session
+
+
+def read_engine(request: Request) -> AsyncEngine:
+    """
+    Picks the engine serving the reads of a request: the replica, unless
+    there is none, it lags, or it did not replay yet the WAL position the
+    request reads after.
+    """
+    lsn = parse_lsn(request.headers.get(READ_AFTER_HEADER))
+    if (
+        replica_monitor is None
+        or not replica_monitor.usable()
+        or (lsn is not None and not replica_monitor.caught_up(lsn))
+    ):
+        if replica_monitor is not None:
+            replica_monitor.reads["primary"] += 1
+        return engine
+    replica_monitor.reads["replica"] += 1
+    return replica_engine
+
+
+async def get_read_session(request: Request) -> AsyncSession:
+    """
+    Session of the GET endpoints that only read, see read_engine.
+    """
+    async with AsyncSession(read_engine(request)) as session:
+        yield session
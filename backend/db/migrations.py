@@ -0,0 +1,93 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from db.interface import engine
+from db.confdb import DB_POOL_SIZE
+from log_utils import DB_LOGGER
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE_REVISION = "0001"
+# Tables created by the baseline revision.
+BASELINE_TABLES = ("season", "match", "team", "scoreevent", "teamstanding")
+# Arbitrary key of the Postgres advisory lock serializing migrations.
+MIGRATION_LOCK_ID = 0x60745EED
+
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    config.attributes["connection"] = connection
+    return config
+
+
+def current_revision(connection: Connection) -> Optional[str]:
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def upgrade(connection: Connection) -> None:
+    config = alembic_config(connection)
+    if current_revision(connection) is None:
+        existing = set(inspect(connection).get_table_names())
+        missing = [table for table in BASELINE_TABLES if table not in existing]
+        if not missing:
+            # Databases created before migrations existed already hold the
+            # baseline schema.
+            DB_LOGGER.info("Stamping unversioned database at %s", BASELINE_REVISION)
+            command.stamp(config, BASELINE_REVISION)
+        elif len(missing) < len(BASELINE_TABLES):
+            raise RuntimeError(
+                "Unversioned database holds part of the baseline schema, "
+                f"missing tables: {', '.join(missing)}"
+            )
+    # Alembic only runs migrations in their own transaction, and can only
+    # leave it for concurrent index builds, on a connection not already in one.
+    connection.commit()
+    command.upgrade(config, "head")
+
+
+async def migrate_database() -> None:
+    """
+    Brings the schema up to the latest Alembic revision.
+
+    The revision check is a single query, so restarts on an up-to-date schema
+    are cheap. Pending migrations are applied under an advisory lock so that
+    only one of several starting workers runs them.
+    """
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    async with engine.connect() as conn:
+        if await conn.run_sync(current_revision) == head:
+            DB_LOGGER.info("Database schema is up to date at %s", head)
+            return
+        await conn.execute(
+            text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID}
+        )
+        try:
+            await conn.commit()
+            if await conn.run_sync(current_revision) != head:
+                await conn.run_sync(upgrade)
+                await conn.commit()
+                DB_LOGGER.info("Database migrated to %s", head)
+        finally:
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID}
+            )
+            await conn.commit()
+
+
+async def warm_pool(size: int = DB_POOL_SIZE) -> None:
+    """
+    Opens the pool's connections up front so the first requests do not pay
+    for connection setup.
+    """
+
+    async def ping() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(size)))
@@ -2,6 +2,31 @@ from .seasons import Season
 from .event import EventStatus
 from .matches import Match
 from .teams import Team
+from .standings import TeamStanding
+from .scores import ScoreEvent, ScoreEventBase, ScoreEventKind
+from .timelines import MatchTimeline
+from .idempotency import IdempotencyKey
+from .dashboards import SeasonDashboard, SeasonWithRelations
+from .tombstones import Tombstone
+from .respawns import Elimination, RespawnEvent, RespawnEventKind
 from sqlmodel import SQLModel
 
-__all__ = ["Season", "EventStatus", "Match", "Team", "SQLModel"]
+__all__ = [
+    "Season",
+    "EventStatus",
+    "Match",
+    "Team",
+    "TeamStanding",
+    "ScoreEvent",
+    "ScoreEventBase",
+    "ScoreEventKind",
+    "MatchTimeline",
+    "IdempotencyKey",
+    "SeasonDashboard",
+    "SeasonWithRelations",
+    "Tombstone",
+    "Elimination",
+    "RespawnEvent",
+    "RespawnEventKind",
+    "SQLModel",
+]
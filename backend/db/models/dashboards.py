@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlmodel import Field, SQLModel
+from .event import EventStatus
+from .matches import Match
+from .seasons import Season
+from .standings import TeamStanding
+from .teams import Team
+
+
+class SeasonDashboard(SQLModel):
+    """
+    A season with everything its page shows.
+    """
+
+    season: Season
+    matches: List[Match]
+    teams: List[Team]
+    standings: List[TeamStanding]
+
+
+class SeasonWithRelations(SQLModel):
+    """
+    A season of the season list, with the relations requested by `include`.
+    """
+
+    id: Optional[int] = Field(default=None, description="ID of the season")
+    name: Optional[str] = Field(default=None, description="Name of the season")
+    start: Optional[datetime] = Field(
+        default=None, description="Start date of the season"
+    )
+    end: Optional[datetime] = Field(default=None, description="End date of the season")
+    status: Optional[EventStatus] = Field(
+        default=None, description="Status of the season"
+    )
+    row_version: Optional[int] = Field(
+        default=None, description="Version of the last write to the season"
+    )
+    matches: Optional[List[Match]] = Field(
+        default=None, description="Matches of the season, if included"
+    )
+    teams: Optional[List[Team]] = Field(
+        default=None, description="Teams of the season, if included"
+    )
+    standings: Optional[List[TeamStanding]] = Field(
+        default=None, description="Standings of the season, if included"
+    )
@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, Column, DateTime, SQLModel
+from sqlalchemy import func
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """
+    An idempotency key of a state transition that was applied.
+    """
+
+    key: str = Field(primary_key=True, description="Scoped idempotency key")
+    created: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            DateTime(timezone=True),
+            nullable=False,
+            server_default=func.now(),
+            index=True,
+        ),
+        description="Time the transition was applied",
+    )
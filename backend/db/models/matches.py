@@ -1,14 +1,22 @@
 from .event import EventStatus
 from typing import Optional, TYPE_CHECKING, Self
 from sqlmodel import Field, Relationship, Column, DateTime, SQLModel
+from sqlalchemy import Index
 from pydantic import model_validator
 from datetime import datetime
+from .versions import row_version_column, versioned
 
 if TYPE_CHECKING:
     from .seasons import Season
 
 
 class Match(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_match_season_id_status", "season_id", "status"),
+        Index("ix_match_season_id_start", "season_id", "start"),
+        Index("ix_match_status", "status"),
+    )
+
     id: Optional[int] = Field(
         default=None, primary_key=True, description="ID of the match"
     )
@@ -29,6 +37,11 @@ class Match(SQLModel, table=True):
     season_id: Optional[int] = Field(
         default=None, foreign_key="season.id", description="ID of the season"
     )
+    row_version: Optional[int] = Field(
+        default=None,
+        sa_column=row_version_column(),
+        description="Version of the last write to the match",
+    )
     season: Optional["Season"] = Relationship(back_populates="matches")
 
     @model_validator(mode="after")
@@ -36,3 +49,6 @@ class Match(SQLModel, table=True):
         if self.start and self.end and self.start > self.end:
             raise ValueError("Start date must be before end date")
         return self
+
+
+versioned(Match.__table__)
@@ -0,0 +1,62 @@
+from enum import Enum
+from typing import Optional
+from sqlmodel import Field, Column, DateTime, SQLModel
+from sqlalchemy import Index
+from datetime import datetime
+from rules import PLAYERS_PER_TEAM, RESPAWN_ZONES, RINGS_PER_ZONE
+
+
+class RespawnEventKind(str, Enum):
+    ELIMINATED = "eliminated"
+    ADVANCED = "advanced"
+    DELAYED = "delayed"
+    RELEASED = "released"
+
+
+class Elimination(SQLModel):
+    """
+    A player eliminated on the arena, reported by the referee of a respawn
+    zone.
+    """
+
+    team_id: int = Field(description="ID of the team of the player")
+    player: int = Field(
+        ge=0, lt=PLAYERS_PER_TEAM, description="Number of the player in the team"
+    )
+    zone: int = Field(
+        ge=0, lt=RESPAWN_ZONES, description="Respawn zone the player goes to"
+    )
+
+
+class RespawnEvent(SQLModel, table=True):
+    """
+    A move of a player through the rings of a respawn zone: entering a ring
+    when eliminated, advancing to the first ring or being held one more gong
+    at a gong, and being released back into the game.
+    """
+
+    __table_args__ = (Index("ix_respawnevent_match_id_id", "match_id", "id"),)
+
+    id: Optional[int] = Field(
+        default=None, primary_key=True, description="ID of the respawn event"
+    )
+    match_id: int = Field(
+        foreign_key="match.id", ondelete="CASCADE", description="ID of the match"
+    )
+    team_id: int = Field(
+        foreign_key="team.id", ondelete="CASCADE", description="ID of the team"
+    )
+    player: int = Field(ge=0, lt=PLAYERS_PER_TEAM, description="Number of the player")
+    zone: int = Field(ge=0, lt=RESPAWN_ZONES, description="Respawn zone")
+    kind: RespawnEventKind = Field(description="Kind of the move")
+    ring: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=RINGS_PER_ZONE,
+        description="Ring the player is in after the move, none once released",
+    )
+    gong: int = Field(description="Last gong of the match at the time of the move")
+    timestamp: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+        description="Time of the move",
+    )
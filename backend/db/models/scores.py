@@ -0,0 +1,104 @@
+from enum import Enum
+from typing import Optional
+from sqlmodel import Field, Column, DateTime, SQLModel
+from sqlalchemy import DDL, Index, event, func, text
+from datetime import datetime
+from rules import CUBE_COUNT
+
+# Season key of the score events of matches outside any season.
+NO_SEASON = 0
+
+
+class ScoreEventKind(str, Enum):
+    CAPTURE = "capture"
+    GONG = "gong"
+
+
+class ScoreEventBase(SQLModel):
+    """
+    A single scoring event of a match: a panel press capturing a cube, or a
+    gong confirming the control of a cube and awarding its points.
+    """
+
+    match_id: int = Field(
+        foreign_key="match.id", ondelete="CASCADE", description="ID of the match"
+    )
+    team_id: Optional[int] = Field(
+        default=None,
+        foreign_key="team.id",
+        ondelete="CASCADE",
+        description="ID of the team controlling the cube",
+    )
+    kind: ScoreEventKind = Field(description="Kind of the event")
+    cube: int = Field(ge=0, lt=CUBE_COUNT, description="Index of the cube")
+    round: int = Field(default=0, ge=0, description="Round of the match")
+    gong: int = Field(default=0, ge=0, description="Gong number within the match")
+    points: int = Field(default=0, ge=0, description="Points awarded by the event")
+    timestamp: Optional[datetime] = Field(
+        default=None, description="Time the event happened on the arena"
+    )
+    controller_id: Optional[str] = Field(
+        default=None, description="ID of the arena controller sending the event"
+    )
+    seq: Optional[int] = Field(
+        default=None, description="Sequence number of the event on its controller"
+    )
+
+
+class ScoreEvent(ScoreEventBase, table=True):
+    """
+    The score history, partitioned by season so that the queries of a
+    season only read its own partition, and completed seasons can be
+    compacted and detached (see db.partitions). Unique keys include the
+    partition key, as Postgres requires.
+    """
+
+    __table_args__ = (
+        Index("ix_scoreevent_match_id_timestamp", "match_id", "timestamp"),
+        Index("ix_scoreevent_team_id", "team_id"),
+        Index(
+            "ux_scoreevent_controller_seq",
+            "controller_id",
+            "seq",
+            "season_id",
+            unique=True,
+        ),
+        Index(
+            "ux_scoreevent_gong",
+            "match_id",
+            "gong",
+            "cube",
+            "season_id",
+            unique=True,
+            postgresql_where=text("kind = 'GONG'"),
+        ),
+        {"postgresql_partition_by": "LIST (season_id)"},
+    )
+
+    id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+        description="ID of the score event",
+    )
+    season_id: int = Field(
+        default=NO_SEASON,
+        primary_key=True,
+        description="ID of the season of the match, 0 outside any season",
+    )
+    timestamp: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, server_default=func.now()
+        ),
+        description="Time the event happened on the arena",
+    )
+
+
+# Holds the events of matches outside any season, and of seasons created
+# without their own partition until one is split off for them.
+event.listen(
+    ScoreEvent.__table__,
+    "after_create",
+    DDL("CREATE TABLE scoreevent_default PARTITION OF scoreevent DEFAULT"),
+)
@@ -3,10 +3,12 @@ from typing import Optional, TYPE_CHECKING, List, Self
 from sqlmodel import Relationship, DateTime, Field, Column, SQLModel
 from pydantic import model_validator
 from datetime import datetime
+from .versions import row_version_column, versioned
 
 if TYPE_CHECKING:
     from .matches import Match
     from .teams import Team
+    from .standings import TeamStanding
 
 
 class Season(SQLModel, table=True):
@@ -29,13 +31,28 @@ class Season(SQLModel, table=True):
         description="End date of the season",
     )
     status: Optional[EventStatus] = Field(
-        default=EventStatus.PENDING, description="Status of the season"
+        default=EventStatus.PENDING, index=True, description="Status of the season"
+    )
+    row_version: Optional[int] = Field(
+        default=None,
+        sa_column=row_version_column(),
+        description="Version of the last write to the season",
     )
     matches: Optional[List["Match"]] = Relationship(
-        back_populates="season", cascade_delete=True
+        back_populates="season",
+        cascade_delete=True,
+        sa_relationship_kwargs={"order_by": "Match.id"},
     )
     teams: Optional[List["Team"]] = Relationship(
-        back_populates="season", cascade_delete=True
+        back_populates="season",
+        cascade_delete=True,
+        sa_relationship_kwargs={"order_by": "Team.id"},
+    )
+    standings: Optional[List["TeamStanding"]] = Relationship(
+        sa_relationship_kwargs={
+            "viewonly": True,
+            "order_by": "[TeamStanding.points.desc(), TeamStanding.team_id]",
+        }
     )
 
     @model_validator(mode="after")
@@ -43,3 +60,6 @@ class Season(SQLModel, table=True):
         if self.start and self.end and self.start > self.end:
             raise ValueError("Start date must be before end date")
         return self
+
+
+versioned(Season.__table__)
@@ -0,0 +1,36 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from .versions import row_version_column, versioned
+
+
+class TeamStanding(SQLModel, table=True):
+    """
+    Running total of a team in a season, maintained on every score write.
+    """
+
+    season_id: int = Field(
+        foreign_key="season.id",
+        primary_key=True,
+        ondelete="CASCADE",
+        description="ID of the season",
+    )
+    team_id: int = Field(
+        foreign_key="team.id",
+        primary_key=True,
+        ondelete="CASCADE",
+        description="ID of the team",
+    )
+    points: int = Field(default=0, description="Total points of the team")
+    matches_played: int = Field(
+        default=0, description="Number of completed matches in the season"
+    )
+    row_version: Optional[int] = Field(
+        default=None,
+        sa_column=row_version_column(index=False),
+        description="Version of the last write to the standing",
+    )
+
+
+# Standings are not synced through the changes feed and need no tombstones:
+# their versions tell when the standings of a season last changed.
+versioned(TeamStanding.__table__, tombstones=False)
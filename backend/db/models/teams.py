@@ -2,6 +2,7 @@ from typing import Optional, TYPE_CHECKING, Self
 from sqlmodel import Field, Relationship, Column, DateTime, SQLModel
 from pydantic import model_validator
 from datetime import datetime
+from .versions import row_version_column, versioned
 
 if TYPE_CHECKING:
     from .seasons import Season
@@ -14,6 +15,14 @@ class Team(SQLModel, table=True):
     name: Optional[str] = Field(index=True, unique=True, description="Name of the team")
     color: Optional[str] = Field(description="Color of the team")
     season_id: Optional[int] = Field(
-        foreign_key="season.id", description="ID of the season"
+        foreign_key="season.id", index=True, description="ID of the season"
+    )
+    row_version: Optional[int] = Field(
+        default=None,
+        sa_column=row_version_column(),
+        description="Version of the last write to the team",
     )
     season: Optional["Season"] = Relationship(back_populates="teams")
+
+
+versioned(Team.__table__)
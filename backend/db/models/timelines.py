@@ -0,0 +1,34 @@
+from typing import List
+from sqlmodel import Field, Column, SQLModel
+from sqlalchemy import ARRAY, Integer, LargeBinary
+
+
+class MatchTimeline(SQLModel, table=True):
+    """
+    Packed per-gong cube control and cumulative scores of a match, extended
+    with its gong events as they are recorded.
+
+    `ownership` holds one byte per cube and gong: the slot of the owning team
+    in `teams`, or NO_OWNER. `scores` holds, for every gong, the cumulative
+    points of each team slot as little-endian 32-bit integers.
+    """
+
+    match_id: int = Field(
+        foreign_key="match.id",
+        primary_key=True,
+        ondelete="CASCADE",
+        description="ID of the match",
+    )
+    gongs: int = Field(default=0, description="Number of gongs recorded")
+    teams: List[int] = Field(
+        sa_column=Column(ARRAY(Integer), nullable=False),
+        description="IDs of the teams by slot",
+    )
+    ownership: bytes = Field(
+        sa_column=Column(LargeBinary, nullable=False),
+        description="Owner slot of every cube at every gong",
+    )
+    scores: bytes = Field(
+        sa_column=Column(LargeBinary, nullable=False),
+        description="Cumulative points of every team slot at every gong",
+    )
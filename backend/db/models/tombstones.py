@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, Column, DateTime, SQLModel
+from sqlalchemy import BigInteger, func, text
+
+
+class Tombstone(SQLModel, table=True):
+    """
+    A deleted season, match or team, recorded by a trigger.
+    """
+
+    version: Optional[int] = Field(
+        default=None,
+        sa_column=Column(
+            BigInteger, primary_key=True, server_default=text("next_row_version()")
+        ),
+        description="Row version of the deletion",
+    )
+    table_name: str = Field(description="Table the row was deleted from")
+    row_id: int = Field(description="ID of the deleted row")
+    deleted: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, server_default=func.now()
+        ),
+        description="Time of the deletion",
+    )
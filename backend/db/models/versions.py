@@ -0,0 +1,85 @@
+from sqlalchemy import DDL, BigInteger, Column, Sequence, Table, event, text
+from sqlmodel import SQLModel
+
+# Row versions hold the ID of the writing transaction above VERSION_XID_SHIFT
+# bits, and a sequence number below. Versions below the xmin of a snapshot
+# are then all final: nothing still in flight can commit one of them.
+VERSION_XID_SHIFT = 22
+ROW_VERSION = Sequence("row_version_seq", metadata=SQLModel.metadata)
+
+NEXT_ROW_VERSION = DDL(
+    f"""
+    CREATE OR REPLACE FUNCTION next_row_version() RETURNS bigint AS $$
+    BEGIN
+        RETURN (pg_current_xact_id()::text::bigint << {VERSION_XID_SHIFT})
+            | (nextval('row_version_seq') & {(1 << VERSION_XID_SHIFT) - 1});
+    END
+    $$ LANGUAGE plpgsql
+    """
+)
+BUMP_ROW_VERSION = DDL(
+    """
+    CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+    BEGIN
+        NEW.row_version := next_row_version();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """
+)
+RECORD_TOMBSTONE = DDL(
+    """
+    CREATE OR REPLACE FUNCTION record_tombstone() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO tombstone (table_name, row_id) VALUES (TG_TABLE_NAME, OLD.id);
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """
+)
+event.listen(SQLModel.metadata, "before_create", NEXT_ROW_VERSION)
+event.listen(SQLModel.metadata, "before_create", BUMP_ROW_VERSION)
+event.listen(SQLModel.metadata, "before_create", RECORD_TOMBSTONE)
+
+# Every version below this watermark is final, for the statements run after.
+VERSION_WATERMARK_QUERY = text(
+    "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint "
+    f"<< {VERSION_XID_SHIFT}"
+)
+
+
+def row_version_column(index: bool = True) -> Column:
+    return Column(
+        BigInteger,
+        nullable=False,
+        index=index,
+        server_default=text("next_row_version()"),
+    )
+
+
+def versioned(table: Table, tombstones: bool = True) -> None:
+    """
+    Bumps the row version of every row written to `table`, and records a
+    tombstone for every row deleted from it, cascades included, unless
+    `tombstones` is False.
+    """
+    event.listen(
+        table,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER {table.name}_row_version "
+            f"BEFORE INSERT OR UPDATE ON {table.name} "
+            "FOR EACH ROW EXECUTE FUNCTION bump_row_version()"
+        ),
+    )
+    if not tombstones:
+        return
+    event.listen(
+        table,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER {table.name}_tombstone "
+            f"AFTER DELETE ON {table.name} "
+            "FOR EACH ROW EXECUTE FUNCTION record_tombstone()"
+        ),
+    )
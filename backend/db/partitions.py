@@ -0,0 +1,428 @@
+import argparse
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import delete, text
+from sqlmodel import select
+from db.confdb import (
+    IDEMPOTENCY_KEY_DAYS,
+    RETENTION_CHECK_SECONDS,
+    SCORE_COMPACT_DAYS,
+    SCORE_DETACH_DAYS,
+    SCORE_PARTITIONS_AHEAD,
+)
+from db.interface import engine
+from db.models import EventStatus, IdempotencyKey, Season
+from db.models.scores import NO_SEASON
+from log_utils import DB_LOGGER
+
+DEFAULT_PARTITION = "scoreevent_default"
+# Detached partitions are moved to this schema, out of the score history.
+ARCHIVE_SCHEMA = "score_archive"
+# Arbitrary key of the Postgres advisory lock held while applying retention.
+RETENTION_LOCK_ID = 0x72657465
+# Maintenance gives up on a busy table rather than queueing writes behind it.
+LOCK_TIMEOUT = "5s"
+
+# The ID the next season created will get, without drawing it.
+NEXT_SEASON_ID_QUERY = text(
+    "SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END "
+    "FROM season_id_seq"
+)
+
+PARTITION_PATTERN = re.compile(r"scoreevent_(default|s\d+)")
+
+PARTITIONS_QUERY = text(
+    f"""
+    SELECT c.relname AS name,
+        n.nspname = '{ARCHIVE_SCHEMA}' AS detached,
+        EXISTS (
+            SELECT 1 FROM pg_constraint k
+            WHERE k.conrelid = c.oid AND k.conname = c.relname || '_compacted'
+        ) AS compacted,
+        greatest(c.reltuples, 0)::bigint AS rows,
+        pg_total_relation_size(c.oid) AS bytes
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind = 'r'
+        AND c.relname ~ '^scoreevent_(default|s[0-9]+)$'
+        AND n.nspname IN (current_schema(), '{ARCHIVE_SCHEMA}')
+    ORDER BY c.relname
+    """
+)
+
+
+def partition_name(season_id: int) -> str:
+    return f"scoreevent_s{int(season_id)}"
+
+
+def is_partition(name: str) -> bool:
+    return PARTITION_PATTERN.fullmatch(name) is not None
+
+
+async def list_partitions(conn) -> List[Dict[str, Any]]:
+    """
+    Lists the partitions of the score history, attached or detached, with
+    their estimated number of rows and size on disk.
+    """
+    result = await conn.execute(PARTITIONS_QUERY)
+    partitions = []
+    for row in result.mappings():
+        partition = dict(row)
+        name = partition["name"]
+        partition["season_id"] = None if name == DEFAULT_PARTITION else int(name[12:])
+        partitions.append(partition)
+    return partitions
+
+
+async def is_detached(conn, season_id: int) -> bool:
+    name = f"{ARCHIVE_SCHEMA}.{partition_name(season_id)}"
+    return await conn.scalar(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+    )
+
+
+async def is_compacted(conn, season_id: int) -> bool:
+    name = partition_name(season_id)
+    return await conn.scalar(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:name) AND conname = :constraint)"
+        ),
+        {"name": name, "constraint": f"{name}_compacted"},
+    )
+
+
+async def move_match_scores(
+    conn, match_id: int, old_season_id: Optional[int], new_season_id: Optional[int]
+) -> None:
+    """
+    Moves the score events of a match to the partition of its new season, in
+    the caller's transaction.
+
+    Events are taken back from the archive if the old season's partition is
+    detached, and the captures are dropped if the new season's partition is
+    compacted. The new season's partition must not be detached.
+    """
+    old = NO_SEASON if old_season_id is None else old_season_id
+    new = NO_SEASON if new_season_id is None else new_season_id
+    if old == new:
+        return
+    table = "scoreevent"
+    if old != NO_SEASON and await is_detached(conn, old):
+        table = f"{ARCHIVE_SCHEMA}.{partition_name(old)}"
+    if new != NO_SEASON and await is_compacted(conn, new):
+        await conn.execute(
+            text(
+                f"DELETE FROM {table} WHERE season_id = :season_id "
+                "AND match_id = :id AND kind = 'CAPTURE'"
+            ),
+            {"season_id": old, "id": match_id},
+        )
+    await conn.execute(
+        text(
+            f"UPDATE {table} SET season_id = :new "
+            "WHERE season_id = :old AND match_id = :id"
+        ),
+        {"new": new, "old": old, "id": match_id},
+    )
+    if table != "scoreevent":
+        # Inserted back into the score history, the events are routed to the
+        # partition of their new season.
+        await conn.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {table} WHERE match_id = :id "
+                "RETURNING *) INSERT INTO scoreevent SELECT * FROM moved"
+            ),
+            {"id": match_id},
+        )
+
+
+async def lock_history(conn, mode: str) -> None:
+    """
+    Takes the locks needed to attach or detach partitions up front, in the
+    order writes take them, so that maintenance waits on live traffic, or
+    gives up after LOCK_TIMEOUT, rather than deadlocking with it.
+
+    Partitions carry the foreign keys of the score history, whose triggers
+    on the referenced tables are created and dropped along with them.
+    """
+    await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    await conn.execute(text("LOCK TABLE match, team IN SHARE ROW EXCLUSIVE MODE"))
+    await conn.execute(text(f"LOCK TABLE scoreevent IN {mode} MODE"))
+
+
+async def create_partition(conn, season_id: int) -> None:
+    """
+    Gives a season its own partition, moving its events out of the default
+    partition, in the caller's transaction.
+    """
+    name = partition_name(season_id)
+    await lock_history(conn, "SHARE UPDATE EXCLUSIVE")
+    await conn.execute(
+        text(f"CREATE TABLE {name} (LIKE scoreevent INCLUDING DEFAULTS)")
+    )
+    await conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE season_id = :id RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"id": season_id},
+    )
+    await conn.execute(
+        text(
+            f"ALTER TABLE scoreevent ATTACH PARTITION {name} FOR VALUES IN ({season_id})"
+        )
+    )
+
+
+async def compact_partition(conn, season_id: int) -> int:
+    """
+    Drops the captures of a season, keeping its gong events, and returns the
+    number of events dropped, in the caller's transaction.
+
+    The gong events record who held every cube at every gong and the points
+    it awarded, which is all the standings and timelines are built from. A
+    check constraint keeps the partition compacted, and it is rewritten in
+    match order to give its space back, in the same transaction so that a
+    partition is never marked compacted before it is rewritten. Only the
+    partition is locked.
+    """
+    name = partition_name(season_id)
+    await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    result = await conn.execute(text(f"DELETE FROM {name} WHERE kind = 'CAPTURE'"))
+    await conn.execute(
+        text(
+            f"ALTER TABLE {name} ADD CONSTRAINT {name}_compacted CHECK (kind = 'GONG')"
+        )
+    )
+    index = await conn.scalar(
+        text(
+            "SELECT i.inhrelid::regclass::text FROM pg_inherits i "
+            "JOIN pg_index x ON x.indexrelid = i.inhrelid "
+            "WHERE i.inhparent = 'ix_scoreevent_match_id_timestamp'::regclass "
+            "AND x.indrelid = to_regclass(:name)"
+        ),
+        {"name": name},
+    )
+    await conn.execute(text(f"CLUSTER {name} USING {index}"))
+    return result.rowcount
+
+
+async def detach_partition(conn, season_id: int) -> None:
+    """
+    Detaches the partition of a season from the score history into
+    ARCHIVE_SCHEMA, in the caller's transaction.
+    """
+    name = partition_name(season_id)
+    await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    await lock_history(conn, "ACCESS EXCLUSIVE")
+    await conn.execute(text(f"ALTER TABLE scoreevent DETACH PARTITION {name}"))
+    await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+
+
+async def attach_partition(conn, season_id: int) -> None:
+    """
+    Attaches back the detached partition of a season, in the caller's
+    transaction.
+    """
+    name = partition_name(season_id)
+    schema = await conn.scalar(text("SELECT current_schema()"))
+    await lock_history(conn, "SHARE UPDATE EXCLUSIVE")
+    await conn.execute(text(f"ALTER TABLE {ARCHIVE_SCHEMA}.{name} SET SCHEMA {schema}"))
+    await conn.execute(
+        text(
+            f"ALTER TABLE scoreevent ATTACH PARTITION {name} FOR VALUES IN ({season_id})"
+        )
+    )
+
+
+async def prune_idempotency_keys(conn, before: datetime) -> int:
+    """
+    Deletes the idempotency keys recorded before a time, in the caller's
+    transaction, and returns how many were deleted.
+    """
+    result = await conn.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created < before)
+    )
+    return result.rowcount
+
+
+class RetentionJob:
+    """
+    Applies the retention policy of the score history in the background.
+
+    Seasons completed more than `compact_days` ago are compacted, and those
+    completed more than `detach_days` ago are detached, 0 disabling either
+    step. The next `ahead` seasons to be created get their partition in
+    advance, and seasons found without one, e.g. created faster, get theirs
+    with their events moved out of the default partition. Idempotency keys
+    older than `key_days` are deleted.
+
+    Workers take turns through an advisory lock, and every step runs in its
+    own transaction: a step that cannot lock its tables is retried on the
+    next run.
+    """
+
+    def __init__(
+        self,
+        compact_days: int,
+        detach_days: int,
+        key_days: int,
+        interval: float,
+        ahead: int = SCORE_PARTITIONS_AHEAD,
+    ):
+        self.compact_days = compact_days
+        self.detach_days = detach_days
+        self.key_days = key_days
+        self.ahead = ahead
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+        self.last_run: Optional[datetime] = None
+        self.counts = {
+            "created": 0,
+            "compacted": 0,
+            "detached": 0,
+            "failed": 0,
+            "pruned_keys": 0,
+        }
+
+    async def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.apply()
+            except Exception:
+                DB_LOGGER.exception("Failed to apply the score retention policy")
+            await asyncio.sleep(self.interval)
+
+    def steps(self, seasons, partitions, next_id: int, now: datetime):
+        for season_id in range(next_id, next_id + self.ahead):
+            if season_id not in partitions:
+                yield "created", season_id
+        for season_id, status, end in seasons:
+            partition = partitions.get(season_id)
+            if partition is None:
+                yield "created", season_id
+                partition = {"detached": False, "compacted": False}
+            if status != EventStatus.COMPLETED or end is None:
+                continue
+            age = now - end
+            if partition["detached"]:
+                continue
+            if (
+                self.compact_days
+                and not partition["compacted"]
+                and age > timedelta(days=self.compact_days)
+            ):
+                yield "compacted", season_id
+            if self.detach_days and age > timedelta(days=self.detach_days):
+                yield "detached", season_id
+
+    async def apply(self) -> None:
+        actions = {
+            "created": create_partition,
+            "compacted": compact_partition,
+            "detached": detach_partition,
+        }
+        async with engine.connect() as conn:
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:id)"), {"id": RETENTION_LOCK_ID}
+            )
+            await conn.commit()
+            if not locked:
+                return
+            try:
+                partitions = {p["season_id"]: p for p in await list_partitions(conn)}
+                result = await conn.execute(
+                    select(Season.id, Season.status, Season.end).order_by(Season.id)
+                )
+                seasons = result.all()
+                next_id = await conn.scalar(NEXT_SEASON_ID_QUERY)
+                await conn.commit()
+                now = datetime.now(timezone.utc)
+                steps = self.steps(seasons, partitions, next_id, now)
+                for step, season_id in steps:
+                    try:
+                        await actions[step](conn, season_id)
+                        await conn.commit()
+                    except Exception as e:
+                        await conn.rollback()
+                        self.counts["failed"] += 1
+                        DB_LOGGER.warning(
+                            "Score partition of season %d not %s: %s",
+                            season_id,
+                            step,
+                            e,
+                        )
+                        continue
+                    self.counts[step] += 1
+                    DB_LOGGER.info("Score partition of season %d %s", season_id, step)
+                if self.key_days:
+                    pruned = await prune_idempotency_keys(
+                        conn, now - timedelta(days=self.key_days)
+                    )
+                    await conn.commit()
+                    self.counts["pruned_keys"] += pruned
+            finally:
+                await conn.rollback()
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(:id)"), {"id": RETENTION_LOCK_ID}
+                )
+                await conn.commit()
+        self.last_run = datetime.now(timezone.utc)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "compact_days": self.compact_days,
+            "detach_days": self.detach_days,
+            "key_days": self.key_days,
+            "ahead": self.ahead,
+            "last_run": self.last_run,
+            **self.counts,
+        }
+
+
+retention_job = RetentionJob(
+    SCORE_COMPACT_DAYS, SCORE_DETACH_DAYS, IDEMPOTENCY_KEY_DAYS, RETENTION_CHECK_SECONDS
+)
+
+ACTIONS = {
+    "create": create_partition,
+    "compact": compact_partition,
+    "detach": detach_partition,
+    "attach": attach_partition,
+}
+
+
+async def run_action(action: str, season_id: int) -> None:
+    async with engine.connect() as conn:
+        await ACTIONS[action](conn, season_id)
+        await conn.commit()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Manage the score history partition of a season."
+    )
+    parser.add_argument("action", choices=ACTIONS)
+    parser.add_argument("season_id", type=int)
+    args = parser.parse_args()
+    asyncio.run(run_action(args.action, args.season_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import asyncio
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from log_utils import DB_LOGGER
+
+# Set on the responses of writes to the WAL position of the primary once
+# they committed. Clients echo it back on their reads, which the replica then
+# serves only once it replayed that far.
+READ_AFTER_HEADER = "X-Read-After-LSN"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# A replica replaying everything it received is not behind, however old its
+# last replayed transaction is.
+LAG_QUERY = text(
+    """
+    SELECT CASE
+            WHEN NOT pg_is_in_recovery()
+                OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END AS lag,
+        CASE
+            WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+            ELSE pg_current_wal_lsn()
+        END::text AS replayed
+    """
+)
+CURRENT_LSN_QUERY = text("SELECT pg_current_wal_lsn()::text")
+
+
+def parse_lsn(value: Optional[str]) -> Optional[int]:
+    """
+    Parses a Postgres WAL position such as "16/B374D848", or returns None if
+    it is not one.
+    """
+    try:
+        high, low = value.split("/")
+        return int(high, 16) << 32 | int(low, 16)
+    except (AttributeError, ValueError):
+        return None
+
+
+class ReplicaMonitor:
+    """
+    Measures the replication lag of the read replica in the background.
+
+    The replica only serves reads while its lag is known and below
+    `max_lag`, and reads after a WAL position once it replayed it. Reads go
+    to the primary while it is unreachable.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_lag: float, interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: Optional[float] = None
+        self.replayed: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+        self.reads = {"replica": 0, "primary": 0}
+
+    def usable(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def caught_up(self, lsn: int) -> bool:
+        return self.replayed is not None and self.replayed >= lsn
+
+    async def check(self) -> None:
+        try:
+            async with self.engine.connect() as conn:
+                result = await conn.execute(LAG_QUERY)
+                lag, replayed = result.one()
+        except Exception as e:
+            if self.lag is not None:
+                DB_LOGGER.warning("Replica unreachable, reading from primary: %s", e)
+            self.lag = None
+            self.replayed = None
+            return
+        was_usable = self.usable()
+        self.lag = float(lag) if lag is not None else None
+        self.replayed = parse_lsn(replayed)
+        if was_usable and not self.usable():
+            DB_LOGGER.warning("Replica lagging by %s s, reading from primary", lag)
+
+    async def start(self) -> None:
+        await self.check()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "lag_seconds": self.lag,
+            "max_lag_seconds": self.max_lag,
+            "usable": self.usable(),
+            "replayed_lsn": self.replayed,
+            "reads": self.reads,
+        }
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware setting READ_AFTER_HEADER on the successful responses of
+    writes, to the current WAL position of the primary `engine`, so that the
+    reads echoing it back see the writes whichever replica serves them.
+    """
+
+    def __init__(self, app, engine: AsyncEngine):
+        self.app = app
+        self.engine = engine
+        self.header = READ_AFTER_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                # The write committed before its response started.
+                async with self.engine.connect() as conn:
+                    lsn = await conn.scalar(CURRENT_LSN_QUERY)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (self.header, lsn.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import Integer, and_, column, delete, func, literal, select, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db.models import EventStatus, Match, ScoreEvent, ScoreEventKind, Team
+from db.models import TeamStanding
+
+
+async def add_points(db: AsyncSession, points: Dict[Tuple[int, int], int]) -> None:
+    """
+    Adds points to the standings of the given (season_id, team_id) pairs.
+
+    Runs as a single upsert in the caller's transaction, so the standings are
+    committed together with the score events that produced them. Pairs whose
+    team is not in the season are ignored.
+    """
+    if not points:
+        return
+    awarded = values(
+        column("season_id", Integer),
+        column("team_id", Integer),
+        column("points", Integer),
+        name="awarded",
+    ).data(
+        [(season_id, team_id, value) for (season_id, team_id), value in points.items()]
+    )
+    stmt = insert(TeamStanding).from_select(
+        ["season_id", "team_id", "points"],
+        select(awarded.c.season_id, awarded.c.team_id, awarded.c.points).join(
+            Team,
+            and_(Team.id == awarded.c.team_id, Team.season_id == awarded.c.season_id),
+        ),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TeamStanding.season_id, TeamStanding.team_id],
+        set_={"points": TeamStanding.points + stmt.excluded.points},
+    )
+    await db.execute(stmt)
+
+
+async def move_standings(
+    db: AsyncSession, team_ids: Iterable[int], season_id: int
+) -> None:
+    """
+    Gives teams moved to a season a blank standing in it, and drops their
+    standings in the seasons they left, in the caller's transaction.
+
+    Their score events stay in the history of the seasons they left, which
+    no longer count them.
+    """
+    team_ids = list(team_ids)
+    if not team_ids:
+        return
+    await db.execute(
+        delete(TeamStanding).where(
+            TeamStanding.team_id.in_(team_ids), TeamStanding.season_id != season_id
+        )
+    )
+    await db.execute(
+        insert(TeamStanding)
+        .values([{"season_id": season_id, "team_id": id} for id in team_ids])
+        .on_conflict_do_nothing()
+    )
+
+
+async def record_match_end(db: AsyncSession, season_id: int) -> None:
+    """
+    Counts a completed match for every team of the season.
+    """
+    stmt = insert(TeamStanding).from_select(
+        ["season_id", "team_id", "matches_played"],
+        select(Team.season_id, Team.id, literal(1)).where(Team.season_id == season_id),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TeamStanding.season_id, TeamStanding.team_id],
+        set_={"matches_played": TeamStanding.matches_played + 1},
+    )
+    await db.execute(stmt)
+
+
+async def rebuild_standings(db: AsyncSession, season_id: int) -> None:
+    """
+    Recomputes the standings of a season from its raw score events.
+
+    This is a repair tool: it aggregates the whole score history of the
+    season and must not be used on the read path.
+    """
+    points = (
+        select(ScoreEvent.team_id, func.sum(ScoreEvent.points).label("points"))
+        .where(
+            ScoreEvent.season_id == season_id, ScoreEvent.kind == ScoreEventKind.GONG
+        )
+        .group_by(ScoreEvent.team_id)
+        .subquery()
+    )
+    played = (
+        select(func.count(Match.id))
+        .where(Match.season_id == season_id, Match.status == EventStatus.COMPLETED)
+        .scalar_subquery()
+    )
+    await db.execute(delete(TeamStanding).where(TeamStanding.season_id == season_id))
+    await db.execute(
+        insert(TeamStanding).from_select(
+            ["season_id", "team_id", "points", "matches_played"],
+            select(
+                Team.season_id,
+                Team.id,
+                func.coalesce(points.c.points, 0),
+                played,
+            )
+            .outerjoin(points, points.c.team_id == Team.id)
+            .where(Team.season_id == season_id),
+        )
+    )
@@ -0,0 +1,237 @@
+import struct
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db.models import MatchTimeline, ScoreEvent, ScoreEventKind
+from db.models.scores import NO_SEASON
+from rules import CUBE_COUNT
+
+NO_OWNER = 0xFF
+
+
+def score_vector(teams: int) -> struct.Struct:
+    return struct.Struct(f"<{teams}I")
+
+
+def timeline_query(match_ids: Iterable[int], season_ids: Iterable[int]):
+    return (
+        select(
+            ScoreEvent.match_id,
+            ScoreEvent.gong,
+            ScoreEvent.cube,
+            ScoreEvent.team_id,
+            ScoreEvent.points,
+        )
+        .where(
+            ScoreEvent.season_id.in_(season_ids),
+            ScoreEvent.match_id.in_(match_ids),
+            ScoreEvent.kind == ScoreEventKind.GONG,
+        )
+        .order_by(ScoreEvent.match_id, ScoreEvent.gong)
+    )
+
+
+def pack_timeline(match_id: int, events: List[Any]) -> Dict[str, Any]:
+    """
+    Packs the gong events of a match into the columns of its MatchTimeline.
+    """
+    events = [e for e in events if e.team_id is not None]
+    teams = sorted({e.team_id for e in events})
+    slots = {team_id: slot for slot, team_id in enumerate(teams)}
+    gongs = max((e.gong for e in events), default=-1) + 1
+
+    ownership = bytearray([NO_OWNER]) * (gongs * CUBE_COUNT)
+    gained = [[0] * len(teams) for _ in range(gongs)]
+    for e in events:
+        ownership[e.gong * CUBE_COUNT + e.cube] = slots[e.team_id]
+        gained[e.gong][slots[e.team_id]] += e.points
+
+    vector = score_vector(len(teams))
+    scores = bytearray()
+    totals = [0] * len(teams)
+    for points in gained:
+        totals = [total + p for total, p in zip(totals, points)]
+        scores += vector.pack(*totals)
+    return {
+        "match_id": match_id,
+        "gongs": gongs,
+        "teams": teams,
+        "ownership": bytes(ownership),
+        "scores": bytes(scores),
+    }
+
+
+def extend_timeline(timeline: Any, events: List[Any]) -> Optional[Dict[str, Any]]:
+    """
+    Adds new gong events of a match to its packed timeline.
+
+    Only the gongs from the earliest new event on are repacked, so appending
+    the latest gong costs the same however long the match is. Returns an
+    empty dict when there is nothing to add, and None when an event is of a
+    team without a slot, as the timeline must then be rebuilt.
+    """
+    events = [e for e in events if e.team_id is not None]
+    slots = {team_id: slot for slot, team_id in enumerate(timeline.teams)}
+    if not events:
+        return {}
+    if any(e.team_id not in slots for e in events):
+        return None
+    first = min(min(e.gong for e in events), timeline.gongs)
+    gongs = max(timeline.gongs, max(e.gong for e in events) + 1)
+    vector = score_vector(len(slots))
+
+    ownership = bytearray(timeline.ownership)
+    ownership += bytes([NO_OWNER]) * ((gongs - timeline.gongs) * CUBE_COUNT)
+    gained = [[0] * len(slots) for _ in range(gongs - first)]
+    for e in events:
+        ownership[e.gong * CUBE_COUNT + e.cube] = slots[e.team_id]
+        gained[e.gong - first][slots[e.team_id]] += e.points
+
+    # New points add up on top of the totals already packed for each gong,
+    # or on the last ones past the end of the timeline.
+    scores = bytearray(timeline.scores[: first * vector.size])
+    added = [0] * len(slots)
+    for gong, points in enumerate(gained, first):
+        added = [total + p for total, p in zip(added, points)]
+        base = min(gong, timeline.gongs - 1)
+        packed = (
+            vector.unpack_from(timeline.scores, base * vector.size)
+            if base >= 0
+            else [0] * len(slots)
+        )
+        scores += vector.pack(*(total + p for total, p in zip(packed, added)))
+    return {
+        "match_id": timeline.match_id,
+        "gongs": gongs,
+        "teams": timeline.teams,
+        "ownership": bytes(ownership),
+        "scores": bytes(scores),
+    }
+
+
+async def build_timelines(
+    db: AsyncSession, seasons: Dict[int, Optional[int]]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Packs the timelines of the given matches, by ID with their season ID,
+    from all their gong events, reading only the partitions of their seasons.
+    """
+    events = {match_id: [] for match_id in seasons}
+    if not events:
+        return {}
+    season_ids = {NO_SEASON if s is None else s for s in seasons.values()}
+    result = await db.execute(timeline_query(events, season_ids))
+    for row in result:
+        events[row.match_id].append(row)
+    return {
+        match_id: pack_timeline(match_id, rows) for match_id, rows in events.items()
+    }
+
+
+async def append_timelines(
+    db: AsyncSession, seasons: Dict[int, Optional[int]], events: Iterable[Any]
+) -> None:
+    """
+    Adds newly inserted gong events to the timelines of their matches, by ID
+    with their season ID, in the caller's transaction.
+
+    Every timeline is created empty if missing and locked, so that concurrent
+    appends to a match are applied one after the other. Matches with events
+    of a team not in their timeline yet are rebuilt from all their gong
+    events.
+    """
+    by_match = {match_id: [] for match_id in sorted(seasons)}
+    for e in events:
+        by_match[e.match_id].append(e)
+    if not by_match:
+        return
+    await db.execute(
+        insert(MatchTimeline)
+        .values(
+            [
+                {
+                    "match_id": match_id,
+                    "gongs": 0,
+                    "teams": [],
+                    "ownership": b"",
+                    "scores": b"",
+                }
+                for match_id in by_match
+            ]
+        )
+        .on_conflict_do_nothing()
+    )
+    result = await db.execute(
+        select(
+            MatchTimeline.match_id,
+            MatchTimeline.gongs,
+            MatchTimeline.teams,
+            MatchTimeline.ownership,
+            MatchTimeline.scores,
+        )
+        .where(MatchTimeline.match_id.in_(by_match))
+        .order_by(MatchTimeline.match_id)
+        .with_for_update()
+    )
+    timelines = {row.match_id: row for row in result}
+
+    packed, rebuilt = [], {}
+    for match_id, new in by_match.items():
+        extended = extend_timeline(timelines[match_id], new)
+        if extended is None:
+            rebuilt[match_id] = seasons[match_id]
+        elif extended:
+            packed.append(extended)
+    packed += (await build_timelines(db, rebuilt)).values()
+    if not packed:
+        return
+    stmt = insert(MatchTimeline).values(packed)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MatchTimeline.match_id],
+        set_={
+            name: stmt.excluded[name]
+            for name in ("gongs", "teams", "ownership", "scores")
+        },
+    )
+    await db.execute(stmt)
+
+
+def owners_at(timeline: MatchTimeline, gong: int) -> List[Optional[int]]:
+    """
+    Returns the team owning each cube at a gong.
+    """
+    if gong < 0 or not timeline.gongs:
+        return [None] * CUBE_COUNT
+    start = min(gong, timeline.gongs - 1) * CUBE_COUNT
+    return [
+        None if slot == NO_OWNER else timeline.teams[slot]
+        for slot in timeline.ownership[start : start + CUBE_COUNT]
+    ]
+
+
+def scores_at(timeline: MatchTimeline, gong: int) -> Dict[int, int]:
+    """
+    Returns the cumulative points of each team once a gong was awarded.
+    """
+    if gong < 0 or not timeline.gongs:
+        return dict.fromkeys(timeline.teams, 0)
+    gong = min(gong, timeline.gongs - 1)
+    vector = score_vector(len(timeline.teams))
+    totals = vector.unpack_from(timeline.scores, gong * vector.size)
+    return dict(zip(timeline.teams, totals))
+
+
+def replay(timeline: MatchTimeline) -> Dict[str, Any]:
+    """
+    Unpacks a whole timeline: the owners and cumulative scores of every gong,
+    aligned with `teams`.
+    """
+    vector = score_vector(len(timeline.teams))
+    return {
+        "teams": timeline.teams,
+        "owners": [owners_at(timeline, gong) for gong in range(timeline.gongs)],
+        "scores": [list(totals) for totals in vector.iter_unpack(timeline.scores)]
+        if timeline.teams
+        else [[] for _ in range(timeline.gongs)],
+    }
@@ -1,20 +1,159 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from fastapi import Request
 
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
 
-def create_custom_logger(name: str, level: int = logging.INFO) -> logging.Logger:
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+match_id: ContextVar[Optional[int]] = ContextVar("match_id", default=None)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Attaches the request and match IDs of the current context to the record.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        record.match_id = match_id.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Samples records below WARNING and caps them with a token bucket, so that
+    bursts of debug and info logging are shed before reaching the queue.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, rate: Optional[float] = None):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.dropped += 1
+            return False
+        if self.rate is not None:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                self.dropped += 1
+                return False
+            self.tokens -= 1
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "match_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        return json.dumps(data)
+
+
+def create_stream_handler() -> logging.Handler:
+    handler = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+    return handler
+
+
+# Records are formatted and written by a background thread; logging calls on
+# the event loop only enqueue them.
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, create_stream_handler())
+log_listener.start()
+atexit.register(log_listener.stop)
+
+
+def create_custom_logger(
+    name: str,
+    level: int = logging.INFO,
+    sample_rate: float = 1.0,
+    rate_limit: Optional[float] = None,
+) -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(level)
+    logger.propagate = False
 
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    if not any(isinstance(h, QueueHandler) for h in logger.handlers):
+        handler = QueueHandler(log_queue)
+        handler.addFilter(RateLimitFilter(sample_rate, rate_limit))
+        handler.addFilter(ContextFilter())
+        logger.addHandler(handler)
 
     return logger
 
 
+class RequestContextMiddleware:
+    """
+    ASGI middleware giving every request an ID, taken from the
+    `X-Request-ID` header when present, that is attached to its log records.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        value = headers.get(b"x-request-id", b"").decode() or uuid.uuid4().hex
+        token = request_id.set(value)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", value.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(token)
+
+
+async def bind_match_id(request: Request) -> None:
+    """
+    FastAPI dependency tagging the log records of a request with the ID of
+    the match in its path.
+    """
+    value = request.path_params.get("id", "")
+    if value.isdigit():
+        match_id.set(int(value))
+
+
 DB_LOGGER = create_custom_logger("db")
 API_LOGGER = create_custom_logger("api")
+INGEST_LOGGER = create_custom_logger("ingest", sample_rate=0.1, rate_limit=50)
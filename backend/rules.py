@@ -0,0 +1,32 @@
+ROUNDS = 6
+ROUND_SECONDS = 10 * 60
+GONG_SECONDS = 40
+GONGS_PER_ROUND = ROUND_SECONDS // GONG_SECONDS
+TEAMS_PER_MATCH = 6
+PLAYERS_PER_TEAM = 6
+
+# Cube layout: 7 regular cubes, 2 large cubes and the throne cube (last index).
+# Regular and large cubes score at every gong, the throne only at the first
+# gong of each round, for more points as the match goes on.
+REGULAR_CUBE_POINTS = 2
+LARGE_CUBE_POINTS = 3
+THRONE_CUBE_POINTS = (5, 5, 6, 6, 7, 8)
+CUBE_POINTS = (REGULAR_CUBE_POINTS,) * 7 + (LARGE_CUBE_POINTS,) * 2 + (0,)
+CUBE_COUNT = len(CUBE_POINTS)
+THRONE_CUBE = CUBE_COUNT - 1
+
+
+def gong_points(cube: int, gong: int) -> int:
+    """
+    Returns the points awarded by the given gong to the team controlling the
+    given cube.
+    """
+    if cube != THRONE_CUBE:
+        return CUBE_POINTS[cube]
+    index, tick = divmod(gong, GONGS_PER_ROUND)
+    return THRONE_CUBE_POINTS[index] if tick == 0 else 0
+
+
+# Respawn areas, each with a first and a second ring.
+RESPAWN_ZONES = 2
+RINGS_PER_ZONE = 2
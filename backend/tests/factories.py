@@ -0,0 +1,82 @@
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List
+
+
+def unique(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:8]}"
+
+
+def create_season(client, teams: int = 2) -> Dict[str, Any]:
+    """
+    Creates an ongoing season with `teams` teams.
+    """
+    season = client.post("/seasons", json={"name": unique("season")}).json()
+    client.post(f"/seasons/{season['id']}/start")
+    season["teams"] = [
+        client.post(
+            "/teams",
+            json={"name": unique("team"), "color": "red", "season_id": season["id"]},
+        ).json()["id"]
+        for _ in range(teams)
+    ]
+    return season
+
+
+def start_match(client, season_id: int) -> Dict[str, Any]:
+    """
+    Creates and starts a match of a season.
+    """
+    match = client.post(
+        "/matches", json={"name": unique("match"), "season_id": season_id}
+    ).json()
+    match = client.post(f"/matches/{match['id']}/start").json()
+    match["start"] = datetime.fromisoformat(match["start"])
+    return match
+
+
+def capture(match_id: int, team_id: int, cube: int, **fields) -> Dict[str, Any]:
+    return {
+        "match_id": match_id,
+        "team_id": team_id,
+        "kind": "capture",
+        "cube": cube,
+        **fields,
+    }
+
+
+def ids(items: List[Dict[str, Any]]) -> List[int]:
+    return [item["id"] for item in items]
+
+
+def gong(match_id: int, team_id: int, cube: int, gong: int, points: int) -> dict:
+    return {
+        "match_id": match_id,
+        "team_id": team_id,
+        "kind": "gong",
+        "cube": cube,
+        "gong": gong,
+        "points": points,
+    }
+
+
+def run_in_session(client, function, *args):
+    """
+    Runs `function(db, *args)` in a committed session, on the event loop of
+    the app.
+    """
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    from db.interface import engine
+
+    async def run():
+        async with AsyncSession(engine) as db:
+            result = await function(db, *args)
+            await db.commit()
+            return result
+
+    return client.portal.call(run)
+
+
+def standings(client, season_id: int) -> dict:
+    rows = client.get(f"/seasons/{season_id}/standings").json()
+    return {row["team_id"]: row["points"] for row in rows}
@@ -0,0 +1,49 @@
+import psycopg2
+from conftest import TEST_DATABASE_URL
+from factories import ids, unique
+
+
+def sync(client, since, limit):
+    pages = []
+    while True:
+        page = client.get("/changes", params={"since": since, "limit": limit}).json()
+        pages.append(page)
+        since = page["version"]
+        if not page["more"]:
+            return pages, since
+
+
+def test_changes_page_through_writes(client):
+    _, since = sync(client, 0, 1000)
+    created = [
+        client.post("/seasons", json={"name": unique("season")}).json()["id"]
+        for _ in range(3)
+    ]
+    client.delete(f"/seasons/{created[0]}")
+    pages, _ = sync(client, since, 2)
+    assert [len(p["seasons"]) + len(p["deleted"]) for p in pages] == [2, 1]
+    seasons = [s for page in pages for s in page["seasons"]]
+    assert ids(seasons) == created[1:]
+    deleted = [d["row_id"] for page in pages for d in page["deleted"]]
+    assert deleted == [created[0]]
+
+
+def test_changes_hold_back_writes_committed_after_one_in_flight(client):
+    _, since = sync(client, 0, 1000)
+    in_flight, committed = unique("season"), unique("season")
+    conn = psycopg2.connect(TEST_DATABASE_URL.replace("+asyncpg", ""))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("INSERT INTO season (name) VALUES (%s)", (in_flight,))
+        client.post("/seasons", json={"name": committed})
+        # Reading does not wait for the write in flight, and returns nothing
+        # past it, which would make the client skip its version.
+        pages, since = sync(client, since, 1000)
+        names = [s["name"] for page in pages for s in page["seasons"]]
+        assert in_flight not in names and committed not in names
+        conn.commit()
+    finally:
+        conn.close()
+    pages, _ = sync(client, since, 1000)
+    names = [s["name"] for page in pages for s in page["seasons"]]
+    assert in_flight in names and committed in names
@@ -0,0 +1,34 @@
+import csv
+import io
+import json
+from app.endpoints import exports
+from factories import create_season, unique
+
+
+def test_export_streams_every_batch(client, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 3)
+    season = create_season(client, teams=2)
+    client.post(
+        f"/seasons/{season['id']}/teams:bulk",
+        json=[{"name": unique("team"), "color": "red"} for _ in range(8)],
+    )
+    params = {"season_id": season["id"]}
+    response = client.get("/export/teams", params=params)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 10
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+    assert {row["season_id"] for row in rows} == {season["id"]}
+
+    response = client.get("/export/teams", params={**params, "format": "csv"})
+    assert list(csv.DictReader(io.StringIO(response.text))) == [
+        {name: "" if value is None else str(value) for name, value in row.items()}
+        for row in rows
+    ]
+
+
+def test_export_streams_a_whole_table(client, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 4)
+    seasons = client.get("/export/seasons").text.splitlines()
+    assert len(seasons) > 4
+    assert len({json.loads(line)["id"] for line in seasons}) == len(seasons)
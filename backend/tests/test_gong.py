@@ -0,0 +1,86 @@
+import time
+from app import gong as gong_module
+from app.gong import GongScheduler, Tick, gong_due
+from factories import capture, standings
+from rules import GONGS_PER_ROUND, THRONE_CUBE
+
+
+def award(client, match, gongs):
+    scheduler = GongScheduler()
+    scheduler.register(match["id"], match["season_id"], match["start"])
+    ticks = [
+        Tick(match["id"], gong, gong // GONGS_PER_ROUND, gong_due(match["start"], gong))
+        for gong in gongs
+    ]
+    client.portal.call(scheduler.award, ticks)
+
+
+def test_gongs_award_controlled_cubes(client, season, match):
+    team_a, team_b = season["teams"]
+    client.post(
+        "/scores",
+        json=[
+            capture(match["id"], team_a, 0),
+            capture(match["id"], team_b, 7),
+            capture(match["id"], team_b, THRONE_CUBE),
+        ],
+    )
+    award(client, match, [0, 1])
+    # The throne scores at the first gong of the round only.
+    assert standings(client, season["id"]) == {team_a: 4, team_b: 11}
+    award(client, match, [GONGS_PER_ROUND])
+    assert standings(client, season["id"]) == {team_a: 6, team_b: 19}
+
+
+def test_gongs_are_awarded_once(client, season, match):
+    team_a, team_b = season["teams"]
+    client.post("/scores", json=[capture(match["id"], team_a, 0)])
+    award(client, match, [0])
+    award(client, match, [0])
+    assert standings(client, season["id"]) == {team_a: 2, team_b: 0}
+    events = client.get("/scores", params={"match_id": match["id"]}).json()
+    assert [e["kind"] for e in events] == ["capture", "gong"]
+
+
+def test_gongs_awarded_elsewhere_are_not_announced(client, season, match, monkeypatch):
+    announced = []
+    monkeypatch.setattr(
+        gong_module.hub, "publish", lambda topic, event: announced.append(event)
+    )
+    award(client, match, [0])
+    client.post("/scores", json=[capture(match["id"], season["teams"][0], 0)])
+    award(client, match, [0, 1])
+    # Gong 0 was announced while nobody held a cube, and is awarded the
+    # capture made before its due time.
+    assert [e["data"]["gong"] for e in announced] == [0, 0, 1]
+    award(client, match, [1])
+    assert len(announced) == 3
+
+
+def wait_for(condition, seconds=5.0):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_one_scheduler_runs_at_a_time(client):
+    schedulers = [GongScheduler(election_seconds=0.1) for _ in range(2)]
+
+    async def recover():
+        pass
+
+    for scheduler in schedulers:
+        # Ongoing matches of other tests are left alone.
+        scheduler.recover = recover
+        client.portal.call(scheduler.start)
+    try:
+        wait_for(lambda: any(s.leading for s in schedulers))
+        time.sleep(0.3)
+        assert [s.leading for s in schedulers].count(True) == 1
+        leader = next(s for s in schedulers if s.leading)
+        client.portal.call(leader.stop)
+        wait_for(lambda: any(s.leading for s in schedulers if s is not leader))
+    finally:
+        for scheduler in schedulers:
+            client.portal.call(scheduler.stop)
@@ -0,0 +1,48 @@
+from factories import ids, unique
+
+
+def test_list_matches_pages_by_id(client, season):
+    created = [
+        client.post(
+            "/matches", json={"name": unique("match"), "season_id": season["id"]}
+        ).json()["id"]
+        for _ in range(3)
+    ]
+    params = {"season_id": season["id"]}
+    assert ids(client.get("/matches", params=params).json()) == created
+    first = client.get("/matches", params={**params, "limit": 2}).json()
+    assert ids(first) == created[:2]
+    rest = client.get("/matches", params={**params, "after": created[1]}).json()
+    assert ids(rest) == created[2:]
+
+
+def test_list_seasons_filters_by_status(client, season):
+    ongoing = client.get("/seasons", params={"status": "ongoing"}).json()
+    assert season["id"] in ids(ongoing)
+    assert all(s["status"] == "ongoing" for s in ongoing)
+
+
+def test_list_seasons_projects_fields(client, season):
+    rows = client.get(
+        "/seasons", params={"fields": "name, status", "after": season["id"] - 1}
+    ).json()
+    assert rows[0] == {"id": season["id"], "name": season["name"], "status": "ongoing"}
+    assert client.get("/seasons", params={"fields": "nope"}).status_code == 400
+
+
+def test_list_seasons_includes_relations(client, season):
+    params = {"after": season["id"] - 1, "limit": 1, "include": "teams,standings"}
+    (listed,) = client.get("/seasons", params=params).json()
+    assert listed["id"] == season["id"]
+    assert sorted(ids(listed["teams"])) == sorted(season["teams"])
+    assert len(listed["standings"]) == 2
+    assert "matches" not in listed
+
+
+def test_list_seasons_documents_included_relations(client):
+    schema = client.get("/openapi.json").json()
+    response = schema["paths"]["/seasons"]["get"]["responses"]["200"]
+    items = response["content"]["application/json"]["schema"]["items"]
+    assert items["$ref"].endswith("/SeasonWithRelations")
+    properties = schema["components"]["schemas"]["SeasonWithRelations"]["properties"]
+    assert {"matches", "teams", "standings"} <= set(properties)
@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from db.interface import engine
+
+
+def test_failed_queries_are_timed(client):
+    async def fail():
+        async with engine.connect() as conn:
+            with pytest.raises(DBAPIError):
+                await conn.execute(text("SELECT 1 / 0"))
+            return list(conn.sync_connection.info.get("query_start", []))
+
+    assert client.portal.call(fail) == []
+
+
+def test_metrics_count_requests(client, season):
+    client.get(f"/seasons/{season['id']}/standings")
+    body = client.get("/metrics").text
+    assert 'route="/seasons/{id}/standings"' in body
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from conftest import TEST_DATABASE_URL
+from db.migrations import current_revision, upgrade
+
+
+async def upgrade_fresh_database(*ddl: str) -> None:
+    server, name = TEST_DATABASE_URL.rsplit("/", 1)
+    scratch = f"{name}_migrations"
+    admin = create_async_engine(f"{server}/postgres", isolation_level="AUTOCOMMIT")
+    async with admin.connect() as conn:
+        await conn.execute(text(f'DROP DATABASE IF EXISTS "{scratch}"'))
+        await conn.execute(text(f'CREATE DATABASE "{scratch}"'))
+    engine = create_async_engine(f"{server}/{scratch}")
+    try:
+        async with engine.connect() as conn:
+            for statement in ddl:
+                await conn.execute(text(statement))
+            await conn.commit()
+            await conn.run_sync(upgrade)
+            assert await conn.run_sync(current_revision) is not None
+    finally:
+        await engine.dispose()
+        async with admin.connect() as conn:
+            await conn.execute(text(f'DROP DATABASE IF EXISTS "{scratch}"'))
+        await admin.dispose()
+
+
+def test_upgrade_refuses_partial_baseline(client):
+    with pytest.raises(RuntimeError, match="match, team, scoreevent, teamstanding"):
+        asyncio.run(
+            upgrade_fresh_database("CREATE TABLE season (id serial PRIMARY KEY)")
+        )
+
+
+def test_upgrade_builds_empty_database(client):
+    asyncio.run(upgrade_fresh_database())
@@ -0,0 +1,106 @@
+import psycopg2
+from sqlalchemy import text
+from conftest import TEST_DATABASE_URL
+from db.partitions import (
+    ARCHIVE_SCHEMA,
+    NEXT_SEASON_ID_QUERY,
+    RetentionJob,
+    compact_partition,
+    create_partition,
+    detach_partition,
+    is_compacted,
+    list_partitions,
+    partition_name,
+)
+from factories import capture, create_season, gong, run_in_session, start_match
+
+
+def record_match(client, season):
+    match = start_match(client, season["id"])
+    team_a, team_b = season["teams"]
+    client.post(
+        "/scores",
+        json=[
+            capture(match["id"], team_a, 0),
+            gong(match["id"], team_a, 0, 0, 3),
+            capture(match["id"], team_b, 1),
+        ],
+    )
+    return match
+
+
+def kinds(client, match_id):
+    events = client.get("/scores", params={"match_id": match_id}).json()
+    return sorted((e["kind"], e["season_id"]) for e in events)
+
+
+def partitioned(client):
+    season = create_season(client)
+    run_in_session(client, create_partition, season["id"])
+    return season
+
+
+def test_compaction_rolls_back_as_a_whole(client):
+    season = partitioned(client)
+    match = record_match(client, season)
+
+    async def compact_and_fail(db):
+        await compact_partition(db, season["id"])
+        await db.rollback()
+        return await is_compacted(db, season["id"])
+
+    assert run_in_session(client, compact_and_fail) is False
+    assert len(kinds(client, match["id"])) == 3
+
+
+def test_match_moves_into_compacted_season(client):
+    old, new = partitioned(client), partitioned(client)
+    match = record_match(client, old)
+    run_in_session(client, compact_partition, new["id"])
+    response = client.patch(f"/matches/{match['id']}", json={"season_id": new["id"]})
+    assert response.status_code == 200
+    assert kinds(client, match["id"]) == [("gong", new["id"])]
+
+
+def test_match_moves_out_of_detached_season(client):
+    old, new = partitioned(client), partitioned(client)
+    match = record_match(client, old)
+    run_in_session(client, detach_partition, old["id"])
+    response = client.patch(f"/matches/{match['id']}", json={"season_id": new["id"]})
+    assert response.status_code == 200
+    assert [season for _, season in kinds(client, match["id"])] == [new["id"]] * 3
+
+    async def archived(db):
+        name = f"{ARCHIVE_SCHEMA}.{partition_name(old['id'])}"
+        return await db.scalar(text(f"SELECT count(*) FROM {name}"))
+
+    assert run_in_session(client, archived) == 0
+    response = client.patch(f"/matches/{match['id']}", json={"season_id": old["id"]})
+    assert response.status_code == 409
+
+
+def test_seasons_are_created_without_locking_score_history(client):
+    conn = psycopg2.connect(TEST_DATABASE_URL.replace("+asyncpg", ""))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("LOCK TABLE scoreevent, match, team IN EXCLUSIVE MODE")
+        response = client.post("/seasons", json={"name": "locked out"})
+        assert response.status_code == 200
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def test_retention_creates_partitions_ahead(client):
+    job = RetentionJob(0, 0, 0, 0, ahead=2)
+    client.portal.call(job.apply)
+
+    async def next_partitions(db):
+        next_id = await db.scalar(NEXT_SEASON_ID_QUERY)
+        partitions = await list_partitions(db)
+        return next_id, {p["season_id"] for p in partitions}
+
+    next_id, partitions = run_in_session(client, next_partitions)
+    assert {next_id, next_id + 1} <= partitions
+    season = client.post("/seasons", json={"name": "ahead"}).json()
+    assert season["id"] == next_id
@@ -0,0 +1,44 @@
+from db.interface import engine
+from db.replica import (
+    READ_AFTER_HEADER,
+    ReadYourWritesMiddleware,
+    ReplicaMonitor,
+    parse_lsn,
+)
+
+
+def test_parse_lsn():
+    assert parse_lsn("16/B374D848") == 0x16_B374D848
+    assert parse_lsn("0/0") == 0
+    assert parse_lsn("B374D848") is None
+    assert parse_lsn(None) is None
+
+
+def write_response_headers(client, method):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def call():
+        middleware = ReadYourWritesMiddleware(app, engine)
+        await middleware({"type": "http", "method": method}, None, send)
+
+    client.portal.call(call)
+    return dict(messages[0]["headers"])
+
+
+def test_writes_return_the_lsn_to_read_after(client):
+    monitor = ReplicaMonitor(engine, max_lag=5, interval=1)
+    header = READ_AFTER_HEADER.lower().encode()
+    lsn = parse_lsn(write_response_headers(client, "POST")[header].decode())
+    assert header not in write_response_headers(client, "GET")
+    client.portal.call(monitor.check)
+    # The primary stands in for a replica that replayed everything.
+    assert monitor.usable()
+    assert monitor.caught_up(lsn)
+    assert not monitor.caught_up(monitor.replayed + 1)
@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+from app.gong import GongScheduler, Tick, gong_due
+from app.respawn import replay, respawn_engine
+from db.models import RespawnEvent, RespawnEventKind
+from factories import capture
+from rules import THRONE_CUBE
+from test_gong import wait_for
+
+
+def move(kind, team_id, player, zone=0, ring=None, gong=-1):
+    return RespawnEvent(
+        match_id=1,
+        team_id=team_id,
+        player=player,
+        zone=zone,
+        kind=kind,
+        ring=ring,
+        gong=gong,
+        timestamp=datetime.now(timezone.utc),
+    )
+
+
+def rings(state):
+    return [
+        [[(p["team_id"], p["player"]) for p in ring] for ring in zone["rings"]]
+        for zone in state["zones"]
+    ]
+
+
+def test_replay_tolerates_gaps_in_the_log():
+    respawns = replay(
+        None,
+        [
+            # The elimination of player 1 was lost before being written.
+            move(RespawnEventKind.ADVANCED, 1, 1, ring=1, gong=0),
+            move(RespawnEventKind.RELEASED, 1, 2, gong=0),
+            move(RespawnEventKind.ELIMINATED, 1, 3, ring=1, gong=0),
+            move(RespawnEventKind.ELIMINATED, 1, 3, ring=2, gong=0),
+            move(RespawnEventKind.DELAYED, 1, 4, ring=1, gong=1),
+        ],
+    )
+    assert rings(respawns.state())[0] == [[(1, 1), (1, 4)], [(1, 3)]]
+    assert set(respawns.waiting) == {7, 9, 10}
+
+
+def test_rings_replay_from_recorded_moves(client, season, match):
+    team_a, team_b = season["teams"]
+    scheduler = GongScheduler(election_seconds=0.1, respawns=True)
+
+    async def recover():
+        pass
+
+    scheduler.recover = recover
+    client.portal.call(scheduler.start)
+    try:
+        wait_for(lambda: scheduler.leading)
+        assert respawn_engine.task is not None
+        scheduler.track(match["id"], season["id"], match["start"])
+        client.post("/scores", json=[capture(match["id"], team_a, THRONE_CUBE)])
+        url = f"/matches/{match['id']}/respawns"
+        for team_id, player in [(team_a, 0), (team_b, 0), (team_b, 1)]:
+            elimination = {"team_id": team_id, "player": player, "zone": 0}
+            assert client.post(url, json=elimination).status_code == 200
+        ticks = [Tick(match["id"], 0, 0, gong_due(match["start"], 0))]
+        client.portal.call(scheduler.award, ticks)
+        client.post(url, json={"team_id": team_b, "player": 2, "zone": 1})
+        live = client.get(url).json()
+    finally:
+        client.portal.call(scheduler.stop)
+    assert respawn_engine.task is None and not respawn_engine.matches
+    # The throne holder waits one more gong in the first ring, while the
+    # second ring advances.
+    first = [(team_a, 0), (team_b, 0), (team_b, 1)]
+    assert rings(live) == [[first, []], [[(team_b, 2)], []]]
+    assert client.get(url).json() == live
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta, timezone
+from sqlmodel import select
+from db.models import IdempotencyKey
+from db.partitions import RetentionJob
+from factories import run_in_session, unique
+
+
+def test_retention_prunes_old_idempotency_keys(client):
+    old, recent = unique("old"), unique("recent")
+    now = datetime.now(timezone.utc)
+
+    async def record(db):
+        db.add(IdempotencyKey(key=old, created=now - timedelta(days=8)))
+        db.add(IdempotencyKey(key=recent, created=now - timedelta(days=6)))
+
+    async def keys(db):
+        result = await db.execute(
+            select(IdempotencyKey.key).where(IdempotencyKey.key.in_([old, recent]))
+        )
+        return set(result.scalars())
+
+    run_in_session(client, record)
+    job = RetentionJob(0, 0, 7, 0)
+    client.portal.call(job.apply)
+    assert run_in_session(client, keys) == {recent}
+    assert job.status()["pruned_keys"] >= 1
@@ -0,0 +1,97 @@
+from app.endpoints import scores
+from app.idempotency import RecentKeys
+from factories import capture, create_season, ids, unique
+
+
+def test_ingest_records_batch(client, season, match):
+    team_a, team_b = season["teams"]
+    response = client.post(
+        "/scores",
+        json=[capture(match["id"], team_a, 0), capture(match["id"], team_b, 1)],
+    )
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 2, "duplicates": 0}
+    events = client.get("/scores", params={"match_id": match["id"]}).json()
+    assert [(e["team_id"], e["cube"]) for e in events] == [(team_a, 0), (team_b, 1)]
+    assert {e["season_id"] for e in events} == {season["id"]}
+
+
+def test_ingest_drops_duplicates_within_batch(client, season, match):
+    event = capture(match["id"], season["teams"][0], 0, controller_id="c", seq=1)
+    response = client.post("/scores", json=[event, event])
+    assert response.json() == {"inserted": 1, "duplicates": 1}
+
+
+def test_ingest_drops_duplicates_on_conflict(client, season, match, monkeypatch):
+    # Without the window of recent keys, retries reach the unique index.
+    monkeypatch.setattr(scores, "recent_events", RecentKeys(0))
+    event = capture(match["id"], season["teams"][0], 0, controller_id="c", seq=7)
+    assert client.post("/scores", json=[event]).json()["inserted"] == 1
+    retry = [event, capture(match["id"], season["teams"][1], 1)]
+    assert client.post("/scores", json=retry).json() == {
+        "inserted": 1,
+        "duplicates": 1,
+    }
+    events = client.get("/scores", params={"match_id": match["id"]}).json()
+    assert len(events) == 2
+
+
+def test_ingest_rejects_team_of_another_season(client, season, match):
+    other = create_season(client, teams=1)
+    response = client.post("/scores", json=[capture(match["id"], other["teams"][0], 0)])
+    assert response.status_code == 400
+    assert client.get("/scores", params={"match_id": match["id"]}).json() == []
+
+
+def test_ingest_rejects_unknown_team(client, season, match):
+    response = client.post("/scores", json=[capture(match["id"], 2**31 - 1, 0)])
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Team not found"
+
+
+def test_ingest_rejects_inactive_match(client, season):
+    pending = client.post(
+        "/matches", json={"name": "pending", "season_id": season["id"]}
+    ).json()
+    response = client.post(
+        "/scores", json=[capture(pending["id"], season["teams"][0], 0)]
+    )
+    assert response.status_code == 400
+
+
+def test_ingest_rejects_unknown_match(client, season):
+    response = client.post("/scores", json=[capture(2**31 - 1, season["teams"][0], 0)])
+    assert response.status_code == 404
+
+
+def test_ingest_rejects_points_on_captures(client, season, match):
+    event = capture(match["id"], season["teams"][0], 0, points=3)
+    assert client.post("/scores", json=[event]).status_code == 400
+
+
+def test_ingest_requires_controller_and_seq_together(client, season, match):
+    event = capture(match["id"], season["teams"][0], 0, seq=1)
+    assert client.post("/scores", json=[event]).status_code == 400
+
+
+def test_list_scores_of_match(client, season, match):
+    client.post("/scores", json=[capture(match["id"], season["teams"][0], 2)])
+    events = client.get("/scores", params={"match_id": match["id"]}).json()
+    assert len(ids(events)) == 1
+
+
+def test_ingest_large_batch(client, season, match):
+    # More parameters than a single statement can bind.
+    controller = unique("controller")
+    events = [
+        capture(
+            match["id"], season["teams"][i % 2], i % 10, controller_id=controller, seq=i
+        )
+        for i in range(4000)
+    ]
+    assert client.post("/scores", json=events).json() == {
+        "inserted": 4000,
+        "duplicates": 0,
+    }
+    events = client.get("/scores", params={"match_id": match["id"]}).json()
+    assert len(events) == 4000
@@ -0,0 +1,111 @@
+import os
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app import snapshots
+from app.snapshots import snapshot_archiver, snapshot_store
+from db.events import event_bus
+from db.interface import engine
+from factories import (
+    capture,
+    create_season,
+    gong,
+    run_in_session,
+    start_match,
+    unique,
+)
+
+
+def completed_season(client):
+    season = create_season(client)
+    match = start_match(client, season["id"])
+    team_a, team_b = season["teams"]
+    client.post(
+        "/scores",
+        json=[
+            capture(match["id"], team_a, 0, controller_id=unique("c"), seq=1),
+            capture(match["id"], team_b, 1),
+            gong(match["id"], team_a, 0, 0, 3),
+        ],
+    )
+    client.post(f"/matches/{match['id']}/end")
+    client.post(f"/seasons/{season['id']}/end")
+    return season, match
+
+
+def test_snapshot_serves_what_the_database_does(client):
+    season, match = completed_season(client)
+    paths = [
+        f"/seasons/{season['id']}",
+        f"/seasons/{season['id']}/dashboard",
+        f"/seasons/{season['id']}/matches",
+        f"/seasons/{season['id']}/teams",
+        f"/seasons/{season['id']}/standings",
+        f"/matches/{match['id']}",
+    ]
+    scores = {"match_id": match["id"]}
+    expected = [client.get(path).json() for path in paths]
+    expected_scores = client.get("/scores", params=scores).json()
+    assert len(expected_scores) == 3
+    assert client.portal.call(snapshot_archiver.freeze, season["id"])
+
+    hits = snapshot_store.hits
+    assert [client.get(path).json() for path in paths] == expected
+    assert client.get("/scores", params=scores).json() == expected_scores
+    assert snapshot_store.hits > hits
+
+
+def test_snapshot_of_a_season_written_to_while_frozen_is_dropped(client, monkeypatch):
+    season, _ = completed_season(client)
+    build_snapshot = snapshots.build_snapshot
+
+    async def build_then_write(db, season_id):
+        snapshot = await build_snapshot(db, season_id)
+        async with AsyncSession(engine) as writer:
+            await writer.execute(
+                text(
+                    "UPDATE teamstanding SET points = points + 1 WHERE season_id = :id"
+                ),
+                {"id": season_id},
+            )
+            await writer.commit()
+        return snapshot
+
+    monkeypatch.setattr(snapshots, "build_snapshot", build_then_write)
+    assert not client.portal.call(snapshot_archiver.freeze, season["id"])
+    assert not os.path.exists(snapshot_store.path(season["id"]))
+    monkeypatch.undo()
+    assert client.portal.call(snapshot_archiver.freeze, season["id"])
+
+
+def test_outdated_snapshots_are_deleted(client):
+    changed, _ = completed_season(client)
+    discarded, _ = completed_season(client)
+    kept, _ = completed_season(client)
+    for season in (changed, discarded, kept):
+        assert client.portal.call(snapshot_archiver.freeze, season["id"])
+
+    async def score(db):
+        await db.execute(
+            text("UPDATE teamstanding SET points = points + 1 WHERE season_id = :id"),
+            {"id": changed["id"]},
+        )
+
+    run_in_session(client, score)
+    # As another host would, on connecting and on a discard notification.
+    client.portal.call(snapshot_store.verify)
+    event_bus.dispatch("discard", [discarded["id"]])
+    assert not os.path.exists(snapshot_store.path(changed["id"]))
+    assert not os.path.exists(snapshot_store.path(discarded["id"]))
+    assert snapshot_store.get(kept["id"]) is not None
+
+
+def test_writes_discard_the_snapshots_of_completed_seasons_only(client):
+    archived, _ = completed_season(client)
+    ongoing = create_season(client)
+    assert client.portal.call(snapshot_archiver.freeze, archived["id"])
+    locked = run_in_session(client, snapshot_store.lock, archived["id"], ongoing["id"])
+    assert locked == [archived["id"]]
+
+    team = archived["teams"][0]
+    client.patch(f"/teams/{team}", json={"color": "blue"})
+    assert not os.path.exists(snapshot_store.path(archived["id"]))
@@ -0,0 +1,45 @@
+from db.standings import add_points
+from factories import create_season, gong, run_in_session, standings
+
+
+def test_gong_events_add_points(client, season, match):
+    team_a, team_b = season["teams"]
+    client.post(
+        "/scores",
+        json=[gong(match["id"], team_a, 0, 0, 3), gong(match["id"], team_b, 1, 0, 2)],
+    )
+    client.post("/scores", json=[gong(match["id"], team_a, 0, 1, 3)])
+    assert standings(client, season["id"]) == {team_a: 6, team_b: 2}
+
+
+def test_add_points_ignores_teams_outside_season(client, season):
+    other = create_season(client, teams=1)
+    team = other["teams"][0]
+    run_in_session(client, add_points, {(season["id"], team): 5})
+    assert team not in standings(client, season["id"])
+    assert standings(client, other["id"]) == {team: 0}
+
+
+def test_moved_team_leaves_old_standings(client, season, match):
+    team_a, team_b = season["teams"]
+    client.post("/scores", json=[gong(match["id"], team_a, 0, 0, 4)])
+    other = create_season(client, teams=0)
+    client.patch(f"/teams/{team_a}", json={"season_id": other["id"]})
+    assert standings(client, season["id"]) == {team_b: 0}
+    assert standings(client, other["id"]) == {team_a: 0}
+
+
+def test_bulk_upsert_moves_standings(client, season):
+    team_a, team_b = season["teams"]
+    name = client.get(f"/teams/{team_a}").json()["name"]
+    other = create_season(client, teams=0)
+    response = client.post(
+        f"/seasons/{other['id']}/teams:bulk",
+        params={"upsert": True},
+        json=[{"name": name, "color": "blue"}, {"name": "new-" + name}],
+    )
+    assert response.status_code == 200
+    created = [team["id"] for team in response.json()]
+    assert team_a in created
+    assert standings(client, season["id"]) == {team_b: 0}
+    assert standings(client, other["id"]) == dict.fromkeys(created, 0)
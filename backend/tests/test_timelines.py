@@ -0,0 +1,40 @@
+from db.models import MatchTimeline
+from db.timelines import build_timelines, replay
+from factories import create_season, gong, run_in_session, start_match
+
+
+def rebuilt(client, match):
+    packed = run_in_session(client, build_timelines, {match["id"]: match["season_id"]})
+    return replay(MatchTimeline(**packed[match["id"]]))
+
+
+def test_appended_timeline_matches_rebuild(client):
+    season = create_season(client, teams=3)
+    match = start_match(client, season["id"])
+    team_a, team_b, team_c = season["teams"]
+    batches = [
+        [gong(match["id"], team_a, 0, 0, 2), gong(match["id"], team_b, 7, 0, 3)],
+        [gong(match["id"], team_b, 1, 2, 2)],
+        # Late events of earlier gongs, then a team new to the timeline.
+        [gong(match["id"], team_a, 1, 1, 2), gong(match["id"], team_a, 2, 0, 2)],
+        [gong(match["id"], team_c, 3, 3, 2)],
+        [gong(match["id"], team_c, 3, 5, 2)],
+    ]
+    for batch in batches:
+        assert client.post("/scores", json=batch).status_code == 200
+        timeline = client.get(f"/matches/{match['id']}/timeline").json()
+        assert {k: timeline[k] for k in ("teams", "owners", "scores")} == rebuilt(
+            client, match
+        )
+    assert timeline["scores"][-1] == [6, 5, 4]
+    assert len(timeline["owners"]) == 6
+
+
+def test_timeline_read_does_not_store(client, season, match):
+    timeline = client.get(f"/matches/{match['id']}/timeline").json()
+    assert timeline["owners"] == []
+
+    async def stored(db, match_id):
+        return await db.get(MatchTimeline, match_id)
+
+    assert run_in_session(client, stored, match["id"]) is None